@@ -0,0 +1 @@
+"""Движок бота-ассистента для обслуживания множества подписчиков."""
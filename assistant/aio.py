@@ -0,0 +1,377 @@
+"""Асинхронный режим: опрос API и отправка в Telegram на asyncio.
+Разбор ответа (check_response/format_status) общий с синхронным режимом.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import nullcontext
+
+import aiohttp
+
+import exceptions as _
+import homework
+from assistant import logs, metrics, profiling, routing
+from assistant.alerts import Alerts
+from assistant.cache import ResponseCache
+from assistant.dedup import SeenIndex
+from assistant.flight import AsyncSingleFlight, Rendezvous, Reply
+from assistant.intervals import AdaptiveInterval
+from assistant.metrics import PoolStats
+from assistant.records import key_of
+from assistant.registry import SubscriptionRegistry, Subscriber
+from assistant.sender import RateLimiter
+from assistant.state import MemoryStore
+
+
+async def fetch_homeworks(session: aiohttp.ClientSession, token: str,
+                          from_date: int, cache: ResponseCache = None,
+                          key=None, flights: AsyncSingleFlight = None) -> dict:
+    """Асинхронный аналог homework.request_homeworks."""
+    headers = {'Authorization': f'OAuth {token}'}
+    if cache is not None:
+        headers.update(cache.validators(key))
+    params = {'from_date': from_date or int(time.time())}
+    if flights is None:
+        reply = await fetch_reply(session, headers, params)
+    else:
+        reply = await flights.do(flights.key(headers, params), fetch_reply,
+                                 session, headers, params)
+    return reply.result(cache, key)
+
+
+async def fetch_reply(session: aiohttp.ClientSession, headers: dict,
+                      params: dict) -> Reply:
+    """GET к эндпойнту API: ответ 200 или 304 без разбора тела."""
+    started = time.perf_counter()
+    with homework.api_breaker or nullcontext(), profiling.span('request'):
+        async with session.get(homework.ENDPOINT, headers=headers,
+                               params=params) as response:
+            if response.status == 404:
+                raise _.RequestToEndpointFailed('Недоступен эндпойнт')
+            if response.status != 304:
+                response.raise_for_status()
+            body = await response.read()
+    metrics.POLL_LATENCY.observe(time.perf_counter() - started)
+    if response.status != 304:
+        metrics.RESPONSE_SIZE.observe(len(body))
+    return Reply(response.status, body, response.headers)
+
+
+def trace_config(stats: PoolStats) -> aiohttp.TraceConfig:
+    """Сбор статистики пула aiohttp: новые соединения и задержки."""
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        stats.record_request(time.perf_counter() - context.started)
+
+    async def on_connection_create_end(session, context, params):
+        stats.record_handshake()
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_end)
+    config.on_connection_create_end.append(on_connection_create_end)
+    return config
+
+
+class TelegramSender:
+    """Отправляет сообщения через HTTP Bot API без блокировки цикла.
+    Соблюдает ограничения частоты Telegram (limiter) и при ответе 429
+    повторяет отправку через retry_after секунд, не более max_attempts раз.
+    Семафор limit (у AsyncEngine - общий с опросами) занимает только сам
+    запрос: ожидание limiter и пауз повтора слота не держит.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, token: str,
+                 base_url: str = None, limiter: RateLimiter = None,
+                 max_attempts: int = 5, limit: asyncio.Semaphore = None):
+        base_url = base_url or homework.TELEGRAM_API_URL
+        self._session = session
+        self._url = f'{base_url}/bot{token}/sendMessage'
+        self.limiter = limiter or RateLimiter(
+            homework.TELEGRAM_GLOBAL_RATE, homework.TELEGRAM_CHAT_RATE
+        )
+        self.max_attempts = max_attempts
+        # По умолчанию - как пул соединений aiohttp.
+        self.limit = limit or asyncio.Semaphore(100)
+
+    async def send(self, chat_id, message: str,
+                   parse_mode: str = None) -> bool:
+        """Асинхронный аналог homework.deliver."""
+        payload = {'chat_id': chat_id, 'text': message}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        started = time.perf_counter()
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                await asyncio.sleep(self.limiter.reserve(chat_id))
+                try:
+                    async with self.limit:
+                        with homework.telegram_breaker or nullcontext():
+                            async with self._session.post(
+                                self._url, json=payload
+                            ) as response:
+                                if response.status != 429 or (
+                                    attempt == self.max_attempts
+                                ):
+                                    response.raise_for_status()
+                                    break
+                                answer = await response.json(
+                                    content_type=None
+                                )
+                except _.CircuitOpen as error:
+                    if attempt == self.max_attempts:
+                        raise
+                    await asyncio.sleep(error.retry_after or 1)
+                    continue
+                retry_after = answer.get('parameters', {}).get('retry_after')
+                logging.warning('Повтор отправки в чат %s через %s с',
+                                chat_id, retry_after)
+                await asyncio.sleep(retry_after or 1)
+        except Exception as e:
+            metrics.SEND_FAILURES.inc()
+            logging.exception('Не удалось отправить в телеграм. Ошибка: %s',
+                              e)
+            return False
+        finally:
+            metrics.SEND_LATENCY.observe(time.perf_counter() - started)
+        logging.info('Отправлено в Telegram: %s', message)
+        return True
+
+
+class AsyncEngine:
+    """Опрашивает API за всех подписчиков реестра в одном event loop.
+    На каждого подписчика заводится задача; число одновременных
+    HTTP-запросов (опросов и отправок) ограничено семафором, а отправки,
+    ждущие ограничений частоты Telegram, его не занимают.
+    С кэшем ответов cache запросы к API условные. Одинаковые запросы
+    подписчиков с общим токеном объединяются (flights), как в PollEngine.
+    Об ошибках сообщают сводки alerts. Уведомления записываются в outbox
+    store до отправки; недоставленные повторяются перед следующим опросом
+    подписчика (и после перезапуска). После stop() новые опросы не
+    начинаются, а начатые дорабатывают вместе с отправкой уведомлений.
+    """
+
+    def __init__(self, registry: SubscriptionRegistry, telegram_token: str,
+                 interval: float = homework.RETRY_TIME,
+                 concurrency: int = 100, policy: AdaptiveInterval = None,
+                 store: MemoryStore = None, seen: SeenIndex = None,
+                 cache: ResponseCache = None, alerts: Alerts = None,
+                 flights: AsyncSingleFlight = None):
+        self.registry = registry
+        self.cache = cache
+        self.flights = flights or AsyncSingleFlight()
+        self._rendezvous = Rendezvous()
+        self.interval = interval
+        self.policy = policy or AdaptiveInterval(interval)
+        self.store = store or MemoryStore()
+        if seen is None:
+            seen = SeenIndex(homework.DEDUP_SIZE, homework.DEDUP_TTL)
+        self.seen = seen
+        self.alerts = alerts or Alerts(
+            homework.ERROR_WINDOW, homework.ADMIN_CHAT_ID
+        )
+        self.concurrency = concurrency
+        self._telegram_token = telegram_token
+        self._loop = None
+        self._stopped = None
+        self._stop_requested = False
+        self._grace = None
+        self._lock = threading.Lock()
+        self._polls = None
+        self._limit = None
+        self._session = None
+        self._undelivered = set()
+        self.sender = None
+        self.stats = PoolStats()
+
+    async def run(self) -> None:
+        """Запускает опрос всех подписчиков до вызова stop()."""
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._stopped = asyncio.Event()
+        if self._stop_requested:
+            self._stop(self._grace)
+        self._limit = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            keepalive_timeout=homework.KEEPALIVE_TIMEOUT,
+        )
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=homework.CONNECT_TIMEOUT,
+            sock_read=homework.READ_TIMEOUT,
+        )
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout,
+            trace_configs=[trace_config(self.stats)],
+        ) as self._session:
+            self.sender = TelegramSender(self._session, self._telegram_token,
+                                         limit=self._limit)
+            subscribers = list(self.registry)
+            for subscriber in subscribers:
+                self.store.restore(subscriber)
+            self._undelivered = {subscriber.id for subscriber in subscribers}
+            offsets = {}
+            self._polls = asyncio.gather(*(
+                self._subscriber_loop(subscriber, offsets.setdefault(
+                    (subscriber.token, subscriber.from_date),
+                    self.interval * index / len(subscribers)
+                ))
+                for index, subscriber in enumerate(subscribers)
+            ))
+            try:
+                await self._polls
+            except asyncio.CancelledError:
+                if not self._stopped.is_set():
+                    raise
+                logging.warning('Остановка: прерваны незавершённые опросы.')
+        self.store.flush()
+
+    def stop(self, grace: float = None) -> None:
+        """Останавливает опрос; можно вызывать из другого потока.
+        Опросы, не закончившиеся за grace секунд, прерываются. Вызванный
+        до run() останавливает его сразу после запуска.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._stop_requested = True
+                self._grace = grace
+                return
+        self._loop.call_soon_threadsafe(self._stop, grace)
+
+    def _stop(self, grace: float) -> None:
+        self._stopped.set()
+        if grace is not None:
+            self._loop.call_later(grace, self._cancel)
+
+    def _cancel(self) -> None:
+        if self._polls is not None:
+            self._polls.cancel()
+
+    async def _subscriber_loop(self, subscriber: Subscriber,
+                               delay: float) -> None:
+        while True:
+            started = time.monotonic()
+            if await self._sleep(delay):
+                return
+            metrics.LOOP_LAG.observe(time.monotonic() - started - delay)
+            if self.registry.get(subscriber.id) is None:
+                return
+            with logs.bind(subscriber=subscriber.id):
+                if subscriber.id in self._undelivered:
+                    await self.redeliver(subscriber)
+                await self.poll(subscriber)
+            delay = self._rendezvous.delay(
+                subscriber, self.policy.next_delay(subscriber)
+            )
+
+    async def _sleep(self, delay: float) -> bool:
+        """Ждёт delay секунд; возвращает True, если пора остановиться."""
+        try:
+            await asyncio.wait_for(self._stopped.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        return self._stopped.is_set()
+
+    async def send(self, chat_id, message: str,
+                   parse_mode: str = None) -> bool:
+        """Отправляет сообщение; общий семафор занимает сам sender."""
+        with profiling.span('send'):
+            return await self.sender.send(chat_id, message, parse_mode)
+
+    async def deliver(self, subscriber: Subscriber, id: int, chat_id,
+                      message: str, parse_mode: str = None) -> None:
+        """Отправляет уведомление из outbox и подтверждает доставку."""
+        if await self.send(chat_id, message, parse_mode):
+            self.store.ack([id])
+        else:
+            self._undelivered.add(subscriber.id)
+
+    async def redeliver(self, subscriber: Subscriber) -> None:
+        """Повторяет недоставленные уведомления подписчика из outbox."""
+        self._undelivered.discard(subscriber.id)
+        for item in self.store.pending(subscriber.id):
+            await self.deliver(subscriber, *item)
+
+    async def report(self, alert: tuple) -> None:
+        """Отправляет сообщение об ошибках, если сводка его выдала."""
+        if alert:
+            await self.send(*alert)
+
+    async def notify(self, subscriber: Subscriber, homeworks: list) -> None:
+        """Уведомляет подписчика и чаты маршрутов о новых изменениях.
+        Чаты получают уведомление параллельно. Изменение запоминается в
+        seen, только когда его сообщения записаны в outbox (см.
+        SeenIndex.dispatch).
+        """
+        error = None
+        for item in homeworks:
+            if not self.seen.admit(subscriber.id, item):
+                continue
+            with logs.bind(homework=key_of(item)):
+                try:
+                    outgoing = [
+                        (self.store.enqueue(subscriber.id, chat_id, message,
+                                            parse_mode),
+                         chat_id, message, parse_mode)
+                        for chat_id, message, parse_mode in routing.render(
+                            subscriber, item
+                        )
+                    ]
+                except Exception as exc:
+                    self.seen.forget(subscriber.id, item)
+                    error = error or exc
+                    continue
+                await asyncio.gather(*(
+                    self.deliver(subscriber, *message) for message in outgoing
+                ))
+        if error is not None:
+            raise error
+
+    def push(self, id: str, homeworks: list) -> bool:
+        """Присланные извне изменения (assistant.push), из любого потока.
+        False - подписчика нет или цикл ещё не запущен.
+        """
+        subscriber = self.registry.get(id)
+        if subscriber is None or self.sender is None:
+            return False
+        asyncio.run_coroutine_threadsafe(
+            self._push(subscriber, homeworks), self._loop
+        )
+        return True
+
+    async def _push(self, subscriber: Subscriber, homeworks: list) -> None:
+        with logs.bind(subscriber=subscriber.id):
+            await self.notify(subscriber, homeworks)
+            self.store.save(subscriber, homeworks)
+
+    async def poll(self, subscriber: Subscriber) -> None:
+        """Один цикл опроса подписчика: запрос, разбор, уведомления."""
+        try:
+            with profiling.cycle(subscriber.id):
+                async with self._limit:
+                    response = await fetch_homeworks(
+                        self._session, subscriber.token,
+                        subscriber.from_date, cache=self.cache,
+                        key=subscriber.id, flights=self.flights
+                    )
+                homeworks = homework.check_response(response)
+                await self.notify(subscriber, homeworks)
+                subscriber.from_date = response['current_date']
+                subscriber.last_error = ''
+                self.policy.observe(subscriber, homeworks)
+                self.store.save(subscriber, homeworks)
+            await self.report(self.alerts.success(subscriber))
+        except Exception as error:
+            metrics.EXCEPTIONS.inc(type=type(error).__name__)
+            if self.cache is not None:
+                self.cache.discard(subscriber.id)
+            self.policy.observe_error(subscriber, error)
+            if str(error) != subscriber.last_error:
+                subscriber.last_error = str(error)
+                self.store.save(subscriber)
+                logging.exception('%r: Сбой в работе программы: %s',
+                                  subscriber, error)
+            await self.report(self.alerts.error(subscriber, error))
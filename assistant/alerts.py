@@ -0,0 +1,170 @@
+"""Сводки об ошибках вместо сообщения о каждой.
+Ошибки различаются по отпечатку (тип, код HTTP, исходное исключение), а
+не по тексту, поэтому чередование таймаута и 502 не порождает поток
+сообщений, а сбой у тысячи подписчиков - тысячу сообщений.
+"""
+import threading
+import time
+
+import homework
+from assistant import messages, metrics
+from assistant.breaker import http_status
+
+SAMPLE_LIMIT = 200
+
+
+def fingerprint(error: Exception) -> str:
+    """Вид ошибки: тип, сервис, код ответа HTTP и тип исходной ошибки."""
+    parts = [type(error).__name__]
+    upstream = getattr(error, 'upstream', None)
+    if upstream:
+        parts.append(upstream)
+    status = http_status(error)
+    if status is not None:
+        parts.append(str(status))
+    cause = error.__cause__ or error.__context__
+    if cause is not None:
+        parts.append(type(cause).__name__)
+    return ':'.join(parts)
+
+
+class ErrorDigest:
+    """Ошибки подписчиков, о которых сообщается в один чат.
+    Первая ошибка после безошибочной работы отправляется сразу и открывает
+    окно window секунд; всё, что случилось дальше, уходит одной сводкой в
+    конце окна: сколько раз и у скольких подписчиков была ошибка каждого
+    вида, сколько восстановилось и сколько ещё с ошибкой. Пока сбой
+    продолжается, окна идут одно за другим - не больше сообщения на окно.
+    Сводка проверяется при каждом вызове error/success, то есть с
+    точностью до ближайшего опроса.
+    """
+
+    def __init__(self, window: float = 600, locale: str = None,
+                 parse_mode: str = None):
+        self.window = window
+        self.locale = locale
+        self.parse_mode = parse_mode
+        self._lock = threading.Lock()
+        self._window_end = None
+        self._errors = {}
+        self._recovered = set()
+        self._failing = {}
+
+    @property
+    def failing(self) -> int:
+        """Подписчиков, у которых последний опрос закончился ошибкой."""
+        return len(self._failing)
+
+    def error(self, scope, error: Exception, now: float = None) -> str:
+        """Учитывает ошибку подписчика scope; возвращает, что отправить."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            incident = not self._failing
+            self._failing[scope] = key = fingerprint(error)
+            self._recovered.discard(scope)
+            if self._window_end is None:
+                self._window_end = now + self.window
+                if incident:
+                    metrics.ALERTS.inc(kind='alert')
+                    return self._render('error', error=error)
+            entry = self._errors.setdefault(
+                key, [0, set(), str(error)[:SAMPLE_LIMIT]]
+            )
+            entry[0] += 1
+            entry[1].add(scope)
+            message = self._flush(now)
+        if message is None:
+            metrics.ALERTS.inc(kind='suppressed')
+        return message
+
+    def success(self, scope, now: float = None) -> str:
+        """Учитывает успешный опрос; возвращает, что отправить."""
+        if self._window_end is None and scope not in self._failing:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._failing.pop(scope, None) is not None:
+                self._recovered.add(scope)
+                if self._window_end is None:
+                    self._window_end = now + self.window
+            return self._flush(now)
+
+    def _flush(self, now: float) -> str:
+        if self._window_end is None or now < self._window_end:
+            return None
+        errors, self._errors = self._errors, {}
+        recovered, self._recovered = self._recovered, set()
+        active = errors or self._failing
+        self._window_end = now + self.window if active else None
+        if not errors and not recovered:
+            return None
+        metrics.ALERTS.inc(kind='digest')
+        return self._digest(errors, recovered)
+
+    def _digest(self, errors: dict, recovered: set) -> str:
+        lines = []
+        if errors:
+            lines.append(
+                self._render('digest', minutes=f'{self.window / 60:g}')
+            )
+        for count, scopes, sample in sorted(
+            errors.values(), key=lambda entry: -entry[0]
+        ):
+            lines.append(self._render(
+                'digest_error', count=count, scopes=len(scopes), error=sample
+            ))
+        if self._failing:
+            if recovered:
+                lines.append(
+                    self._render('digest_recovered', count=len(recovered))
+                )
+            lines.append(
+                self._render('digest_failing', count=len(self._failing))
+            )
+        elif recovered:
+            lines.append(self._render('recovered'))
+        return '\n'.join(lines)
+
+    def _render(self, key: str, **values) -> str:
+        return messages.render(key, self.locale, self.parse_mode, **values)
+
+
+class Alerts:
+    """Сводки об ошибках по чатам: у каждого чата своё окно.
+    С admin_chat_id ошибки всех подписчиков сводятся в чат администратора
+    (на языке и с разметкой по умолчанию), а не отправляются подписчикам.
+    Методы возвращают (чат, сообщение, разметка) или None.
+    """
+
+    def __init__(self, window: float = 600, admin_chat_id=None):
+        self.window = window
+        self.admin_chat_id = admin_chat_id
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    def error(self, subscriber, error: Exception,
+              now: float = None) -> tuple:
+        chat_id, digest = self._digest(subscriber)
+        message = digest.error(subscriber.id, error, now)
+        return message and (chat_id, message, digest.parse_mode)
+
+    def success(self, subscriber, now: float = None) -> tuple:
+        chat_id, digest = self._digest(subscriber, create=False)
+        message = digest and digest.success(subscriber.id, now)
+        return message and (chat_id, message, digest.parse_mode)
+
+    def _digest(self, subscriber, create: bool = True) -> tuple:
+        chat_id = self.admin_chat_id
+        if chat_id is None:
+            chat_id = subscriber.chat_id
+        digest = self._digests.get(chat_id)
+        if digest is None and create:
+            if self.admin_chat_id is None:
+                locale, parse_mode = homework.message_options(subscriber)
+            else:
+                locale, parse_mode = homework.LOCALE, homework.PARSE_MODE
+            with self._lock:
+                digest = self._digests.setdefault(
+                    chat_id, ErrorDigest(self.window, locale, parse_mode)
+                )
+        return chat_id, digest
@@ -0,0 +1,249 @@
+"""Восстановление истории подписчиков (backfill) без рассылки уведомлений.
+Историю с даты since разбивает на окна по window секунд и опрашивает их
+параллельно (workers потоков, не больше rate запросов в секунду). API
+знает только нижнюю границу from_date, поэтому верхнюю границу окна
+отрезает сам backfill по date_updated работы. Статусы работ попадают в
+хранилище состояния, курсор получают только подписчики, которых в нём ещё
+не было. Уведомления не отправляются; с summary каждому подписчику уходит
+одна сводка.
+
+Запуск (подписчики - из --subscribers, SUBSCRIBERS_FILE или
+PRACTICUM_TOKEN и TELEGRAM_CHAT_ID):
+
+    python -m assistant.backfill --since 2024-01-01 --window 7 --rate 5
+"""
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from functools import partial
+
+import homework
+from assistant import logs, messages
+from assistant.records import Homework
+from assistant.registry import Subscriber, SubscriptionRegistry
+from assistant.sender import TokenBucket
+from assistant.state import MemoryStore
+
+DAY = 24 * 60 * 60
+
+
+def timestamp_of(value: str) -> int:
+    """Дата ISO 8601 (2024-01-31, 2024-01-31T12:00:00Z) или unix-время."""
+    if value.isdigit():
+        return int(value)
+    # fromisoformat понимает суффикс Z только с Python 3.11.
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def updated_at(item: Homework) -> float:
+    """Время изменения работы; None - если его нет или не разобрать."""
+    try:
+        return timestamp_of(item.date_updated)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class Backfill:
+    """Восстанавливает статусы работ подписчиков за [since, until).
+    Окна одного подписчика и разных подписчиков опрашиваются вперемешку;
+    результаты подписчика записываются в store одной пачкой, когда готовы
+    все его окна. Работы без date_updated относятся к первому окну.
+    send(chat_id, текст, разметка), если передан, отправляет сводку.
+    """
+
+    def __init__(self, subscribers: list, store: MemoryStore, since: int,
+                 until: int = None, window: int = 0, workers: int = 8,
+                 rate: float = 10.0, progress: float = 5.0, send=None):
+        self.subscribers = list(subscribers)
+        self.store = store
+        self.since = since
+        self.until = until
+        self.window = window
+        self.workers = workers
+        self.bucket = TokenBucket(rate, capacity=1) if rate else None
+        self.progress = progress
+        self.send = send
+        self.stats = {
+            'windows': 0, 'done': 0, 'failed': 0, 'homeworks': 0,
+            'skipped': 0, 'subscribers': 0, 'summaries': 0,
+        }
+        self._lock = threading.Lock()
+
+    def windows(self) -> list:
+        """Окна (from_date, до) по возрастанию; у последнего до - None."""
+        until = self.until or int(time.time())
+        if not self.window or self.since + self.window >= until:
+            return [(self.since, self.until)]
+        starts = list(range(self.since, until, self.window))
+        return [
+            (start, start + self.window) for start in starts[:-1]
+        ] + [(starts[-1], self.until)]
+
+    def run(self) -> dict:
+        """Опрашивает все окна всех подписчиков; возвращает счётчики."""
+        windows = self.windows()
+        results = {
+            subscriber.id: [None] * len(windows)
+            for subscriber in self.subscribers
+        }
+        self.stats['windows'] = len(windows) * len(self.subscribers)
+        started = reported = time.monotonic()
+        with ThreadPoolExecutor(self.workers,
+                                thread_name_prefix='backfill') as executor:
+            futures = {
+                executor.submit(self.fetch, subscriber, start, end, index):
+                    (subscriber, index)
+                for index, (start, end) in enumerate(windows)
+                for subscriber in self.subscribers
+            }
+            for future in as_completed(futures):
+                subscriber, index = futures[future]
+                parts = results[subscriber.id]
+                parts[index] = future.result()
+                if all(part is not None for part in parts):
+                    self.finish(subscriber, parts)
+                    del results[subscriber.id]
+                if time.monotonic() - reported >= self.progress:
+                    reported = time.monotonic()
+                    self.report(reported - started)
+        self.store.flush()
+        self.report(time.monotonic() - started)
+        return self.stats
+
+    def fetch(self, subscriber: Subscriber, start: int, end: int,
+              index: int) -> tuple:
+        """Работы подписчика, изменённые в окне, и current_date ответа.
+        При ошибке - (None, None).
+        """
+        if self.bucket is not None:
+            self.bucket.acquire()
+        try:
+            with logs.bind(subscriber=subscriber.id):
+                response = homework.request_homeworks(subscriber.token,
+                                                      start)
+                homeworks = homework.check_response(response)
+        except Exception as error:
+            logging.warning('Backfill %r с %s: %s', subscriber, start, error)
+            with self._lock:
+                self.stats['failed'] += 1
+            return None, None
+        selected = []
+        for item in homeworks:
+            if not isinstance(item, Homework):
+                if index == 0:
+                    with self._lock:
+                        self.stats['skipped'] += 1
+                continue
+            changed = updated_at(item)
+            if changed is None:
+                if index == 0:
+                    selected.append(item)
+            elif end is None or changed < end:
+                selected.append(item)
+        with self._lock:
+            self.stats['done'] += 1
+        return selected, response.get('current_date')
+
+    def finish(self, subscriber: Subscriber, parts: list) -> None:
+        """Записывает результаты всех окон подписчика в store."""
+        homeworks = [
+            item for selected, _ in parts if selected for item in selected
+        ]
+        homeworks.sort(key=lambda item: updated_at(item) or 0)
+        complete = all(selected is not None for selected, _ in parts)
+        current_date = parts[-1][1]
+        if not self.store.restore(subscriber) and complete and current_date:
+            # Новый подписчик: опрос начнётся с конца восстановленной
+            # истории, а не разошлёт её заново.
+            subscriber.from_date = current_date
+        self.store.save(subscriber, homeworks)
+        with self._lock:
+            self.stats['homeworks'] += len(homeworks)
+            self.stats['subscribers'] += 1
+        if self.send is not None and complete:
+            self.summarize(subscriber, homeworks)
+
+    def summarize(self, subscriber: Subscriber, homeworks: list) -> None:
+        """Отправляет подписчику сводку: число работ и последний статус."""
+        locale, parse_mode = homework.message_options(subscriber)
+        text = messages.render('backfill', locale, parse_mode,
+                               count=len(homeworks))
+        if homeworks:
+            text += '\n' + homework.format_status(homeworks[-1], locale,
+                                                  parse_mode)
+        if self.send(subscriber.chat_id, text, parse_mode):
+            with self._lock:
+                self.stats['summaries'] += 1
+
+    def report(self, elapsed: float) -> None:
+        """Пишет в лог прогресс и оценку оставшегося времени."""
+        with self._lock:
+            stats = dict(self.stats)
+        finished = stats['done'] + stats['failed']
+        speed = finished / elapsed if elapsed else 0.0
+        left = (stats['windows'] - finished) / speed if speed else 0.0
+        logging.info(
+            'Backfill: окон %s/%s (ошибок %s), подписчиков %s, работ %s, '
+            '%.1f запросов/с, осталось ~%.0f с.', finished,
+            stats['windows'], stats['failed'], stats['subscribers'],
+            stats['homeworks'], speed, left
+        )
+
+
+def load_subscribers(path: str = None) -> list:
+    """Подписчики из файла реестра или единственный из переменных."""
+    path = path or homework.SUBSCRIBERS_FILE
+    if path:
+        return list(SubscriptionRegistry.load(path))
+    if not homework.PRACTICUM_TOKEN:
+        raise SystemExit('Нет подписчиков: задайте --subscribers, '
+                         'SUBSCRIBERS_FILE или PRACTICUM_TOKEN.')
+    return [Subscriber(homework.PRACTICUM_TOKEN, homework.TELEGRAM_CHAT_ID)]
+
+
+def main(argv: list = None) -> dict:
+    """Запуск backfill из командной строки."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--since', required=True, type=timestamp_of,
+                        help='начало истории: дата или unix-время')
+    parser.add_argument('--until', type=timestamp_of,
+                        help='конец истории (по умолчанию - сейчас)')
+    parser.add_argument('--window', type=float, default=0,
+                        help='длина окна, дней (0 - одно окно)')
+    parser.add_argument('--subscribers', help='файл реестра подписчиков')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=10,
+                        help='запросов к API в секунду (0 - без ограничения)')
+    parser.add_argument('--progress', type=float, default=5,
+                        help='как часто писать прогресс, с')
+    parser.add_argument('--summary', action='store_true',
+                        help='отправить каждому подписчику одну сводку')
+    args = parser.parse_args(argv)
+    homework.init_logging(logging.INFO)
+    homework.init_session(args.workers)
+    send = partial(homework.deliver, homework.make_bot()) if (
+        args.summary
+    ) else None
+    store = homework.init_store()
+    try:
+        return Backfill(
+            load_subscribers(args.subscribers), store, args.since,
+            args.until, int(args.window * DAY), args.workers, args.rate,
+            args.progress, send
+        ).run()
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
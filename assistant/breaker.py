@@ -0,0 +1,120 @@
+"""Предохранитель (circuit breaker) для внешних сервисов.
+Один предохранитель на сервис (API Практикума, Telegram) в процессе, общий
+для всех подписчиков: пока сервис лежит, запросы к нему не уходят вовсе,
+а раз в reset_timeout секунд один пробный запрос проверяет, не ожил ли он.
+"""
+import sys
+import threading
+import time
+
+import exceptions as _
+from assistant import metrics
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+def http_status(error: Exception) -> int:
+    """Код ответа HTTP из исключения aiohttp или requests, иначе None."""
+    status = getattr(error, 'status', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code',
+                         None)
+    return status if isinstance(status, int) else None
+
+
+def loaded(module: str, name: str) -> tuple:
+    """(класс name из module,), если модуль уже загружен, иначе ().
+    Исключений незагруженной библиотеки быть не может, и импортировать её
+    ради isinstance незачем.
+    """
+    found = getattr(sys.modules.get(module), name, None)
+    return (found,) if found is not None else ()
+
+
+def upstream_failure(error: Exception) -> bool:
+    """True, если ошибка - признак недоступности сервиса.
+    Ошибки конкретного запроса (4xx, неверный токен, чат не найден)
+    предохранитель не размыкают: сервис ответил.
+    """
+    status = http_status(error)
+    if status is not None:
+        return status >= 500
+    if isinstance(error, loaded('telegram.error', 'BadRequest')):
+        return False
+    return isinstance(error, (
+        OSError, _.RequestToEndpointFailed,
+        *loaded('telegram.error', 'NetworkError'),
+        *loaded('aiohttp', 'ClientConnectionError'),
+    ))
+
+
+class CircuitBreaker:
+    """Предохранитель одного сервиса.
+    Замкнут -> (failure_threshold ошибок подряд) -> разомкнут ->
+    (reset_timeout секунд) -> полуразомкнут: проходит один пробный запрос;
+    успех замыкает предохранитель, ошибка снова размыкает.
+    Используется как контекстный менеджер вокруг запроса к сервису; при
+    разомкнутом предохранителе вход бросает CircuitOpen.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 reset_timeout: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._last_error = ''
+        self._lock = threading.Lock()
+        metrics.BREAKER_STATE.set(0, upstream=name)
+
+    def allow(self, now: float = None) -> None:
+        """Пропускает запрос или бросает CircuitOpen."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            wait = self._opened_at + self.reset_timeout - now
+            if self.state == OPEN and wait <= 0:
+                self._set_state(HALF_OPEN)
+                return
+            self.rejected += 1
+        metrics.BREAKER_REJECTED.inc(upstream=self.name)
+        raise _.CircuitOpen(
+            self.name, self._last_error,
+            retry_after=wait if wait > 0 else None
+        )
+
+    def record(self, error: Exception = None, now: float = None) -> None:
+        """Учитывает исход пропущенного запроса (error=None - успех)."""
+        if error is not None and not upstream_failure(error):
+            error = None
+        with self._lock:
+            if error is None:
+                self.failures = 0
+                if self.state != CLOSED:
+                    self._set_state(CLOSED)
+                return
+            self.failures += 1
+            self._last_error = str(error)
+            if self.state == HALF_OPEN or (
+                self.failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic() if now is None else now
+                self._set_state(OPEN)
+
+    def __enter__(self):
+        self.allow()
+        return self
+
+    def __exit__(self, exc_type, error, traceback):
+        self.record(error)
+        return False
+
+    def _set_state(self, state: str) -> None:
+        """Вызывается под self._lock."""
+        self.state = state
+        metrics.BREAKER_STATE.set(STATE_VALUES[state], upstream=self.name)
@@ -0,0 +1,109 @@
+"""Кэш ответов API: условные запросы и отсев неизменившихся ответов."""
+import hashlib
+import threading
+
+import exceptions as _
+from assistant import metrics
+from assistant.schema import load_response
+
+
+class CacheEntry:
+    """Валидаторы и отпечаток последнего ответа одному подписчику."""
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'current_date')
+
+    def __init__(self, etag, last_modified, digest, current_date):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.current_date = current_date
+
+
+class ResponseCache:
+    """Запоминает ETag/Last-Modified и хэш тела ответа по ключу подписчика.
+    Запрос отправляется с If-None-Match/If-Modified-Since; на 304, как и на
+    тело, совпавшее с предыдущим байт в байт, возвращается ответ без новых
+    работ - без разбора JSON. Ключ должен быть свой у каждого подписчика:
+    «ответ не изменился» означает, что его уже обработал именно он.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.not_modified_hits = 0
+        self.unchanged_hits = 0
+        self.misses = 0
+
+    def validators(self, key) -> dict:
+        """Заголовки условного запроса для подписчика."""
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def not_modified(self, key) -> dict:
+        """Ответ API для 304 Not Modified."""
+        entry = self._entries.get(key)
+        if entry is None:
+            raise _.RequestToEndpointFailed('304 без сохранённого ответа')
+        self._count('not_modified')
+        return {'homeworks': [], 'current_date': entry.current_date}
+
+    def load(self, key, body: bytes, headers, parse=None) -> dict:
+        """Разбирает тело ответа 200, если оно изменилось.
+        parse() - готовый разбор тела, общий для нескольких подписчиков.
+        """
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        entry = self._entries.get(key)
+        if entry is not None and entry.digest == digest:
+            self._count('unchanged')
+            return {'homeworks': [], 'current_date': entry.current_date}
+        self._count('miss')
+        response = parse() if parse is not None else load_response(body)
+        current_date = (
+            response.get('current_date') if isinstance(response, dict)
+            else None
+        )
+        self._entries[key] = CacheEntry(
+            headers.get('ETag'), headers.get('Last-Modified'), digest,
+            current_date
+        )
+        return response
+
+    def discard(self, key) -> None:
+        """Забывает ответ подписчику, чей цикл опроса упал.
+        Запись появляется, как только прочитано тело, а цикл может упасть
+        позже; без неё повтор с тем же from_date получит то же тело как
+        «неизменившееся» и сдвинет курсор мимо неотправленных работ.
+        Следующий запрос будет безусловным, а ответ - разобран целиком.
+        """
+        self._entries.pop(key, None)
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.not_modified_hits + self.unchanged_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        """Счётчики кэша."""
+        return {
+            'not_modified': self.not_modified_hits,
+            'unchanged': self.unchanged_hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+        }
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            if result == 'not_modified':
+                self.not_modified_hits += 1
+            elif result == 'unchanged':
+                self.unchanged_hits += 1
+            else:
+                self.misses += 1
+        metrics.CACHE_LOOKUPS.inc(result=result)
@@ -0,0 +1,110 @@
+"""Индекс уже доставленных изменений статуса."""
+import threading
+import time
+from collections import OrderedDict
+
+from assistant.records import Homework, key_of
+
+
+class SeenIndex:
+    """Ограниченное множество уже отправленных изменений статуса.
+    Ключ - (подписчик, id работы, статус, date_updated); повторы
+    отсеиваются до parse_status. Повторы появляются при перекрытии окон
+    from_date и повторных запросах.
+    Размер ограничен max_size (вытесняются давно не встречавшиеся ключи),
+    а ключи старше ttl секунд забываются.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 7 * 24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.admitted = 0
+        self.suppressed = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(scope, homework) -> tuple:
+        """Ключ изменения статуса или None, если работу не опознать."""
+        if isinstance(homework, Homework):
+            return (scope, homework.key, homework.status,
+                    homework.date_updated)
+        if not isinstance(homework, dict) or 'status' not in homework:
+            return None
+        return (
+            scope,
+            key_of(homework),
+            homework['status'],
+            homework.get('date_updated'),
+        )
+
+    def admit(self, scope, homework, now: float = None) -> bool:
+        """True, если изменение новое (и запоминает его), False - повтор."""
+        key = self.key(scope, homework)
+        if key is None:
+            return True
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                self._seen[key] = now
+                self.suppressed += 1
+                return False
+            self._seen[key] = now
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            self.admitted += 1
+            return True
+
+    def filter(self, scope, homeworks: list) -> list:
+        """Оставляет только новые изменения статуса."""
+        return [item for item in homeworks if self.admit(scope, item)]
+
+    def forget(self, scope, homework) -> None:
+        """Забывает изменение: следующий admit снова сочтёт его новым."""
+        key = self.key(scope, homework)
+        if key is not None:
+            with self._lock:
+                if self._seen.pop(key, None) is not None:
+                    self.admitted -= 1
+
+    def dispatch(self, scope, homeworks: list, send) -> int:
+        """Вызывает send(работа) для каждого нового изменения статуса.
+        Изменение, на котором send упал, забывается, а остальные всё равно
+        отправляются; первая ошибка пробрасывается после них, чтобы цикл
+        не сдвинул курсор и повторил неотправленное. Возвращает число
+        отправленных изменений.
+        """
+        sent, error = 0, None
+        for item in homeworks:
+            if not self.admit(scope, item):
+                continue
+            try:
+                send(item)
+            except Exception as exc:
+                self.forget(scope, item)
+                error = error or exc
+                continue
+            sent += 1
+        if error is not None:
+            raise error
+        return sent
+
+    def snapshot(self) -> dict:
+        """Счётчики индекса."""
+        return {
+            'size': len(self._seen),
+            'admitted': self.admitted,
+            'suppressed': self.suppressed,
+        }
+
+    def __len__(self):
+        return len(self._seen)
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl:
+                break
+            del self._seen[key]
@@ -0,0 +1,293 @@
+"""Планировщик опроса API для множества подписчиков в одном процессе."""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import homework
+from assistant import logs, metrics, profiling, routing
+from assistant.alerts import Alerts
+from assistant.cache import ResponseCache
+from assistant.dedup import SeenIndex
+from assistant.flight import Rendezvous, SingleFlight
+from assistant.intervals import AdaptiveInterval
+from assistant.records import key_of
+from assistant.registry import SubscriptionRegistry, Subscriber
+from assistant.sender import SendQueue
+from assistant.state import MemoryStore
+
+
+class PollEngine:
+    """Опрашивает API за всех подписчиков реестра.
+    Очередь опросов - куча по времени следующего запроса, сами запросы
+    выполняет пул потоков. Число одновременных опросов ограничено размером
+    пула, поэтому медленный ответ одного подписчика не задерживает остальных.
+    Паузу между опросами подписчика выбирает policy (по умолчанию
+    AdaptiveInterval с базовым интервалом interval), курсоры и статусы
+    сохраняются в store. Если передана очередь queue, сообщения уходят
+    через неё, не задерживая опрос; уведомления подписчиков записываются
+    в outbox store до того, как store.save сдвинет курсор (при отправке
+    через очередь - если у неё есть outbox), а недоставленные в прошлый
+    запуск отправляются при постановке подписчика в опрос. С кэшем
+    ответов cache запросы к API условные, а неизменившиеся ответы не
+    разбираются; после сбоя цикла ответ подписчику забывается. Одинаковые
+    одновременные запросы подписчиков с общим токеном объединяются
+    (flights), а их опросы назначаются на одно время. Об ошибках сообщают
+    сводки alerts (по умолчанию - по ERROR_WINDOW и ADMIN_CHAT_ID).
+    После stop() новые опросы не начинаются, а начатые дорабатывают.
+    """
+
+    def __init__(self, registry: SubscriptionRegistry, bot,
+                 interval: float = homework.RETRY_TIME, workers: int = 16,
+                 policy: AdaptiveInterval = None,
+                 store: MemoryStore = None, seen: SeenIndex = None,
+                 queue: SendQueue = None, cache: ResponseCache = None,
+                 alerts: Alerts = None, flights: SingleFlight = None):
+        self.registry = registry
+        self.bot = bot
+        self.queue = queue
+        self.cache = cache
+        self.flights = flights or SingleFlight()
+        self._rendezvous = Rendezvous()
+        self.interval = interval
+        self.policy = policy or AdaptiveInterval(interval)
+        self.store = store or MemoryStore()
+        if seen is None:
+            seen = SeenIndex(homework.DEDUP_SIZE, homework.DEDUP_TTL)
+        self.seen = seen
+        self.alerts = alerts or Alerts(
+            homework.ERROR_WINDOW, homework.ADMIN_CHAT_ID
+        )
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='poll'
+        )
+        self._heap = []
+        self._planned = {}
+        self._active = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._grace = None
+
+    def schedule(self, subscriber: Subscriber, delay: float = 0.0) -> None:
+        """Ставит опрос подписчика в очередь через delay секунд.
+        Прежний план опроса подписчика, если он был, отменяется.
+        """
+        with self._cond:
+            seq = next(self._seq)
+            self._planned[subscriber.id] = seq
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, seq, subscriber.id)
+            )
+            self._cond.notify()
+
+    def start(self) -> None:
+        """Восстанавливает курсоры и планирует первый опрос.
+        Первые опросы равномерно распределяются на интервал.
+        """
+        self._spread(list(self.registry))
+
+    def assign(self, subscribers: list) -> None:
+        """Берёт подписчиков в опрос на ходу (курсоры - из store)."""
+        self._spread([
+            self.registry.add(item.token, item.chat_id, item.from_date,
+                              item.locale, item.parse_mode, item.routes)
+            for item in subscribers
+        ])
+
+    def revoke(self, ids: list, timeout: float = None) -> bool:
+        """Снимает подписчиков с опроса и дожидается их текущих опросов.
+        Их ещё не отправленные уведомления очередь отправки оставляет в
+        outbox (SendQueue.withdraw). После возврата True движок их больше
+        не опрашивает и не отправляет, а курсоры и outbox записаны в
+        store - подписчиков можно отдавать другому процессу.
+        """
+        ids = set(ids)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            for id in ids:
+                self.registry.remove(id)
+                self._planned.pop(id, None)
+            done = self._cond.wait_for(
+                lambda: not self._active & ids, timeout
+            )
+        if self.queue is not None:
+            left = None if deadline is None else max(
+                0.0, deadline - time.monotonic()
+            )
+            done = self.queue.withdraw(ids, left) and done
+        self.store.flush()
+        return done
+
+    def run(self) -> None:
+        """Основной цикл: выдаёт подошедшие опросы в пул потоков."""
+        self.start()
+        while True:
+            due, subscriber = self._next_due()
+            if subscriber is None:
+                break
+            metrics.LOOP_LAG.observe(time.monotonic() - due)
+            self._executor.submit(self._run_poll, subscriber)
+        self._drain()
+
+    def stop(self, grace: float = None) -> None:
+        """Останавливает цикл планировщика.
+        run() дожидается начатых опросов не дольше grace секунд (None - без
+        ограничения) и записывает курсоры в store.
+        """
+        with self._cond:
+            self._stopped = True
+            self._grace = grace
+            self._cond.notify_all()
+
+    def _spread(self, subscribers: list) -> None:
+        offsets = {}
+        for index, subscriber in enumerate(subscribers):
+            self.store.restore(subscriber)
+            self.redeliver(subscriber)
+            # Подписчики с общим токеном и курсором - в одно время.
+            self.schedule(subscriber, offsets.setdefault(
+                (subscriber.token, subscriber.from_date),
+                self.interval * index / len(subscribers)
+            ))
+
+    def _next_due(self):
+        """Ждёт подошедший опрос и свободный поток; (None, None) - стоп."""
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                free = len(self._active) < self.workers
+                if free and self._heap and self._heap[0][0] <= now:
+                    due, seq, id = heapq.heappop(self._heap)
+                    if self._planned.get(id) != seq:
+                        continue
+                    subscriber = self.registry.get(id)
+                    if subscriber is None:
+                        self._planned.pop(id, None)
+                        continue
+                    self._active.add(id)
+                    return due, subscriber
+                timeout = (
+                    self._heap[0][0] - now if free and self._heap else None
+                )
+                self._cond.wait(timeout)
+        return None, None
+
+    def _drain(self) -> None:
+        with self._cond:
+            done = self._cond.wait_for(lambda: not self._active, self._grace)
+            left = len(self._active)
+        if not done:
+            logging.warning('Остановка: не дождались опросов: %s.', left)
+        self._executor.shutdown(wait=done, cancel_futures=True)
+        self.store.flush()
+
+    def _run_poll(self, subscriber: Subscriber) -> None:
+        try:
+            with logs.bind(subscriber=subscriber.id):
+                self.poll(subscriber)
+        finally:
+            delay = self.policy.next_delay(subscriber)
+            with self._cond:
+                self._active.discard(subscriber.id)
+                if self.registry.get(subscriber.id) is subscriber:
+                    self.schedule(
+                        subscriber, self._rendezvous.delay(subscriber, delay)
+                    )
+                self._cond.notify_all()
+
+    def send(self, chat_id, message: str, parse_mode: str = None,
+             owner: str = None) -> None:
+        """Отправляет сообщение напрямую или через очередь отправки.
+        Сообщение подписчика owner проходит через outbox.
+        """
+        with profiling.span('send'):
+            if self.queue is not None:
+                self.queue.send(chat_id, message, parse_mode, owner)
+                return
+            id = None
+            if owner is not None:
+                id = self.store.enqueue(owner, chat_id, message, parse_mode)
+            delivered = homework.deliver(self.bot, chat_id, message,
+                                         parse_mode)
+            if delivered and id is not None:
+                self.store.ack([id])
+
+    def send_many(self, messages: list, owner: str = None) -> None:
+        """Рассылает сообщения [(chat_id, текст, разметка), ...].
+        Очередь отправки рассылает их по чатам параллельно, без неё они
+        отправляются по одному.
+        """
+        if self.queue is None:
+            for chat_id, message, parse_mode in messages:
+                self.send(chat_id, message, parse_mode, owner)
+            return
+        with profiling.span('send'):
+            self.queue.send_many(messages, owner)
+
+    def redeliver(self, subscriber: Subscriber) -> None:
+        """Отправляет недоставленные уведомления подписчика из outbox."""
+        if self.queue is not None:
+            self.queue.redeliver(subscriber.id)
+            return
+        for id, chat_id, message, parse_mode in self.store.pending(
+            subscriber.id
+        ):
+            if homework.deliver(self.bot, chat_id, message, parse_mode):
+                self.store.ack([id])
+
+    def report(self, alert: tuple) -> None:
+        """Отправляет сообщение об ошибках, если сводка его выдала."""
+        if alert:
+            self.send(*alert)
+
+    def notify(self, subscriber: Subscriber, homeworks: list) -> None:
+        """Уведомляет подписчика и чаты маршрутов о новых изменениях."""
+        def send(item):
+            with logs.bind(homework=key_of(item)):
+                self.send_many(routing.render(subscriber, item),
+                               subscriber.id)
+
+        self.seen.dispatch(subscriber.id, homeworks, send)
+
+    def push(self, id: str, homeworks: list) -> bool:
+        """Присланные извне изменения (assistant.push); курсор не двигается.
+        False - подписчика нет в опросе этого движка.
+        """
+        subscriber = self.registry.get(id)
+        if subscriber is None:
+            return False
+        with logs.bind(subscriber=id):
+            self.notify(subscriber, homeworks)
+            self.store.save(subscriber, homeworks)
+        return True
+
+    def poll(self, subscriber: Subscriber) -> None:
+        """Один цикл опроса подписчика: запрос, разбор, уведомления."""
+        try:
+            with profiling.cycle(subscriber.id):
+                response = homework.request_homeworks(
+                    subscriber.token, subscriber.from_date,
+                    cache=self.cache, key=subscriber.id, flights=self.flights
+                )
+                homeworks = homework.check_response(response)
+                self.notify(subscriber, homeworks)
+                subscriber.from_date = response['current_date']
+                subscriber.last_error = ''
+                self.policy.observe(subscriber, homeworks)
+                self.store.save(subscriber, homeworks)
+            self.report(self.alerts.success(subscriber))
+        except Exception as error:
+            metrics.EXCEPTIONS.inc(type=type(error).__name__)
+            if self.cache is not None:
+                self.cache.discard(subscriber.id)
+            self.policy.observe_error(subscriber, error)
+            if str(error) != subscriber.last_error:
+                subscriber.last_error = str(error)
+                self.store.save(subscriber)
+                logging.exception('%r: Сбой в работе программы: %s',
+                                  subscriber, error)
+            self.report(self.alerts.error(subscriber, error))
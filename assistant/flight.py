@@ -0,0 +1,150 @@
+"""Объединение одинаковых одновременных запросов к API (single-flight).
+Один токен бывает зарегистрирован для нескольких чатов (студент и группа
+наставника). Пока запрос с тем же токеном, from_date и валидаторами кэша
+выполняется, остальные опросы не идут в сеть, а ждут его ответ (или
+исключение). Ответ - Reply: тело разбирается один раз на всех, а кэш
+ответов каждый участник обновляет по своему ключу.
+"""
+import asyncio
+import threading
+import time
+from http import HTTPStatus
+
+from assistant import metrics, profiling
+from assistant.schema import load_response
+
+
+class Reply:
+    """Ответ API 200 или 304, общий для всех участников запроса."""
+
+    __slots__ = ('status', 'body', 'headers', '_parsed', '_lock')
+
+    def __init__(self, status: int, body: bytes, headers):
+        self.status = status
+        self.body = body
+        self.headers = headers
+        self._parsed = None
+        self._lock = threading.Lock()
+
+    def parse(self) -> dict:
+        """Разобранное тело; разбирается при первом обращении."""
+        with self._lock:
+            if self._parsed is None:
+                self._parsed = load_response(self.body)
+            return self._parsed
+
+    def result(self, cache=None, key=None) -> dict:
+        """Ответ для подписчика key, как у homework.request_homeworks."""
+        if cache is not None and self.status == HTTPStatus.NOT_MODIFIED:
+            return cache.not_modified(key)
+        with profiling.span('decode'):
+            if cache is not None:
+                return cache.load(key, self.body, self.headers, self.parse)
+            return self.parse()
+
+
+class Rendezvous:
+    """Общее время следующего опроса подписчиков с одним токеном и курсором.
+    Первый опрошенный назначает время, остальные опрашиваются тогда же:
+    иначе паузы со случайным разбросом разведут их запросы и объединять
+    будет нечего. Не потокобезопасен: вызывающий держит свою блокировку.
+    """
+
+    def __init__(self):
+        self._due = {}
+        self._limit = 64
+
+    def delay(self, subscriber, delay: float) -> float:
+        """Пауза до опроса подписчика: своя delay или общая."""
+        now = time.monotonic()
+        key = (subscriber.token, subscriber.from_date)
+        due = self._due.get(key)
+        if due is None or due <= now:
+            if len(self._due) >= self._limit:
+                self._due = {
+                    key: due for key, due in self._due.items() if due > now
+                }
+                self._limit = 2 * len(self._due) + 64
+            due = self._due[key] = now + delay
+        return due - now
+
+
+class Call:
+    """Выполняющийся запрос и его итог."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Объединение запросов для потоков (PollEngine)."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.shared = 0
+
+    @staticmethod
+    def key(headers: dict, params: dict) -> tuple:
+        """Ключ запроса: заголовки (токен, валидаторы) и параметры."""
+        return tuple(sorted(headers.items())), tuple(sorted(params.items()))
+
+    def do(self, key, function, *args):
+        """Вызов function(*args); одновременные с тем же key ждут первый."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Call()
+                self.sent += 1
+            else:
+                self.shared += 1
+        if not leader:
+            metrics.REQUESTS_COALESCED.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function(*args)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def snapshot(self) -> dict:
+        """Счётчики: запросов отправлено и сэкономлено."""
+        total = self.sent + self.shared
+        return {
+            'sent': self.sent,
+            'shared': self.shared,
+            'saved': self.shared / total if total else 0.0,
+        }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """Объединение запросов для event loop (AsyncEngine).
+    Запрос выполняется отдельной задачей: отмена одного участника не
+    отменяет его для остальных.
+    """
+
+    async def do(self, key, function, *args):
+        """Ожидание function(*args); одновременные с тем же key ждут первый."""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(function(*args))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.sent += 1
+        else:
+            self.shared += 1
+            metrics.REQUESTS_COALESCED.inc()
+        return await asyncio.shield(task)
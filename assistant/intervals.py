@@ -0,0 +1,90 @@
+"""Адаптивный интервал опроса вместо фиксированного RETRY_TIME."""
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import exceptions as _
+import homework
+from assistant.records import Status, status_of
+
+
+def retry_after(error: Exception) -> float:
+    """Секунды из заголовка Retry-After ответа с ошибкой или None.
+    Понимает исключения requests (error.response.headers) и aiohttp
+    (error.headers); заголовок может быть числом секунд или HTTP-датой.
+    У отказа предохранителя (CircuitOpen) - время до пробного запроса.
+    """
+    if isinstance(error, _.CircuitOpen):
+        return error.retry_after
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or getattr(
+        error, 'headers', None
+    )
+    value = headers.get('Retry-After') if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveInterval:
+    """Выбирает паузу до следующего опроса подписчика.
+    - работа на ревью: опрашиваем чаще (reviewing);
+    - после ошибок: экспоненциальная задержка от base до max_interval;
+    - долгое затишье: интервал растёт пропорционально времени без изменений
+      (каждые idle_after секунд ещё на base), но не больше max_interval;
+    - Retry-After от сервера соблюдается всегда.
+    Ко всем интервалам добавляется случайный разброс ±jitter, чтобы опросы
+    подписчиков не синхронизировались.
+    """
+
+    def __init__(self, base: float = homework.RETRY_TIME,
+                 reviewing: float = homework.REVIEWING_RETRY_TIME,
+                 max_interval: float = homework.MAX_RETRY_TIME,
+                 idle_after: float = homework.IDLE_AFTER,
+                 jitter: float = 0.1):
+        self.base = base
+        self.reviewing = min(reviewing, base)
+        self.max_interval = max(max_interval, base)
+        self.idle_after = idle_after
+        self.jitter = jitter
+
+    def observe(self, subscriber, homeworks: list, now: float = None) -> None:
+        """Учитывает успешный ответ API."""
+        subscriber.errors = 0
+        subscriber.retry_after = None
+        if homeworks:
+            subscriber.changed_at = time.time() if now is None else now
+            reviewing = any(
+                status_of(item) == Status.REVIEWING for item in homeworks
+            )
+            subscriber.status = (
+                Status.REVIEWING if reviewing else status_of(homeworks[0])
+            )
+
+    def observe_error(self, subscriber, error: Exception) -> None:
+        """Учитывает неудачный опрос."""
+        subscriber.errors += 1
+        subscriber.retry_after = retry_after(error)
+
+    def next_delay(self, subscriber, now: float = None) -> float:
+        """Пауза в секундах до следующего опроса подписчика."""
+        now = time.time() if now is None else now
+        if subscriber.errors:
+            delay = self.base * 2 ** (subscriber.errors - 1)
+        elif subscriber.status == 'reviewing':
+            delay = self.reviewing
+        else:
+            idle = now - subscriber.changed_at
+            delay = self.base * (1 + max(0.0, idle) // self.idle_after)
+        delay = min(delay, self.max_interval)
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if subscriber.retry_after:
+            delay = max(delay, subscriber.retry_after)
+        return delay
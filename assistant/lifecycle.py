@@ -0,0 +1,124 @@
+"""Остановка по SIGTERM/SIGINT без потери отправляемых сообщений.
+Сигнал прерывает паузу между опросами и останавливает планировщик;
+дальше у процесса timeout секунд на то, чтобы дождаться начатых опросов,
+отправить очередь сообщений и записать курсоры. Повторный сигнал
+завершает процесс сразу.
+
+Ядро доставляет сигнал любому потоку процесса, а обработчик Python
+выполняется только в главном - когда тот вернётся из ожидания, то есть
+иногда через весь интервал опроса. Поэтому сигнал принимается через
+wakeup fd (его пишет обработчик уровня C в любом потоке) отдельным
+потоком signals, и остановка запускается оттуда.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from assistant import logs
+
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Shutdown:
+    """Запрос остановки и общий срок на завершение работы.
+    Обработчики on_stop вызываются один раз, в потоке signals (или
+    вызвавшем request), поэтому должны только будить ожидающих.
+    """
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+        self.deadline = None
+        self.signals = 0
+        self._event = threading.Event()
+        self._callbacks = []
+        self._installed = ()
+        self._handlers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stopping(self) -> bool:
+        """Остановка запрошена."""
+        return self._event.is_set()
+
+    def install(self, signals: tuple = SIGNALS) -> 'Shutdown':
+        """Перехватывает сигналы signals (только из главного потока)."""
+        reader, writer = socket.socketpair()
+        writer.setblocking(False)
+        self._installed = signals
+        for signum in signals:
+            signal.signal(signum, self._on_signal)
+        signal.set_wakeup_fd(writer.fileno(), warn_on_full_buffer=False)
+        threading.Thread(
+            target=self._watch, args=(reader, writer), name='signals',
+            daemon=True
+        ).start()
+        return self
+
+    def handle(self, signum: int, callback) -> None:
+        """Вызывает callback() в потоке signals по сигналу signum.
+        Только из главного потока и после install.
+        """
+        self._handlers[signum] = callback
+        signal.signal(signum, self._on_signal)
+
+    def on_stop(self, callback) -> None:
+        """Вызовет callback() при остановке; сразу, если она уже идёт."""
+        with self._lock:
+            if not self.stopping:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def request(self) -> None:
+        """Запрашивает остановку; отсчёт срока начинается сейчас."""
+        with self._lock:
+            if self.stopping:
+                return
+            self.deadline = time.monotonic() + self.timeout
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def wait(self, delay: float = None) -> bool:
+        """Пауза до delay секунд; True - пора останавливаться."""
+        return self._event.wait(delay)
+
+    def remaining(self) -> float:
+        """Сколько секунд осталось до срока; без остановки - timeout."""
+        if self.deadline is None:
+            return self.timeout
+        return max(0.0, self.deadline - time.monotonic())
+
+    def received(self, signum: int) -> None:
+        """Реакция на сигнал: первый - остановка, повторный - выход."""
+        self.signals += 1
+        name = signal.Signals(signum).name
+        if self.signals > 1:
+            logging.warning('Повторный сигнал %s, выход без ожидания.', name)
+            logs.shutdown()
+            os._exit(1)
+        logging.info('Получен сигнал %s, остановка (не дольше %s с).',
+                     name, self.timeout)
+        self.request()
+
+    def _watch(self, reader: socket.socket, writer: socket.socket) -> None:
+        # writer держится здесь, чтобы wakeup fd жил вместе с потоком.
+        while True:
+            for signum in reader.recv(64):
+                if signum in self._installed:
+                    self.received(signum)
+                elif signum in self._handlers:
+                    try:
+                        self._handlers[signum]()
+                    except Exception:
+                        logging.exception('Сбой обработчика сигнала %s.',
+                                          signal.Signals(signum).name)
+
+    def _on_signal(self, signum, frame) -> None:
+        # Обработчик Python нужен, чтобы сигнал попадал в wakeup fd;
+        # реагирует на него поток signals.
+        pass
@@ -0,0 +1,190 @@
+"""Логирование без задержек в цикле опроса.
+Поток, вызвавший logging, только кладёт запись в очередь; форматирование
+и запись в stdout - в фоновом потоке, пачками раз в FLUSH_INTERVAL
+секунд, так что запись в лог не будит его на каждое сообщение. Записи несут
+контекст (id подписчика, id работы, см. bind), в формате json - отдельными
+полями. Содержимое ответов API на уровне DEBUG пишется выборочно
+(debug_payload).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from assistant import metrics
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+QUEUE_SIZE = 10_000
+FLUSH_INTERVAL = 0.05
+
+CONTEXT = contextvars.ContextVar('log_context', default={})
+# Доля DEBUG-записей с содержимым ответов, которые попадут в лог.
+payload_sample = 1.0
+# Фоновый поток записи (LogWriter), см. setup.
+writer = None
+
+
+@contextmanager
+def bind(**fields):
+    """Добавляет поля ко всем записям внутри блока (поток или задача)."""
+    token = CONTEXT.set({**CONTEXT.get(), **fields})
+    try:
+        yield
+    finally:
+        CONTEXT.reset(token)
+
+
+def debug_payload(message: str, payload) -> None:
+    """DEBUG-запись с содержимым payload для доли payload_sample записей.
+    Пропущенная запись не создаётся вовсе.
+    """
+    if logging.root.isEnabledFor(logging.DEBUG) and (
+        payload_sample >= 1 or random.random() < payload_sample
+    ):
+        logging.debug(message, payload)
+
+
+class ContextFilter(logging.Filter):
+    """Переносит поля bind в запись в потоке, который её создал."""
+
+    def filter(self, record):
+        for name, value in CONTEXT.get().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON."""
+
+    def format(self, record):
+        data = {
+            'time': time.strftime(
+                '%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)
+            ) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for name in ('subscriber', 'homework'):
+            value = getattr(record, name, None)
+            if value is not None:
+                data[name] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LazyQueueHandler(logging.Handler):
+    """Кладёт запись в очередь как есть, без форматирования.
+    Сообщение собирается из аргументов в фоновом потоке, поэтому аргументы
+    не должны меняться после вызова logging. Если очередь переполнена,
+    запись ниже WARNING отбрасывается (счётчик dropped и метрика
+    LOG_RECORDS_DROPPED), а не задерживает вызвавший поток; WARNING и
+    выше не теряются - их сразу пишет output (без него они встают в
+    очередь сверх max_size).
+    """
+
+    def __init__(self, records: queue.SimpleQueue,
+                 max_size: int = QUEUE_SIZE, output: logging.Handler = None):
+        super().__init__()
+        self.queue = records
+        self.max_size = max_size
+        self.output = output
+        self.dropped = 0
+        self.addFilter(ContextFilter())
+
+    def emit(self, record):
+        if self.queue.qsize() < self.max_size:
+            self.queue.put_nowait(record)
+        elif record.levelno < logging.WARNING:
+            self.dropped += 1
+            metrics.LOG_RECORDS_DROPPED.inc()
+        elif self.output is not None:
+            self.output.handle(record)
+        else:
+            self.queue.put_nowait(record)
+
+
+class LogWriter(threading.Thread):
+    """Фоновая запись лога пачками.
+    Раз в interval секунд забирает из очереди все записи и пишет их в поток
+    вывода handler одним вызовом write.
+    """
+
+    def __init__(self, records: queue.SimpleQueue,
+                 handler: logging.StreamHandler,
+                 interval: float = FLUSH_INTERVAL):
+        super().__init__(name='log-writer', daemon=True)
+        self.records = records
+        self.handler = handler
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self) -> None:
+        lines = []
+        while True:
+            try:
+                record = self.records.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                lines.append(self.handler.format(record))
+            except Exception:
+                self.handler.handleError(record)
+        if lines:
+            lines.append('')
+            with self.handler.lock:
+                self.handler.stream.write('\n'.join(lines))
+                self.handler.flush()
+
+    def stop(self) -> None:
+        """Останавливает поток, дописав остаток очереди."""
+        self._stopped.set()
+        self.join()
+
+
+def setup(level: int, format: str = 'text', sample: float = 1.0,
+          stream=None) -> LogWriter:
+    """Направляет корневой логгер в stdout через очередь.
+    format - 'text' или 'json'; sample - доля DEBUG-записей с содержимым
+    ответов. Остаток очереди записывается при выходе из процесса.
+    """
+    global payload_sample, writer
+    payload_sample = sample
+    shutdown()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(
+        JsonFormatter() if format == 'json'
+        else logging.Formatter(TEXT_FORMAT)
+    )
+    records = queue.SimpleQueue()
+    writer = LogWriter(records, output)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, LazyQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(records, output=output))
+    root.setLevel(level)
+    writer.start()
+    atexit.register(shutdown)
+    return writer
+
+
+def shutdown() -> None:
+    """Дописывает очередь и останавливает фоновый поток записи."""
+    global writer
+    if writer is not None:
+        writer.stop()
+        writer = None
@@ -0,0 +1,147 @@
+"""Тексты сообщений бота: шаблоны по языкам и разметке Telegram.
+Все шаблоны компилируются один раз при импорте: постоянный текст
+(включая вердикты) сразу экранируется для разметки, при отправке
+экранируются только подставляемые значения. Уведомления о статусе
+кэшируются по (работа, статус, язык, разметка).
+"""
+import html
+import re
+import string
+from functools import lru_cache
+
+DEFAULT_LOCALE = 'ru'
+STATUS_CACHE_SIZE = 4096
+
+LOCALES = {
+    'ru': {
+        'status': 'Изменился статус проверки работы "{name}". {verdict}',
+        'startup': 'Я запустился!',
+        'error': 'Сбой в работе программы: {error}',
+        'digest': 'Сбои за {minutes} мин.:',
+        'digest_error': '{count} × {error} (подписчиков: {scopes})',
+        'digest_recovered': 'Восстановились подписчики: {count}.',
+        'digest_failing': 'Всё ещё с ошибкой подписчиков: {count}.',
+        'recovered': 'Работа восстановлена.',
+        'backfill': 'История проверок восстановлена, работ: {count}.',
+        'verdicts': {
+            'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+            'reviewing': 'Работа взята на проверку ревьюером.',
+            'rejected': 'Работа проверена: у ревьюера есть замечания.'
+        },
+    },
+    'en': {
+        'status': 'Review status of "{name}" has changed. {verdict}',
+        'startup': 'I am up and running!',
+        'error': 'The bot has failed: {error}',
+        'digest': 'Failures in the last {minutes} min:',
+        'digest_error': '{count} × {error} (subscribers: {scopes})',
+        'digest_recovered': 'Subscribers recovered: {count}.',
+        'digest_failing': 'Subscribers still failing: {count}.',
+        'recovered': 'The bot has recovered.',
+        'backfill': 'Review history restored, works: {count}.',
+        'verdicts': {
+            'approved': 'The reviewer has approved the work. Hooray!',
+            'reviewing': 'The reviewer has started checking the work.',
+            'rejected': 'The reviewer has left some remarks.'
+        },
+    },
+}
+
+MARKDOWN_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+
+
+def escape_markdown(text: str) -> str:
+    """Экранирование для parse_mode=MarkdownV2."""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def escape_html(text: str) -> str:
+    """Экранирование для parse_mode=HTML."""
+    return html.escape(text, quote=False)
+
+
+# Разметка Telegram -> экранирование; None - обычный текст.
+ESCAPES = {
+    None: str,
+    'MarkdownV2': escape_markdown,
+    'HTML': escape_html,
+}
+
+
+class Template:
+    """Шаблон с заранее экранированным постоянным текстом."""
+
+    __slots__ = ('escape', 'fields', '_format')
+
+    def __init__(self, source: str, escape=str, **fixed):
+        """Значения fixed подставляются сразу, при компиляции."""
+        parts, fields = [], []
+        for literal, field, _, _ in string.Formatter().parse(source):
+            parts.append(braces(escape(literal)))
+            if field is None:
+                continue
+            if field in fixed:
+                parts.append(braces(escape(str(fixed[field]))))
+            else:
+                parts.append(f'{{{field}}}')
+                fields.append(field)
+        self.escape = escape
+        self.fields = tuple(fields)
+        self._format = ''.join(parts).format
+
+    def render(self, **values) -> str:
+        return self._format(**{
+            name: self.escape(str(value)) for name, value in values.items()
+        })
+
+
+def braces(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+class Messages:
+    """Скомпилированные шаблоны одного языка и разметки.
+    Уведомление о статусе - отдельный шаблон на каждый статус с уже
+    подставленным вердиктом.
+    """
+
+    __slots__ = ('texts', 'statuses')
+
+    def __init__(self, texts: dict, escape=str):
+        self.texts = {
+            key: Template(source, escape) for key, source in texts.items()
+            if key not in ('status', 'verdicts')
+        }
+        self.statuses = {
+            status: Template(texts['status'], escape, verdict=verdict)
+            for status, verdict in texts['verdicts'].items()
+        }
+
+
+CATALOG = {
+    (locale, parse_mode): Messages(texts, escape)
+    for locale, texts in LOCALES.items()
+    for parse_mode, escape in ESCAPES.items()
+}
+
+
+def messages(locale: str = None, parse_mode: str = None) -> Messages:
+    """Шаблоны языка и разметки; неизвестный язык - DEFAULT_LOCALE."""
+    parse_mode = parse_mode or None
+    found = CATALOG.get((locale, parse_mode))
+    if found is None:
+        found = CATALOG[DEFAULT_LOCALE, parse_mode]
+    return found
+
+
+def render(key: str, locale: str = None, parse_mode: str = None,
+           **values) -> str:
+    """Сообщение key ('startup', 'error', ...) с подстановкой values."""
+    return messages(locale, parse_mode).texts[key].render(**values)
+
+
+@lru_cache(maxsize=STATUS_CACHE_SIZE)
+def render_status(name: str, status: str, locale: str = None,
+                  parse_mode: str = None) -> str:
+    """Уведомление о статусе работы name; KeyError - неизвестный статус."""
+    return messages(locale, parse_mode).statuses[status].render(name=name)
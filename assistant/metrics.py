@@ -0,0 +1,307 @@
+"""Метрики работы бота в текстовом формате Prometheus.
+Обновление метрики - захват блокировки и пара арифметических операций,
+поэтому инструментирование почти ничего не стоит циклу опроса. Отдача
+метрик - отдельный HTTP-сервер в фоновом потоке (см. serve).
+"""
+import bisect
+import threading
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 50, 100, 1000)
+
+
+def format_labels(labelnames: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Базовая метрика: имя, описание, набор меток."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: tuple = (), registry: 'Registry' = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        (REGISTRY if registry is None else registry).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(
+                f'{self.name}{format_labels(self.labelnames, key)} {value}'
+            )
+        return lines
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Текущее значение; может вычисляться функцией в момент отдачи."""
+
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function) -> None:
+        """Значение без меток вычисляется вызовом function при отдаче."""
+        self._function = function
+
+    def render(self) -> list:
+        if self._function is not None:
+            self.set(self._function())
+        return super().render()
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 buckets: tuple = LATENCY_BUCKETS, **kwargs):
+        super().__init__(name, documentation, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self) -> list:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self._lock:
+            items = sorted(
+                (key, (list(state[0]), state[1], state[2]))
+                for key, state in self._values.items()
+            )
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                labels = format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    """Набор метрик, отдаваемых одним эндпойнтом."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+POLL_LATENCY = Histogram(
+    'homework_poll_latency_seconds',
+    'Длительность запроса к API homework_statuses.'
+)
+RESPONSE_SIZE = Histogram(
+    'homework_response_bytes', 'Размер ответа API.', buckets=SIZE_BUCKETS
+)
+HOMEWORKS_PER_RESPONSE = Histogram(
+    'homework_response_homeworks', 'Домашних работ в ответе API.',
+    buckets=COUNT_BUCKETS
+)
+SEND_LATENCY = Histogram(
+    'telegram_send_latency_seconds', 'Длительность отправки в Telegram.'
+)
+SEND_FAILURES = Counter(
+    'telegram_send_failures_total', 'Неудачные отправки в Telegram.'
+)
+QUEUE_DEPTH = Gauge(
+    'telegram_queue_depth', 'Сообщений в очереди на отправку.'
+)
+LOOP_LAG = Histogram(
+    'poll_loop_lag_seconds',
+    'Опоздание опроса относительно запланированного времени.'
+)
+CACHE_LOOKUPS = Counter(
+    'homework_cache_lookups_total',
+    'Ответы API по результату: not_modified, unchanged, miss.', ('result',)
+)
+REQUESTS_COALESCED = Counter(
+    'homework_requests_coalesced_total',
+    'Опросы, получившие ответ чужого одинакового запроса к API.'
+)
+BREAKER_STATE = Gauge(
+    'circuit_breaker_state',
+    'Состояние предохранителя: 0 - замкнут, 1 - разомкнут, 2 - проба.',
+    ('upstream',)
+)
+BREAKER_REJECTED = Counter(
+    'circuit_breaker_rejected_total',
+    'Запросы, не отправленные из-за разомкнутого предохранителя.',
+    ('upstream',)
+)
+PUSH_EVENTS = Counter(
+    'homework_push_events_total',
+    'Присланные события по результату: accepted, rejected, unknown.',
+    ('result',)
+)
+ALERTS = Counter(
+    'bot_error_alerts_total',
+    'Сообщения об ошибках: alert - сразу, digest - сводка, '
+    'suppressed - ошибка ушла в сводку.', ('kind',)
+)
+EXCEPTIONS = Counter(
+    'bot_exceptions_total', 'Исключения цикла опроса по типу.', ('type',)
+)
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total',
+    'Записи лога ниже WARNING, отброшенные из-за переполненной очереди.'
+)
+
+
+class PoolStats:
+    """Счётчики пула: запросы, новые соединения и задержка запросов.
+    Задержки хранятся в скользящем окне последних window запросов.
+    """
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.handshakes = 0
+        self.latencies = deque(maxlen=window)
+
+    def record_request(self, latency: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+
+    def record_handshake(self) -> None:
+        with self._lock:
+            self.handshakes += 1
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Доля запросов, выполненных по уже открытому соединению."""
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1 - self.handshakes / self.requests)
+
+    def snapshot(self) -> dict:
+        """Текущие значения счётчиков и перцентили задержки (секунды)."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+        snapshot = {
+            'requests': self.requests,
+            'handshakes': self.handshakes,
+            'reuse_ratio': self.reuse_ratio,
+        }
+        if latencies:
+            snapshot.update(
+                latency_p50=(
+                    latencies[len(latencies) // 2]
+                    + latencies[(len(latencies) - 1) // 2]
+                ) / 2,
+                latency_p99=latencies[int(len(latencies) * 0.99)],
+                latency_max=latencies[-1],
+            )
+        return snapshot
+
+
+class MetricsHandler:
+    """Обработчик /metrics.
+    Примешивается к BaseHTTPRequestHandler в serve, чтобы http.server
+    загружался только вместе с эндпойнтом.
+    """
+
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            return self.send_error(404)
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = '0.0.0.0',
+          registry: Registry = REGISTRY) -> 'ThreadingHTTPServer':
+    """Запускает эндпойнт /metrics в фоновом потоке."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    handler = type('Handler', (MetricsHandler, BaseHTTPRequestHandler),
+                   {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    return server
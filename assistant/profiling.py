@@ -0,0 +1,225 @@
+"""Профилирование цикла опроса по запросу.
+Этапы цикла (request, decode, check, format, send) обёрнуты в span(), а
+весь цикл подписчика - в cycle(). Пока профилирование выключено, оба
+возвращают один и тот же пустой контекстный менеджер: проверка флага и
+вызов функции. Включённое профилирование (start) пишет длительность
+этапов в метрику poll_stage_seconds, запоминает keep самых медленных циклов с
+разбивкой по этапам и запускает выборочный профайлер: раз в interval
+секунд он снимает стеки всех потоков. stop() (или повторный toggle)
+выключает профилирование и сохраняет результаты в каталог directory:
+slowest-<время>.txt и стеки в формате flamegraph (profile-<время>.folded).
+"""
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+from assistant import metrics
+
+STAGE_LATENCY = metrics.Histogram(
+    'poll_stage_seconds',
+    'Длительность этапов цикла опроса (только при профилировании).',
+    labelnames=('stage',)
+)
+NOOP = nullcontext()
+CURRENT = contextvars.ContextVar('profiling_cycle', default=None)
+
+enabled = False
+keep = 10
+interval = 0.005
+directory = '.'
+# Самые медленные циклы: куча (длительность, номер, Cycle).
+slowest = []
+sampler = None
+_seq = itertools.count()
+_lock = threading.Lock()
+
+
+class Span:
+    """Замер одного этапа; время добавляется к текущему циклу."""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        STAGE_LATENCY.observe(elapsed, stage=self.name)
+        cycle = CURRENT.get()
+        if cycle is not None:
+            cycle.stages[self.name] = (
+                cycle.stages.get(self.name, 0.0) + elapsed
+            )
+
+
+class Cycle:
+    """Один цикл опроса подписчика key и время его этапов."""
+
+    __slots__ = ('key', 'stages', 'started', 'at', 'total', '_token')
+
+    def __init__(self, key):
+        self.key = key
+        self.stages = {}
+        self.total = 0.0
+
+    def __enter__(self):
+        self.at = time.time()
+        self.started = time.perf_counter()
+        self._token = CURRENT.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.total = time.perf_counter() - self.started
+        CURRENT.reset(self._token)
+        record(self)
+
+    def describe(self) -> str:
+        """Строка отчёта: время, подписчик, итог и этапы."""
+        stages = ', '.join(
+            f'{name} {seconds * 1000:.1f}'
+            for name, seconds in sorted(
+                self.stages.items(), key=lambda item: -item[1]
+            )
+        )
+        other = self.total - sum(self.stages.values())
+        return (
+            f'{time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.at))} '
+            f'{self.key} {self.total * 1000:.1f} мс: {stages}'
+            f'{", " if stages else ""}прочее {other * 1000:.1f}'
+        )
+
+
+def span(name: str):
+    """Контекст замера этапа name; без профилирования - пустой."""
+    return Span(name) if enabled else NOOP
+
+
+def cycle(key):
+    """Контекст цикла опроса подписчика key; без профилирования - пустой."""
+    return Cycle(key) if enabled else NOOP
+
+
+def record(cycle: Cycle) -> None:
+    """Запоминает цикл, если он среди keep самых медленных."""
+    with _lock:
+        item = (cycle.total, next(_seq), cycle)
+        if len(slowest) < keep:
+            heapq.heappush(slowest, item)
+        elif cycle.total > slowest[0][0]:
+            heapq.heapreplace(slowest, item)
+
+
+def report() -> list:
+    """Самые медленные циклы, от худшего, строками отчёта."""
+    with _lock:
+        cycles = sorted(slowest, reverse=True)
+    return [cycle.describe() for _, _, cycle in cycles]
+
+
+class Sampler(threading.Thread):
+    """Выборочный профайлер: раз в interval секунд снимает стеки потоков.
+    Стеки копятся в stacks в свёрнутом виде: 'файл:функция;...' -> число.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name='profiler', daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f'{os.path.basename(code.co_filename)}:{code.co_name}'
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+        self.samples += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def configure(slowest_count: int = 10, sample_interval: float = 0.005,
+              output: str = '.') -> None:
+    """Число запоминаемых циклов, период выборки и каталог отчётов."""
+    global keep, interval, directory
+    keep, interval, directory = slowest_count, sample_interval, output
+
+
+def start() -> None:
+    """Включает замеры этапов и выборочный профайлер."""
+    global enabled, sampler
+    with _lock:
+        if enabled:
+            return
+        slowest.clear()
+        enabled = True
+        if interval:
+            sampler = Sampler(interval)
+            sampler.start()
+    logging.info('Профилирование включено.')
+
+
+def stop() -> list:
+    """Выключает профилирование и сохраняет отчёты; возвращает их пути."""
+    global enabled, sampler
+    with _lock:
+        if not enabled:
+            return []
+        enabled = False
+        running, sampler = sampler, None
+    if running is not None:
+        running.stop()
+    return dump(running)
+
+
+def toggle() -> None:
+    """Включает профилирование или выключает его с сохранением отчётов."""
+    if enabled:
+        stop()
+    else:
+        start()
+
+
+def dump(running: Sampler = None) -> list:
+    """Пишет самые медленные циклы и стеки профайлера в directory."""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    paths = []
+    lines = report()
+    path = os.path.join(directory, f'slowest-{stamp}.txt')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines) + '\n')
+    paths.append(path)
+    if running is not None and running.stacks:
+        path = os.path.join(directory, f'profile-{stamp}.folded')
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in running.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+        paths.append(path)
+    logging.info('Профилирование выключено, самые медленные циклы (мс):\n'
+                 '%s\nОтчёты: %s', '\n'.join(lines), ', '.join(paths))
+    return paths
@@ -0,0 +1,91 @@
+"""Приём изменений статуса, присланных извне (push), вместо ожидания опроса.
+POST /push/<id подписчика> с работой в формате элемента homeworks (или
+списком таких работ) разбирается check_response и сразу уходит
+подписчику. Опрос остаётся редкой сверкой (RECONCILE_TIME) на случай
+потерянных событий; уже отправленное отсеивает общий SeenIndex.
+"""
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import exceptions as _
+import homework
+from assistant import metrics, schema
+from assistant.records import Homework
+
+PATH = '/push/'
+MAX_BODY = 1 << 20
+
+
+def parse_event(body: bytes) -> list:
+    """Работы из тела события; ошибка, если хоть одна некорректна."""
+    event = json.loads(body)
+    items = event if isinstance(event, list) else [event]
+    return [
+        item if isinstance(item, Homework)
+        else Homework.from_api(schema.validate_homework(item))
+        for item in homework.check_response({'homeworks': items})
+    ]
+
+
+class PushHandler(BaseHTTPRequestHandler):
+    """Передаёт работы из события в sink(id подписчика, работы).
+    sink возвращает False, если такого подписчика нет. С secret событие
+    принимается только с заголовком Authorization: Bearer <secret>.
+    """
+
+    sink = None
+    secret = None
+
+    def do_POST(self):
+        if not self.path.startswith(PATH):
+            return self.send_error(404)
+        if self.secret and not hmac.compare_digest(
+            self.headers.get('Authorization', ''), f'Bearer {self.secret}'
+        ):
+            return self.reply(401, 'rejected')
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > MAX_BODY:
+                return self.reply(413, 'rejected')
+            homeworks = parse_event(self.rfile.read(length))
+        except (ValueError, TypeError, KeyError,
+                _.BotAssistantException) as error:
+            return self.reply(400, 'rejected', str(error))
+        if not self.sink(self.path[len(PATH):], homeworks):
+            return self.reply(404, 'unknown')
+        self.reply(202, 'accepted')
+
+    def reply(self, status: int, result: str, error: str = None) -> None:
+        metrics.PUSH_EVENTS.inc(result=result)
+        body = json.dumps(
+            {'result': result, 'error': error}, ensure_ascii=False
+        ).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, sink, secret: str = None,
+          host: str = None) -> ThreadingHTTPServer:
+    """Запускает приём событий в фоновом потоке.
+    Без secret по умолчанию слушает только 127.0.0.1: иначе любой, кто
+    достучится до порта, мог бы слать подписчикам произвольный текст.
+    """
+    if host is None:
+        host = '0.0.0.0' if secret else '127.0.0.1'
+    handler = type('Handler', (PushHandler,), {
+        'sink': staticmethod(sink), 'secret': secret,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='push', daemon=True
+    ).start()
+    return server
@@ -0,0 +1,62 @@
+"""Компактное представление домашней работы из ответа API."""
+from enum import Enum
+from typing import NamedTuple
+
+import exceptions as _
+
+
+class Status(str, Enum):
+    """Статус проверки; сравнивается и хэшируется как строка из API."""
+
+    REVIEWING = 'reviewing'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+
+    def __str__(self):
+        return self.value
+
+
+class Homework(NamedTuple):
+    """Неизменяемая запись о работе: только поля, нужные боту.
+    Создаётся один раз при разборе ответа; статус - общий на все записи
+    объект Status, а не отдельная строка на каждую работу.
+    """
+
+    id: int
+    name: str
+    status: Status
+    date_updated: str = None
+    reviewer_comment: str = None
+
+    @classmethod
+    def from_api(cls, item: dict) -> 'Homework':
+        """Запись из проверенного по схеме словаря ответа API."""
+        try:
+            status = Status(item['status'])
+        except ValueError:
+            raise _.HomeworkTypeError(
+                'Недокументированный статус домашней работы'
+            ) from None
+        return cls(item.get('id'), item['homework_name'], status,
+                   item.get('date_updated'), item.get('reviewer_comment'))
+
+    @property
+    def key(self):
+        """Идентификатор работы: id, а без него - название."""
+        return self.name if self.id is None else self.id
+
+
+def status_of(item) -> str:
+    """Статус записи или словаря из ответа API (None, если не понять)."""
+    if isinstance(item, Homework):
+        return item.status
+    return item.get('status') if isinstance(item, dict) else None
+
+
+def key_of(item):
+    """Идентификатор работы для записи или словаря из ответа API."""
+    if isinstance(item, Homework):
+        return item.key
+    if not isinstance(item, dict):
+        return None
+    return item.get('id', item.get('homework_name'))
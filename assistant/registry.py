@@ -0,0 +1,127 @@
+"""Реестр подписчиков: токен Практикума -> Telegram чат."""
+import hashlib
+import json
+import time
+
+from assistant.records import Status
+
+
+class Subscriber:
+    """Подписчик: токен Практикума, чат для уведомлений и курсор опроса."""
+
+    __slots__ = (
+        'id', 'token', 'chat_id', 'from_date', 'last_error',
+        'status', 'errors', 'changed_at', 'retry_after',
+        'locale', 'parse_mode', 'routes',
+    )
+
+    def __init__(self, token: str, chat_id, from_date: int = None,
+                 id: str = None, locale: str = None, parse_mode: str = None,
+                 routes: tuple = ()):
+        self.id = id or subscriber_id(token, chat_id)
+        self.token = token
+        self.chat_id = chat_id
+        self.locale = locale
+        self.parse_mode = parse_mode
+        self.routes = tuple(routes)
+        self.from_date = from_date or int(time.time())
+        self.last_error = ''
+        self.status = None
+        self.errors = 0
+        self.changed_at = time.time()
+        self.retry_after = None
+
+    def __repr__(self):
+        return f'Subscriber(id={self.id!r}, chat_id={self.chat_id!r})'
+
+
+class Route:
+    """Дополнительный чат подписчика и фильтр statuses (None - все).
+    Язык и разметка по умолчанию - как у подписчика.
+    """
+
+    __slots__ = ('chat_id', 'statuses', 'locale', 'parse_mode')
+
+    def __init__(self, chat_id, statuses=None, locale: str = None,
+                 parse_mode: str = None):
+        self.chat_id = chat_id
+        self.statuses = (
+            frozenset(Status(status) for status in statuses)
+            if statuses else None
+        )
+        self.locale = locale
+        self.parse_mode = parse_mode
+
+    @classmethod
+    def load(cls, item: dict) -> 'Route':
+        """Маршрут из {"chat_id": ..., "statuses": [...], "locale": ...}."""
+        return cls(item['chat_id'], item.get('statuses'), item.get('locale'),
+                   item.get('parse_mode'))
+
+    def accepts(self, item) -> bool:
+        """True, если уведомление о работе item нужно этому чату."""
+        return self.statuses is None or (
+            getattr(item, 'status', None) in self.statuses
+        )
+
+    def __repr__(self):
+        return f'Route(chat_id={self.chat_id!r})'
+
+
+def load_routes(items: list) -> tuple:
+    """Маршруты из списка словарей (ключ "routes" реестра)."""
+    return tuple(Route.load(item) for item in items or ())
+
+
+def subscriber_id(token: str, chat_id) -> str:
+    """Стабильный идентификатор подписчика, не раскрывающий токен."""
+    digest = hashlib.sha1(f'{token}:{chat_id}'.encode())
+    return digest.hexdigest()[:12]
+
+
+class SubscriptionRegistry:
+    """Хранит подписчиков и позволяет добавлять и удалять их на лету."""
+
+    def __init__(self):
+        self._subscribers = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'SubscriptionRegistry':
+        """Загружает реестр из JSON файла со списком подписчиков.
+        Каждый элемент: {"token": ..., "chat_id": ..., "from_date": ...},
+        ключи "from_date", "locale", "parse_mode" и "routes" (список
+        маршрутов, см. Route.load) необязательны.
+        """
+        registry = cls()
+        with open(path, encoding='utf-8') as file:
+            for item in json.load(file):
+                registry.add(
+                    item['token'], item['chat_id'], item.get('from_date'),
+                    item.get('locale'), item.get('parse_mode'),
+                    load_routes(item.get('routes'))
+                )
+        return registry
+
+    def add(self, token: str, chat_id, from_date: int = None,
+            locale: str = None, parse_mode: str = None,
+            routes: tuple = ()) -> Subscriber:
+        """Регистрирует подписчика (повторная регистрация не дублирует)."""
+        subscriber = Subscriber(
+            token, chat_id, from_date, locale=locale, parse_mode=parse_mode,
+            routes=routes
+        )
+        return self._subscribers.setdefault(subscriber.id, subscriber)
+
+    def remove(self, id: str) -> None:
+        """Удаляет подписчика; запланированный опрос будет пропущен."""
+        self._subscribers.pop(id, None)
+
+    def get(self, id: str) -> Subscriber:
+        """Возвращает подписчика или None, если он удалён."""
+        return self._subscribers.get(id)
+
+    def __iter__(self):
+        return iter(list(self._subscribers.values()))
+
+    def __len__(self):
+        return len(self._subscribers)
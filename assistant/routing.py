@@ -0,0 +1,44 @@
+"""Рассылка уведомления подписчика по его маршрутам (registry.Route).
+Кроме своего чата подписчик может отправлять уведомления в чаты
+маршрутов (наставник, канал потока), каждый со своим фильтром статусов,
+языком и разметкой. Текст о работе формируется один раз на каждую пару
+язык/разметка, а не на каждый чат; отправляются сообщения одной пачкой
+через общую очередь (SendQueue.send_many), которая рассылает их по чатам
+параллельно.
+"""
+import homework
+
+
+def render(subscriber, item) -> list:
+    """Сообщения о работе item: [(chat_id, текст, разметка), ...].
+    Первым идёт свой чат подписчика, за ним - принявшие работу маршруты.
+    """
+    locale, parse_mode = homework.message_options(subscriber)
+    text = homework.format_status(item, locale, parse_mode)
+    messages = [(subscriber.chat_id, text, parse_mode)]
+    if subscriber.routes:
+        messages += render_routes(subscriber.routes, item, locale,
+                                  parse_mode, text)
+    return messages
+
+
+def render_routes(routes: tuple, item, locale: str, parse_mode: str,
+                  text: str) -> list:
+    """Сообщения о работе item чатам маршрутов, принявшим её.
+    text - уже готовый текст для языка locale и разметки parse_mode
+    подписчика; для других пар текст формируется один раз на пару.
+    """
+    texts = {(locale, parse_mode): text}
+    messages = []
+    for route in routes:
+        if not route.accepts(item):
+            continue
+        options = (
+            route.locale or locale,
+            parse_mode if route.parse_mode is None else route.parse_mode
+        )
+        text = texts.get(options)
+        if text is None:
+            text = texts[options] = homework.format_status(item, *options)
+        messages.append((route.chat_id, text, options[1]))
+    return messages
@@ -0,0 +1,157 @@
+"""Схема ответа homework_statuses и его потоковый разбор.
+Проверки схемы собираются в функции один раз при импорте (compile_schema),
+а не разбираются заново на каждую работу. load_response разбирает массив
+homeworks по одной работе: в памяти не держится одновременно весь
+разобранный ответ, а каждая корректная работа сразу становится записью
+Homework (без lesson_name, произвольных полей и т.п.).
+"""
+import json
+import re
+
+import exceptions as _
+from assistant.records import Homework
+
+NULLABLE_STR = (str, type(None))
+
+# Поле -> (допустимые типы, обязательное ли поле).
+HOMEWORK_SCHEMA = {
+    'homework_name': (str, True),
+    'status': (str, True),
+    'id': (int, False),
+    'date_updated': (NULLABLE_STR, False),
+    'reviewer_comment': (NULLABLE_STR, False),
+}
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+# Ключ, с которым iter_response выдаёт элементы массива homeworks.
+ITEM = object()
+
+
+def compile_schema(schema: dict):
+    """Собирает функцию проверки словаря по схеме.
+    Функция возвращает проверенный словарь; при нарушении бросает
+    HomeworkTypeError (не словарь, неверный тип поля) или HomeworkKeyError
+    (нет обязательного поля).
+    """
+    required = tuple(name for name, (_t, needed) in schema.items() if needed)
+    types = tuple((name, allowed) for name, (allowed, _r) in schema.items())
+
+    def validate(item: dict) -> dict:
+        if not isinstance(item, dict):
+            raise _.HomeworkTypeError('Ожидается словарь.')
+        for name in required:
+            if name not in item:
+                raise _.HomeworkKeyError(name)
+        for name, allowed in types:
+            if name in item and not isinstance(item[name], allowed):
+                raise _.HomeworkTypeError(
+                    f'Поле "{name}" типа {type(item[name]).__name__}.'
+                )
+        return item
+
+    validate.fields = tuple(schema)
+    return validate
+
+
+validate_homework = compile_schema(HOMEWORK_SCHEMA)
+
+
+def validate_response(response) -> list:
+    """Проверяет ответ API и возвращает список работ."""
+    if not response:
+        raise _.ApiAnswerTypeError('Пустой ответ.')
+    if not isinstance(response, dict) or 'homeworks' not in response:
+        raise TypeError('Некорректный тип ответа API! '
+                        'Отсутствует ключ "homeworks".')
+    homeworks = response['homeworks']
+    if not isinstance(homeworks, list):
+        raise _.ApiAnswerTypeError('Не найден ключ "homeworks" в ответе API!')
+    return homeworks
+
+
+def project(item):
+    """Корректная работа - запись Homework, некорректная - как есть.
+    Некорректную работу отклонит parse_status с понятной ошибкой.
+    """
+    if type(item) is Homework:
+        return item
+    try:
+        return Homework.from_api(validate_homework(item))
+    except (_.HomeworkTypeError, _.HomeworkKeyError):
+        return item
+
+
+def skip(text: str, index: int) -> int:
+    return WHITESPACE.match(text, index).end()
+
+
+def expect(text: str, index: int, char: str) -> int:
+    """Проверяет символ char на позиции index и пропускает его."""
+    if text[index] != char:
+        raise json.JSONDecodeError(f'Ожидается "{char}"', text, index)
+    return skip(text, index + 1)
+
+
+def iter_response(body):
+    """Лениво разбирает объект ответа API.
+    Выдаёт пары (ключ, значение) полей верхнего уровня; массив homeworks
+    выдаётся как ('homeworks', []) и затем по одной работе с ключом ITEM.
+    """
+    text = body.decode() if isinstance(body, (bytes, bytearray)) else body
+    try:
+        index = expect(text, skip(text, 0), '{')
+        if text[index] != '}':
+            while True:
+                key, index = DECODER.raw_decode(text, index)
+                index = expect(text, skip(text, index), ':')
+                if key == 'homeworks' and text[index] == '[':
+                    yield key, []
+                    index = yield from iter_items(text, index + 1)
+                else:
+                    value, index = DECODER.raw_decode(text, index)
+                    yield key, value
+                index = skip(text, index)
+                if text[index] == '}':
+                    break
+                index = expect(text, index, ',')
+        if skip(text, index + 1) != len(text):
+            raise json.JSONDecodeError('Лишние данные', text, index + 1)
+    except IndexError:
+        raise json.JSONDecodeError('Обрыв ответа', text, len(text)) from None
+
+
+def iter_items(text: str, index: int):
+    """Выдаёт работы массива с позиции после '['; возвращает позицию за ']'."""
+    index = skip(text, index)
+    if text[index] == ']':
+        return index + 1
+    while True:
+        item, index = DECODER.raw_decode(text, index)
+        yield ITEM, project(item)
+        index = skip(text, index)
+        if text[index] == ']':
+            return index + 1
+        index = expect(text, index, ',')
+
+
+def iter_homeworks(body):
+    """Лениво выдаёт работы из тела ответа, не разбирая его целиком."""
+    return (value for key, value in iter_response(body) if key is ITEM)
+
+
+def load_response(body) -> dict:
+    """Разбирает тело ответа homework_statuses в словарь.
+    Не-объект разбирается json.loads, чтобы его отклонила
+    validate_response.
+    """
+    text = body.decode() if isinstance(body, (bytes, bytearray)) else body
+    if not text.lstrip().startswith('{'):
+        return json.loads(text)
+    response = {}
+    for key, value in iter_response(text):
+        if key is ITEM:
+            response['homeworks'].append(value)
+        else:
+            response[key] = value
+    return response
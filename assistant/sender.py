@@ -0,0 +1,393 @@
+"""Очередь исходящих сообщений Telegram с ограничением частоты отправки.
+Telegram допускает около 30 сообщений в секунду на бота и 1 сообщение
+в секунду в один чат; при превышении отвечает 429 с retry_after.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import nullcontext
+
+import exceptions as _
+from assistant import metrics
+
+MESSAGE_LIMIT = 4096
+SEPARATOR = '\n\n'
+PRUNE_THRESHOLD = 1024
+# Наибольшая пауза между попытками отправить сообщение из outbox.
+RETRY_LIMIT = 60.0
+
+
+class LazyBot:
+    """Клиент Telegram, создаваемый factory() при первом обращении.
+    Тяжёлый импорт клиента уходит из запуска бота в первую отправку.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._bot = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._bot is None:
+            with self._lock:
+                if self._bot is None:
+                    self._bot = self._factory()
+        return getattr(self._bot, name)
+
+
+class TokenBucket:
+    """Маркерная корзина: rate маркеров в секунду, не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, now: float = None) -> float:
+        """Забирает маркер и возвращает, сколько секунд ждать до него."""
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self) -> None:
+        """Ждёт, пока маркер станет доступен."""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class RateLimiter:
+    """Общее и початовое ограничения частоты для асинхронной отправки."""
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1):
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_interval = 1 / chat_rate
+        self._chat_at = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id) -> float:
+        """Резервирует отправку в чат; возвращает, сколько секунд ждать."""
+        now = time.monotonic()
+        with self._lock:
+            chat_at = max(now, self._chat_at.get(chat_id, now))
+            self._chat_at[chat_id] = chat_at + self.chat_interval
+            if len(self._chat_at) > PRUNE_THRESHOLD:
+                self._chat_at = {
+                    chat_id: ready_at
+                    for chat_id, ready_at in self._chat_at.items()
+                    if ready_at > now
+                }
+        return max(chat_at - now, self.global_bucket.reserve(now))
+
+
+class SendQueue:
+    """Очередь отправки, развязанная с циклом опроса.
+    Сообщения копятся по чатам; воркеры забирают чат, как только его
+    разрешает ограничение chat_rate, склеивают все накопившиеся для него
+    сообщения с одной разметкой в одно (в пределах лимита длины Telegram)
+    и отправляют с учётом общего ограничения global_rate. Ответ 429
+    возвращает сообщения в очередь на retry_after секунд, сетевые ошибки
+    повторяются до max_attempts раз, остальные ошибки логируются. Пока
+    разомкнут предохранитель breaker, сообщения ждут в очереди, не тратя
+    попыток.
+
+    С outbox (хранилище assistant.state) сообщение подписчика owner
+    записывается в него до постановки в очередь и удаляется после
+    доставки. Такие сообщения при сетевых ошибках повторяются без предела
+    попыток (с паузой до RETRY_LIMIT секунд), а не доставленные до
+    остановки отправляются после перезапуска (redeliver). Сообщения
+    подписчика, переданного другому процессу, забирает из очереди
+    withdraw: их доставит новый владелец.
+    """
+
+    def __init__(self, bot, workers: int = 4, global_rate: float = 30,
+                 chat_rate: float = 1, max_attempts: int = 5,
+                 breaker=None, outbox=None):
+        self.bot = bot
+        self.breaker = breaker
+        self.outbox = outbox
+        self.chat_interval = 1 / chat_rate
+        self.max_attempts = max_attempts
+        self.global_bucket = TokenBucket(global_rate)
+        self.sent = 0
+        self.batches = 0
+        self.failed = 0
+        self.throttled = 0
+        self._pending = {}
+        self._owners = {}
+        self._sending = {}
+        self._attempts = {}
+        self._ready_at = {}
+        self._scheduled = set()
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f'send-{number}',
+                             daemon=True)
+            for number in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def send(self, chat_id, message: str, parse_mode: str = None,
+             owner: str = None) -> None:
+        """Ставит сообщение в очередь и сразу возвращает управление.
+        С owner (id подписчика) сообщение сначала записывается в outbox.
+        """
+        id = None
+        if owner is not None and self.outbox is not None:
+            id = self.outbox.enqueue(owner, chat_id, message, parse_mode)
+        self._put(chat_id, message, parse_mode, id, owner)
+
+    def send_many(self, messages: list, owner: str = None) -> None:
+        """Ставит в очередь сообщения [(chat_id, текст, разметка), ...].
+        Все чаты становятся в очередь готовности за один захват блокировки
+        и рассылаются воркерами параллельно.
+        """
+        if owner is not None and self.outbox is not None:
+            items = [
+                (chat_id, message, parse_mode,
+                 self.outbox.enqueue(owner, chat_id, message, parse_mode))
+                for chat_id, message, parse_mode in messages
+            ]
+        else:
+            items = [(*message, None) for message in messages]
+        with self._cond:
+            for chat_id, message, parse_mode, id in items:
+                if id is not None:
+                    self._owners[id] = owner
+                self._pending.setdefault(chat_id, []).append(
+                    (message, parse_mode, id)
+                )
+                self._schedule(chat_id)
+
+    def redeliver(self, owner: str) -> int:
+        """Ставит в очередь недоставленные сообщения owner из outbox."""
+        if self.outbox is None:
+            return 0
+        pending = self.outbox.pending(owner)
+        for id, chat_id, message, parse_mode in pending:
+            self._put(chat_id, message, parse_mode, id, owner)
+        if pending:
+            logging.info('Повторная отправка из outbox: %s.', len(pending))
+        return len(pending)
+
+    def withdraw(self, owners, timeout: float = None) -> bool:
+        """Убирает из очереди сообщения подписчиков owners.
+        Они остаются в outbox, и после переезда подписчиков их отправит
+        новый владелец (redeliver). Уже отправляемые пачки с ними
+        дожидаются доставки не дольше timeout секунд; False - не дождались.
+        """
+        owners = set(owners)
+
+        def sending() -> bool:
+            return any(
+                self._owners.get(id) in owners
+                for messages in self._sending.values()
+                for *_, id in messages
+            )
+
+        with self._cond:
+            done = self._cond.wait_for(lambda: not sending(), timeout)
+            withdrawn = 0
+            for chat_id, messages in self._pending.items():
+                kept = [
+                    message for message in messages
+                    if self._owners.get(message[2]) not in owners
+                ]
+                withdrawn += len(messages) - len(kept)
+                self._pending[chat_id] = kept
+            for id, owner in list(self._owners.items()):
+                if owner in owners:
+                    del self._owners[id]
+        if withdrawn:
+            logging.info('Возвращено в outbox: %s.', withdrawn)
+        return done
+
+    def _put(self, chat_id, message: str, parse_mode: str, id,
+             owner: str = None) -> None:
+        with self._cond:
+            if id is not None:
+                self._owners[id] = owner
+            self._pending.setdefault(chat_id, []).append(
+                (message, parse_mode, id)
+            )
+            self._schedule(chat_id)
+
+    @property
+    def depth(self) -> int:
+        """Число сообщений, ожидающих отправки."""
+        with self._cond:
+            return sum(len(messages) for messages in self._pending.values())
+
+    def close(self, timeout: float = None) -> bool:
+        """Прекращает приём, дожидается отправки очереди.
+        Возвращает True, если очередь опустела за timeout секунд.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(
+                None if deadline is None
+                else max(0.0, deadline - time.monotonic())
+            )
+        if any(worker.is_alive() for worker in self._workers):
+            logging.warning('Не отправлено сообщений: %s.', self.depth)
+            if self.outbox is not None:
+                logging.warning('Сообщения подписчиков остаются в outbox '
+                                'до следующего запуска.')
+            return False
+        return True
+
+    def snapshot(self) -> dict:
+        """Счётчики очереди."""
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'batches': self.batches,
+            'failed': self.failed,
+            'throttled': self.throttled,
+        }
+
+    def _schedule(self, chat_id, delay: float = 0.0) -> None:
+        """Ставит чат в очередь готовности (вызывается под self._cond)."""
+        if chat_id in self._scheduled or not self._pending.get(chat_id):
+            return
+        now = time.monotonic()
+        ready_at = max(now + delay, self._ready_at.get(chat_id, now))
+        self._scheduled.add(chat_id)
+        heapq.heappush(self._heap, (ready_at, next(self._seq), chat_id))
+        self._cond.notify()
+
+    def _take(self):
+        """Ждёт готовый чат и забирает его сообщения; None - пора выходить."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    chat_id = heapq.heappop(self._heap)[2]
+                    if not self._pending[chat_id]:
+                        # Сообщения чата забрал withdraw.
+                        self._scheduled.discard(chat_id)
+                        del self._pending[chat_id]
+                        continue
+                    messages = self._sending[chat_id] = self._coalesce(
+                        chat_id
+                    )
+                    return chat_id, messages
+                if self._closed and not self._heap:
+                    return None, None
+                self._cond.wait(
+                    self._heap[0][0] - now if self._heap else None
+                )
+
+    def _coalesce(self, chat_id) -> list:
+        pending = self._pending[chat_id]
+        size, count = len(pending[0][0]), 1
+        while count < len(pending):
+            message, parse_mode, _ = pending[count]
+            size += len(SEPARATOR) + len(message)
+            if size > MESSAGE_LIMIT or parse_mode != pending[0][1]:
+                break
+            count += 1
+        messages, self._pending[chat_id] = pending[:count], pending[count:]
+        return messages
+
+    def _work(self) -> None:
+        while True:
+            chat_id, messages = self._take()
+            if chat_id is None:
+                return
+            self.global_bucket.acquire()
+            delay = self._deliver(chat_id, messages)
+            with self._cond:
+                self._ready_at[chat_id] = (
+                    time.monotonic() + self.chat_interval
+                )
+                self._scheduled.discard(chat_id)
+                del self._sending[chat_id]
+                if not self._pending[chat_id]:
+                    del self._pending[chat_id]
+                    self._prune(time.monotonic())
+                else:
+                    self._schedule(chat_id, delay)
+                self._cond.notify_all()
+
+    def _deliver(self, chat_id, messages: list) -> float:
+        """Отправляет пачку; возвращает паузу перед следующей попыткой."""
+        text = SEPARATOR.join(message for message, *_ in messages)
+        ids = [id for *_, id in messages if id is not None]
+        started = time.perf_counter()
+        try:
+            with self.breaker or nullcontext():
+                self.bot.send_message(
+                    chat_id, text=text, parse_mode=messages[0][1]
+                )
+        except _.CircuitOpen as error:
+            with self._cond:
+                self._pending[chat_id] = messages + self._pending[chat_id]
+            return float(error.retry_after or self.chat_interval)
+        except Exception as error:
+            from telegram.error import BadRequest, NetworkError
+
+            metrics.SEND_FAILURES.inc()
+            retry_after = getattr(error, 'retry_after', None)
+            attempts = self._attempts.get(chat_id, 0) + 1
+            retryable = retry_after is not None or (
+                isinstance(error, (NetworkError, ConnectionError))
+                and not isinstance(error, BadRequest)
+            )
+            if retryable and (ids or attempts < self.max_attempts):
+                logging.warning('Повтор отправки в чат %s (%s): %s',
+                                chat_id, attempts, error)
+                with self._cond:
+                    self.throttled += retry_after is not None
+                    self._attempts[chat_id] = attempts
+                    self._pending[chat_id] = messages + self._pending[chat_id]
+                return float(retry_after or min(2 ** attempts, RETRY_LIMIT))
+            with self._cond:
+                self.failed += len(messages)
+                self._attempts.pop(chat_id, None)
+            logging.exception('Не удалось отправить в телеграм. Ошибка: %s',
+                              error)
+            # Ошибку вроде неверного chat_id повтор не исправит.
+            self._ack(ids)
+            return 0.0
+        finally:
+            metrics.SEND_LATENCY.observe(time.perf_counter() - started)
+        self._ack(ids)
+        with self._cond:
+            self._attempts.pop(chat_id, None)
+            self.sent += len(messages)
+            self.batches += 1
+        logging.info('Отправлено в Telegram: %s', text)
+        return 0.0
+
+    def _ack(self, ids: list) -> None:
+        if ids:
+            self.outbox.ack(ids)
+            with self._cond:
+                for id in ids:
+                    self._owners.pop(id, None)
+
+    def _prune(self, now: float) -> None:
+        """Забывает истёкшие ограничения чатов (вызывается под self._cond)."""
+        if len(self._ready_at) > PRUNE_THRESHOLD:
+            self._ready_at = {
+                chat_id: ready_at
+                for chat_id, ready_at in self._ready_at.items()
+                if ready_at > now
+            }
@@ -0,0 +1,288 @@
+"""Шардированный режим: подписчики распределены между процессами.
+Подписчик закрепляется за воркером консистентным хешированием, поэтому при
+появлении или гибели воркера переезжает только доля подписчиков, а не все.
+Воркеры - процессы с обычным PollEngine; курсоры общие через STATE_DB.
+"""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from multiprocessing.connection import wait
+
+import homework
+from assistant.engine import PollEngine
+from assistant.lifecycle import Shutdown
+from assistant.registry import SubscriptionRegistry
+
+# spawn, а не fork: иначе воркер унаследует концы каналов соседей и не
+# заметит гибели супервизора.
+CONTEXT = multiprocessing.get_context('spawn')
+# Как часто супервизор проверяет, не пора ли остановиться, с.
+WATCH_INTERVAL = 1.0
+
+
+def ring_hash(value: str) -> int:
+    """Позиция ключа на кольце."""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Кольцо консистентного хеширования с replicas точками на узел."""
+
+    def __init__(self, nodes=(), replicas: int = 64):
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list:
+        return sorted(set(self._owners.values()))
+
+    def add(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node: str) -> None:
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.remove(point)
+
+    def node_for(self, key: str) -> str:
+        """Узел, за которым закреплён ключ, или None для пустого кольца."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, ring_hash(key))
+        return self._owners[self._points[index % len(self._points)]]
+
+
+def select(registry: SubscriptionRegistry, nodes: list,
+           node: str) -> SubscriptionRegistry:
+    """Оставляет в реестре только подписчиков узла node из nodes.
+    Так несколько машин делят один файл подписчиков без координатора.
+    """
+    ring = HashRing(nodes)
+    for subscriber in registry:
+        if ring.node_for(subscriber.id) != node:
+            registry.remove(subscriber.id)
+    return registry
+
+
+def worker_main(name: str, registry: SubscriptionRegistry, conn) -> None:
+    """Процесс-воркер: опрашивает назначенных супервизором подписчиков.
+    Команды по conn: ('assign', ids), ('revoke', ids) с ответом
+    ('revoked', ids) и ('stop', None). Потеря связи с супервизором и
+    SIGTERM - тоже остановка.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shutdown = Shutdown(homework.SHUTDOWN_TIMEOUT).install((signal.SIGTERM,))
+    homework.init_logging(logging.INFO)
+    homework.init_breakers()
+    store = homework.init_store()
+    homework.init_session(homework.POLL_WORKERS)
+    bot = homework.make_bot(homework.SEND_WORKERS)
+    queue = homework.init_send_queue(bot, homework.SEND_WORKERS,
+                                     outbox=store)
+    engine = PollEngine(
+        SubscriptionRegistry(), bot, workers=homework.POLL_WORKERS,
+        store=store, queue=queue, cache=homework.init_cache()
+    )
+    shutdown.on_stop(lambda: engine.stop(shutdown.remaining()))
+    threading.Thread(
+        target=control, args=(engine, registry, conn, shutdown.request),
+        name='control', daemon=True
+    ).start()
+    logging.info('Воркер %s запущен.', name)
+    try:
+        engine.run()
+    finally:
+        queue.close(shutdown.remaining())
+        store.close()
+
+
+def control(engine: PollEngine, registry: SubscriptionRegistry,
+            conn, stop=None) -> None:
+    """Выполняет команды супервизора в процессе воркера.
+    По команде stop и при потере связи вызывает stop() (по умолчанию -
+    engine.stop).
+    """
+    while True:
+        try:
+            command, ids = conn.recv()
+        except (EOFError, OSError):
+            break
+        if command == 'assign':
+            engine.assign([
+                registry.get(id) for id in ids if registry.get(id)
+            ])
+        elif command == 'revoke':
+            engine.revoke(ids)
+            conn.send(('revoked', ids))
+        else:
+            break
+    (stop or engine.stop)()
+
+
+class Supervisor:
+    """Запускает workers процессов и распределяет между ними подписчиков.
+    Погибший воркер убирается с кольца, его подписчики сразу переходят к
+    остальным, а через restart_delay секунд запускается замена, которая
+    забирает свою долю обратно. Переезд без двойной отправки: прежний
+    владелец снимает подписчика с опроса, дожидается текущего опроса,
+    убирает его неотправленные уведомления из своей очереди в outbox и
+    сохраняет курсор, и только после его ответа подписчик назначается
+    новому, который и отправляет уведомления из outbox. Если воркер
+    гибнет, не успев сохранить курсор, изменения последних
+    STATE_FLUSH_INTERVAL секунд могут прийти повторно.
+    """
+
+    def __init__(self, registry: SubscriptionRegistry, workers: int,
+                 restart_delay: float = 1.0, replicas: int = 64):
+        self.registry = registry
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.ring = HashRing(replicas=replicas)
+        self.revoke_timeout = (
+            homework.CONNECT_TIMEOUT + homework.READ_TIMEOUT + 5
+        )
+        self.owners = {}
+        self._processes = {}
+        self._restarts = {}
+        self._stopped = False
+
+    def run(self) -> None:
+        """Следит за воркерами до SIGTERM/SIGINT."""
+        if homework.STATE_DB == ':memory:':
+            logging.warning('Курсоры не переживут переезд подписчиков '
+                            'без общего STATE_DB.')
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for number in range(self.workers):
+            self.join(f'worker-{number}')
+        try:
+            while not self._stopped:
+                self._watch()
+        finally:
+            self._shutdown()
+
+    def stop(self, *args) -> None:
+        self._stopped = True
+
+    def join(self, name: str) -> None:
+        """Запускает воркера и отдаёт ему его долю подписчиков."""
+        parent, child = CONTEXT.Pipe()
+        process = CONTEXT.Process(
+            target=worker_main, args=(name, self.registry, child), name=name
+        )
+        process.start()
+        child.close()
+        self._processes[name] = (process, parent)
+        self.ring.add(name)
+        self.rebalance()
+
+    def leave(self, name: str) -> None:
+        """Убирает погибшего воркера и раздаёт его подписчиков."""
+        process, conn = self._processes.pop(name)
+        process.join()
+        conn.close()
+        self.ring.remove(name)
+        for id, owner in list(self.owners.items()):
+            if owner == name:
+                del self.owners[id]
+        logging.error('Воркер %s завершился с кодом %s.', name,
+                      process.exitcode)
+        self.rebalance()
+
+    def rebalance(self) -> None:
+        """Приводит закрепление подписчиков в соответствие с кольцом."""
+        moves = {}
+        for subscriber in self.registry:
+            node = self.ring.node_for(subscriber.id)
+            if self.owners.get(subscriber.id) != node:
+                moves[subscriber.id] = node
+        self._revoke_moved(moves)
+        assigned = {}
+        for id, node in moves.items():
+            if id not in self.owners and node is not None:
+                assigned.setdefault(node, []).append(id)
+        for node, ids in assigned.items():
+            self._assign(node, ids)
+        if moves:
+            logging.info('Перераспределено подписчиков: %s.', len(moves))
+
+    def _revoke_moved(self, moves: dict) -> None:
+        revoked = {}
+        for id in moves:
+            if id in self.owners:
+                revoked.setdefault(self.owners[id], []).append(id)
+        for owner, ids in revoked.items():
+            if self._revoke(owner, ids):
+                for id in ids:
+                    del self.owners[id]
+
+    def _assign(self, node: str, ids: list) -> None:
+        try:
+            self._processes[node][1].send(('assign', ids))
+        except OSError:
+            # Воркер уже погиб: подписчики переедут, когда _watch заметит.
+            return
+        self.owners.update(dict.fromkeys(ids, node))
+
+    def _revoke(self, owner: str, ids: list) -> bool:
+        """Снимает подписчиков с воркера; False - воркер не ответил."""
+        process, conn = self._processes[owner]
+        try:
+            conn.send(('revoke', ids))
+            if conn.poll(self.revoke_timeout):
+                conn.recv()
+                return True
+        except (EOFError, OSError):
+            pass
+        # Не ответивший воркер мог продолжить опрос - останавливаем его,
+        # подписчики переедут, когда _watch заметит его гибель.
+        process.terminate()
+        return False
+
+    def _watch(self) -> None:
+        sentinels = {
+            process.sentinel: name
+            for name, (process, _) in self._processes.items()
+        }
+        timeout = WATCH_INTERVAL
+        if self._restarts:
+            timeout = min(timeout, max(
+                0.0, min(self._restarts.values()) - time.monotonic()
+            ))
+        for sentinel in wait(list(sentinels), timeout):
+            if not self._stopped:
+                self.leave(sentinels[sentinel])
+                self._restarts[sentinels[sentinel]] = (
+                    time.monotonic() + self.restart_delay
+                )
+        now = time.monotonic()
+        for name, restart_at in list(self._restarts.items()):
+            if restart_at <= now and not self._stopped:
+                del self._restarts[name]
+                self.join(name)
+
+    def _shutdown(self) -> None:
+        for process, conn in self._processes.values():
+            try:
+                conn.send(('stop', None))
+            except OSError:
+                pass
+        for process, conn in self._processes.values():
+            process.join(self.revoke_timeout + homework.SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._processes.clear()
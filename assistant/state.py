@@ -0,0 +1,268 @@
+"""Хранилище состояния подписчиков между перезапусками.
+Хранит курсор from_date, последнюю ошибку и последний известный статус
+каждой домашней работы, поэтому статусы, изменившиеся во время простоя,
+не теряются. Там же outbox - уведомления, записанные до отправки и
+удаляемые после доставки: они переживают сбой Telegram и перезапуск.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from assistant.records import key_of, status_of
+
+
+def homework_key(homework) -> str:
+    """Идентификатор домашней работы в ответе API."""
+    return str(key_of(homework))
+
+
+def new_id() -> int:
+    """Случайный id записи outbox: уникален и между процессами-воркерами."""
+    return int.from_bytes(os.urandom(8), 'big') >> 1
+
+
+class MemoryStore:
+    """Состояние в памяти процесса (для тестов и бенчмарков)."""
+
+    def __init__(self):
+        self.cursors = {}
+        self.statuses = {}
+        self.outbox = {}
+
+    def restore(self, subscriber) -> bool:
+        """Восстанавливает курсор и последнюю ошибку подписчика."""
+        saved = self.cursors.get(subscriber.id)
+        if saved is None:
+            return False
+        subscriber.from_date, subscriber.last_error = saved
+        return True
+
+    def save(self, subscriber, homeworks: list = ()) -> None:
+        """Запоминает курсор, ошибку и статусы полученных работ."""
+        self.cursors[subscriber.id] = (
+            subscriber.from_date, subscriber.last_error
+        )
+        for item in homeworks:
+            self.statuses[subscriber.id, homework_key(item)] = status_of(item)
+
+    def status(self, subscriber_id: str, homework_id: str) -> str:
+        """Последний известный статус работы или None."""
+        return self.statuses.get((subscriber_id, homework_id))
+
+    def enqueue(self, owner: str, chat_id, message: str,
+                parse_mode: str = None) -> int:
+        """Записывает уведомление подписчика owner в outbox; возвращает id."""
+        id = new_id()
+        self.outbox[id] = (owner, chat_id, message, parse_mode, time.time())
+        return id
+
+    def ack(self, ids) -> None:
+        """Удаляет из outbox доставленные уведомления."""
+        for id in ids:
+            self.outbox.pop(id, None)
+
+    def pending(self, owner: str) -> list:
+        """Недоставленные уведомления owner: (id, chat_id, текст, разметка)."""
+        return [
+            (id, chat_id, message, parse_mode)
+            for id, (subscriber_id, chat_id, message, parse_mode, _)
+            in self.outbox.items() if subscriber_id == owner
+        ]
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteStore(MemoryStore):
+    """Состояние в SQLite с пакетной записью.
+    save() только кладёт изменения в буфер, поэтому не добавляет задержку
+    в цикл опроса. Фоновый поток записывает буфер одной транзакцией раз в
+    flush_interval секунд или как только в нём накопится batch_size
+    изменений; при flush_interval=0 запись синхронная. Частоту fsync
+    задаёт synchronous (PRAGMA synchronous: OFF, NORMAL, FULL).
+    Записи outbox попадают в ту же транзакцию, что и курсоры: уведомление,
+    поставленное до save(), не может оказаться на диске позже курсора.
+    Подтверждение доставки (ack) записи, ещё не попавшей на диск, просто
+    убирает её из буфера.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0,
+                 batch_size: int = 500, synchronous: str = 'NORMAL'):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.acked = set()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(f'PRAGMA synchronous={synchronous}')
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS cursors (
+                subscriber_id TEXT PRIMARY KEY,
+                from_date INTEGER,
+                last_error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS statuses (
+                subscriber_id TEXT,
+                homework_id TEXT,
+                status TEXT,
+                PRIMARY KEY (subscriber_id, homework_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY,
+                subscriber_id TEXT,
+                chat_id,
+                message TEXT,
+                parse_mode TEXT,
+                created REAL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_subscriber
+                ON outbox (subscriber_id, created);
+        ''')
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='state-flush', daemon=True
+            )
+            self._flusher.start()
+
+    def restore(self, subscriber) -> bool:
+        with self._lock:
+            if super().restore(subscriber):
+                return True
+        with self._db_lock:
+            saved = self._db.execute(
+                'SELECT from_date, last_error FROM cursors '
+                'WHERE subscriber_id = ?', (subscriber.id,)
+            ).fetchone()
+        if saved is None:
+            return False
+        subscriber.from_date, subscriber.last_error = saved
+        return True
+
+    def save(self, subscriber, homeworks: list = ()) -> None:
+        with self._lock:
+            super().save(subscriber, homeworks)
+            pending = self._buffered()
+        self._changed(pending)
+
+    def status(self, subscriber_id: str, homework_id: str) -> str:
+        with self._lock:
+            status = super().status(subscriber_id, homework_id)
+        if status is not None:
+            return status
+        with self._db_lock:
+            saved = self._db.execute(
+                'SELECT status FROM statuses '
+                'WHERE subscriber_id = ? AND homework_id = ?',
+                (subscriber_id, homework_id)
+            ).fetchone()
+        return saved and saved[0]
+
+    def enqueue(self, owner: str, chat_id, message: str,
+                parse_mode: str = None) -> int:
+        with self._lock:
+            id = super().enqueue(owner, chat_id, message, parse_mode)
+            pending = self._buffered()
+        self._changed(pending)
+        return id
+
+    def ack(self, ids) -> None:
+        with self._lock:
+            for id in ids:
+                if self.outbox.pop(id, None) is None:
+                    self.acked.add(id)
+
+    def pending(self, owner: str) -> list:
+        with self._db_lock:
+            with self._lock:
+                buffered = super().pending(owner)
+                acked = set(self.acked)
+            saved = self._db.execute(
+                'SELECT id, chat_id, message, parse_mode FROM outbox '
+                'WHERE subscriber_id = ? ORDER BY created', (owner,)
+            ).fetchall()
+        return [row for row in saved if row[0] not in acked] + buffered
+
+    def flush(self) -> None:
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._db_lock:
+            with self._lock:
+                cursors, self.cursors = self.cursors, {}
+                statuses, self.statuses = self.statuses, {}
+                outbox, self.outbox = self.outbox, {}
+                acked, self.acked = self.acked, set()
+            if not (cursors or statuses or outbox or acked):
+                return
+            try:
+                with self._db:
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO cursors VALUES (?, ?, ?)',
+                        [(id, *saved) for id, saved in cursors.items()]
+                    )
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                        [(*key, status) for key, status in statuses.items()]
+                    )
+                    self._db.executemany(
+                        'INSERT INTO outbox VALUES (?, ?, ?, ?, ?, ?)',
+                        [(id, *row) for id, row in outbox.items()]
+                    )
+                    self._db.executemany(
+                        'DELETE FROM outbox WHERE id = ?',
+                        [(id,) for id in acked]
+                    )
+            except sqlite3.Error:
+                # Возвращаем несохранённое в буфер, не затирая более свежее.
+                with self._lock:
+                    self.cursors = {**cursors, **self.cursors}
+                    self.statuses = {**statuses, **self.statuses}
+                    self.outbox = {**outbox, **self.outbox}
+                    self.acked |= acked
+                raise
+
+    def close(self) -> None:
+        """Останавливает фоновую запись и сохраняет остаток буфера."""
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._db.close()
+
+    def _buffered(self) -> int:
+        """Число изменений в буфере (вызывается под self._lock)."""
+        return (len(self.cursors) + len(self.statuses) + len(self.outbox)
+                + len(self.acked))
+
+    def _changed(self, pending: int) -> None:
+        """Запускает запись буфера, если пора."""
+        if not self.flush_interval:
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as error:
+                logging.exception('Не удалось сохранить состояние: %s',
+                                  error)
+
+
+def open_store(path: str, **options) -> MemoryStore:
+    """Открывает SQLite хранилище; для ':memory:' - хранилище в памяти."""
+    if path == ':memory:':
+        return MemoryStore()
+    return SqliteStore(path, **options)
@@ -0,0 +1,66 @@
+"""Пул keep-alive соединений к API с учётом рукопожатий и задержек."""
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from assistant import metrics
+from assistant.metrics import PoolStats
+
+
+def counting_pool(pool_class, stats: PoolStats):
+    """Класс пула urllib3, сообщающий о каждом установленном соединении.
+    Считается connect(), а не создание объекта соединения: urllib3 может
+    переподключать закрытое сервером соединение тем же объектом.
+    """
+    connection_class = pool_class.ConnectionCls
+
+    def connect(self):
+        stats.record_handshake()
+        return connection_class.connect(self)
+
+    return type(pool_class.__name__, (pool_class,), {
+        'ConnectionCls': type(
+            connection_class.__name__, (connection_class,),
+            {'connect': connect}
+        ),
+    })
+
+
+class HttpPool:
+    """Постоянная сессия requests с ограниченным пулом соединений.
+    Соединения переиспользуются между опросами (keep-alive), поэтому
+    TCP и TLS рукопожатия выполняются только при открытии нового соединения.
+    Интерфейс get совпадает с requests.get.
+    """
+
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0, keepalive: bool = True):
+        self.stats = PoolStats()
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=pool_size, pool_block=True)
+        adapter.poolmanager.pool_classes_by_scheme = {
+            'http': counting_pool(HTTPConnectionPool, self.stats),
+            'https': counting_pool(HTTPSConnectionPool, self.stats),
+        }
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keepalive:
+            self.session.headers['Connection'] = 'close'
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET через пул; по умолчанию с таймаутами пула."""
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        finally:
+            self.stats.record_request(time.perf_counter() - started)
+        metrics.RESPONSE_SIZE.observe(len(response.content))
+        return response
+
+    def close(self) -> None:
+        """Закрывает все соединения пула."""
+        self.session.close()
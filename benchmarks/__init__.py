@@ -0,0 +1 @@
+"""Бенчмарки бота-ассистента на локальных заглушках."""
@@ -0,0 +1,107 @@
+"""Задержка от изменения статуса до доставки в Telegram: threads vs asyncio.
+
+Запуск: python -m benchmarks.bench_async --subscribers 1 100 1000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.request import Request, urlopen
+
+from telegram import Bot
+from telegram.utils.request import Request as TelegramRequest
+
+import homework
+from assistant.aio import AsyncEngine
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from benchmarks import fake_api, fake_telegram
+
+TELEGRAM_TOKEN = '123456:bench'
+
+
+def call(url: str, data: dict = None) -> dict:
+    body = json.dumps(data).encode() if data is not None else None
+    request = Request(url, body, {'Content-Type': 'application/json'})
+    with urlopen(request) as response:
+        return json.load(response)
+
+
+def start_engine(mode: str, registry, args):
+    """Запускает движок в фоновом потоке, возвращает функцию остановки."""
+    if mode == 'async':
+        engine = AsyncEngine(registry, TELEGRAM_TOKEN, args.interval,
+                             args.concurrency)
+        thread = threading.Thread(target=asyncio.run, args=(engine.run(),))
+    else:
+        bot = Bot(TELEGRAM_TOKEN, base_url=f'{homework.TELEGRAM_API_URL}/bot',
+                  request=TelegramRequest(con_pool_size=args.workers))
+        engine = PollEngine(registry, bot, args.interval, args.workers)
+        thread = threading.Thread(target=engine.run)
+    thread.start()
+
+    def stop():
+        engine.stop()
+        thread.join()
+    return stop
+
+
+def measure(mode: str, subscribers: int, api_url: str, args) -> dict:
+    registry = SubscriptionRegistry()
+    tokens = [f'token-{number:08d}' for number in range(subscribers)]
+    for number, token in enumerate(tokens):
+        registry.add(token, number)
+    stop = start_engine(mode, registry, args)
+    time.sleep(args.interval)
+    call(f'{homework.TELEGRAM_API_URL}/stats')
+    for _ in range(args.changes):
+        call(f'{api_url}/control/change', {'tokens': [random.choice(tokens)]})
+        time.sleep(args.duration / args.changes)
+    deadline = time.monotonic() + args.interval * 5
+    latencies = []
+    while len(latencies) < args.changes and time.monotonic() < deadline:
+        time.sleep(args.interval / 4)
+        latencies += call(f'{homework.TELEGRAM_API_URL}/stats')['latencies']
+    stop()
+    latencies.sort()
+    return {
+        'delivered': len(latencies),
+        'mean': statistics.mean(latencies) if latencies else float('nan'),
+        'p50': latencies[len(latencies) // 2] if latencies else float('nan'),
+        'p99': (latencies[int(len(latencies) * 0.99)]
+                if latencies else float('nan')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, nargs='+',
+                        default=[1, 100, 1000])
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--changes', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--api-latency', type=float, default=0.05)
+    args = parser.parse_args()
+    api, api_url = fake_api.start_server(
+        fake_api.HomeworkStatusesHandler, latency=args.api_latency
+    )
+    telegram, homework.TELEGRAM_API_URL = fake_telegram.start_in_process()
+    homework.ENDPOINT = f'{api_url}{fake_api.PATH}'
+    print('mode   subscribers delivered  mean_s   p50_s   p99_s')
+    for subscribers in args.subscribers:
+        for mode in ('sync', 'async'):
+            result = measure(mode, subscribers, api_url, args)
+            print(f'{mode:6} {subscribers:11} {result["delivered"]:9} '
+                  f'{result["mean"]:7.3f} {result["p50"]:7.3f} '
+                  f'{result["p99"]:7.3f}')
+    api.terminate()
+    telegram.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Скорость backfill: окон в секунду в зависимости от числа потоков.
+
+Заглушка API отвечает с задержкой latency; backfill проходит историю
+subscribers подписчиков окнами по дню за days дней. Для --rate выводится,
+держит ли backfill заданную частоту запросов.
+
+Запуск: python -m benchmarks.bench_backfill --subscribers 100 --days 14
+"""
+import argparse
+import time
+
+import homework
+from assistant.backfill import DAY, Backfill
+from assistant.registry import Subscriber
+from assistant.state import MemoryStore
+from benchmarks import fake_api
+
+
+def measure(subscribers: int, days: int, workers: int,
+            rate: float) -> tuple:
+    """(окон в секунду, секунд всего)."""
+    until = int(time.time())
+    backfill = Backfill(
+        [Subscriber(f'token-{n:08d}', n) for n in range(subscribers)],
+        MemoryStore(), until - days * DAY, until, DAY, workers, rate,
+        progress=60,
+    )
+    started = time.perf_counter()
+    stats = backfill.run()
+    elapsed = time.perf_counter() - started
+    return stats['windows'] / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=100)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[1, 4, 16, 64])
+    parser.add_argument('--rate', type=float, default=200)
+    args = parser.parse_args()
+    process, homework.ENDPOINT = fake_api.start_in_process(args.latency)
+    homework.init_session(max(args.workers))
+    try:
+        print('workers   rate  windows/s  seconds')
+        for workers in args.workers:
+            for rate in (0, args.rate):
+                speed, elapsed = measure(args.subscribers, args.days,
+                                         workers, rate)
+                print(f'{workers:7} {rate or "-":>6} {speed:10.0f} '
+                      f'{elapsed:8.2f}')
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Условные запросы: опрос без кэша ответов и с ним.
+
+Заглушка API отдаёт homeworks неизменных работ с reviewer_comment длиной
+payload_size; изменения статусов не создаются, поэтому с кэшем почти
+каждый ответ - 304 без тела. Выводит запросы в секунду, задержки и CPU
+процесса на один опрос.
+
+Запуск: python -m benchmarks.bench_cache --requests 2000 --homeworks 50
+"""
+import argparse
+import statistics
+import time
+
+import homework
+from assistant.cache import ResponseCache
+from assistant.transport import HttpPool
+from benchmarks import fake_api
+
+
+def measure(cache, count: int) -> dict:
+    """Выполняет count опросов одного подписчика."""
+    latencies = []
+    cpu = time.process_time()
+    for _ in range(count):
+        started = time.perf_counter()
+        response = homework.request_homeworks(
+            'token', 0, cache=cache, key='subscriber'
+        )
+        homework.check_response(response)
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu
+    latencies.sort()
+    return {
+        'requests_per_second': count / sum(latencies),
+        'latency_p50_ms': statistics.median(latencies) * 1000,
+        'latency_p99_ms': latencies[int(count * 0.99)] * 1000,
+        'cpu_per_poll_us': cpu / count * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--homeworks', type=int, default=50)
+    parser.add_argument('--payload-size', type=int, default=512)
+    args = parser.parse_args()
+    process, homework.ENDPOINT = fake_api.start_in_process(
+        homeworks=args.homeworks, payload_size=args.payload_size, etag=True
+    )
+    homework.api_session = HttpPool(pool_size=1)
+    cache = ResponseCache()
+    for name, session_cache in (('без кэша', None), ('ResponseCache', cache)):
+        result = measure(session_cache, args.requests)
+        print(name, ', '.join(f'{k}={v:.2f}' for k, v in result.items()))
+    print('ResponseCache', cache.snapshot())
+    process.terminate()
+
+
+if __name__ == '__main__':
+    main()
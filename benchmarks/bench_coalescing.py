@@ -0,0 +1,81 @@
+"""Сколько запросов к API экономит объединение опросов с общим токеном.
+
+tokens токенов, у каждого chats чатов (студент, группа наставника...);
+PollEngine опрашивает их duration секунд с интервалом interval через
+заглушку API с задержкой latency. Сравниваются опросы без объединения
+(flights = None) и с ним: опросов, запросов к API и доля сэкономленных.
+
+Запуск: python -m benchmarks.bench_coalescing --tokens 200 --chats 1 2 3 5
+"""
+import argparse
+import threading
+import time
+
+import homework
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from benchmarks import fake_api
+from benchmarks.harness import call
+
+
+class NullBot:
+    def send_message(self, chat_id, text=None, **kwargs):
+        pass
+
+
+class CountingEngine(PollEngine):
+    polls = 0
+
+    def poll(self, subscriber):
+        super().poll(subscriber)
+        self.polls += 1
+
+
+def measure(api_url: str, tokens: int, chats: int, coalesce: bool,
+            interval: float, duration: float, workers: int) -> tuple:
+    """(опросов, запросов к API)."""
+    registry = SubscriptionRegistry()
+    for number in range(tokens):
+        for chat in range(chats):
+            registry.add(f'token-{number:08d}', number * chats + chat)
+    engine = CountingEngine(registry, NullBot(), interval, workers)
+    if not coalesce:
+        engine.flights = None
+    before = call(f'{api_url}/stats')['requests']
+    thread = threading.Thread(target=engine.run)
+    thread.start()
+    time.sleep(duration)
+    engine.stop()
+    thread.join()
+    return engine.polls, call(f'{api_url}/stats')['requests'] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--chats', type=int, nargs='+', default=[1, 2, 3, 5])
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args()
+    process, homework.ENDPOINT = fake_api.start_in_process(args.latency)
+    api_url = homework.ENDPOINT[:-len(fake_api.PATH)]
+    homework.init_session(args.workers)
+    try:
+        print('chats  coalesce   polls  requests  saved')
+        for chats in args.chats:
+            for coalesce in (False, True):
+                polls, requests = measure(
+                    api_url, args.tokens, chats, coalesce, args.interval,
+                    args.duration, args.workers
+                )
+                saved = 1 - requests / polls if polls else 0.0
+                print(f'{chats:5} {str(coalesce):>9} {polls:7} '
+                      f'{requests:9} {saved:6.0%}')
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Сколько подписчиков обслуживает одно ядро и сколько памяти они занимают.
+
+Запуск: python -m benchmarks.bench_engine --subscribers 2000 --duration 10
+"""
+import argparse
+import threading
+import time
+import tracemalloc
+
+import homework
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from benchmarks import fake_api
+
+
+class NullBot:
+    def send_message(self, chat_id, text=None, **kwargs):
+        pass
+
+
+class CountingEngine(PollEngine):
+    polls = 0
+
+    def poll(self, subscriber):
+        super().poll(subscriber)
+        self.polls += 1
+
+
+def measure_memory(subscribers: int) -> float:
+    """Байт на подписчика: реестр плюс записи в очереди планировщика."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    registry = SubscriptionRegistry()
+    for number in range(subscribers):
+        registry.add(f'token-{number:08d}', number)
+    engine = PollEngine(registry, NullBot(), workers=1)
+    engine.start()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    engine.stop()
+    engine.run()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'lineno'))
+    return size / subscribers
+
+
+def measure_throughput(subscribers: int, interval: float, duration: float,
+                       workers: int, latency: float) -> dict:
+    process, homework.ENDPOINT = fake_api.start_in_process(latency)
+    registry = SubscriptionRegistry()
+    for number in range(subscribers):
+        registry.add(f'token-{number:08d}', number)
+    engine = CountingEngine(registry, NullBot(), interval, workers)
+    thread = threading.Thread(target=engine.run)
+    cpu, wall = time.process_time(), time.monotonic()
+    thread.start()
+    time.sleep(duration)
+    engine.stop()
+    thread.join()
+    cpu, wall = time.process_time() - cpu, time.monotonic() - wall
+    process.terminate()
+    polls_per_cpu_second = engine.polls / cpu
+    return {
+        'polls': engine.polls,
+        'polls_per_second': engine.polls / wall,
+        'cpu_seconds': cpu,
+        'subscribers_per_core': polls_per_cpu_second * homework.RETRY_TIME,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=2000)
+    parser.add_argument('--interval', type=float, default=2.0)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    print(f'Память на подписчика: {measure_memory(args.subscribers):.0f} Б')
+    result = measure_throughput(
+        args.subscribers, args.interval, args.duration, args.workers,
+        args.latency
+    )
+    for key, value in result.items():
+        print(f'{key}: {value:.1f}')
+
+
+if __name__ == '__main__':
+    main()
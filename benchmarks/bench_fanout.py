@@ -0,0 +1,92 @@
+"""Рассылка одного уведомления по маршрутам: от 1 до 1000 чатов.
+
+Подписчик с chats - 1 маршрутами (половина - на другом языке) получает
+одно изменение статуса. Замеряются: формирование сообщений
+(routing.render), постановка их в очередь отправки вместе с outbox - то,
+что рассылка добавляет к циклу опроса, - и время до доставки во все чаты
+ботом-заглушкой с задержкой latency через SendQueue с workers воркерами.
+Для сравнения - отправка по одному без очереди (до --sequential чатов).
+Ограничения частоты Telegram сняты: с ними 1000 чатов - не меньше 33 с.
+
+Запуск: python -m benchmarks.bench_fanout --chats 1 10 100 1000
+"""
+import argparse
+import time
+import timeit
+
+import homework
+from assistant import routing
+from assistant.records import Homework, Status
+from assistant.registry import Route, Subscriber
+from assistant.sender import SendQueue
+from assistant.state import MemoryStore
+
+ITEM = Homework(1, 'hw.zip', Status.APPROVED)
+
+
+class SlowBot:
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        time.sleep(self.latency)
+
+
+def make_subscriber(chats: int) -> Subscriber:
+    return Subscriber('token', 0, routes=[
+        Route(chat_id, locale='en' if chat_id % 2 else None)
+        for chat_id in range(1, chats)
+    ])
+
+
+def measure_queue(subscriber: Subscriber, latency: float,
+                  workers: int) -> tuple:
+    """(мкс на постановку в очередь, секунд до доставки во все чаты)."""
+    store = MemoryStore()
+    queue = SendQueue(SlowBot(latency), workers=workers, global_rate=1e9,
+                      chat_rate=1e9, outbox=store)
+    outgoing = routing.render(subscriber, ITEM)
+    started = time.perf_counter()
+    queue.send_many(outgoing, subscriber.id)
+    enqueued = time.perf_counter() - started
+    queue.close()
+    return enqueued * 1e6, time.perf_counter() - started
+
+
+def measure_sequential(subscriber: Subscriber, latency: float) -> float:
+    """Секунд на отправку во все чаты по одному."""
+    bot = SlowBot(latency)
+    started = time.perf_counter()
+    for chat_id, text, parse_mode in routing.render(subscriber, ITEM):
+        homework.deliver(bot, chat_id, text, parse_mode)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chats', type=int, nargs='+',
+                        default=[1, 10, 100, 1000])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--sequential', type=int, default=100)
+    args = parser.parse_args()
+    print('chats  render_us  enqueue_us  queue_s  sequential_s')
+    for chats in args.chats:
+        subscriber = make_subscriber(chats)
+        number = max(1, 10_000 // chats)
+        render = timeit.timeit(
+            lambda: routing.render(subscriber, ITEM), number=number
+        ) / number * 1e6
+        enqueue, delivered = measure_queue(subscriber, args.latency,
+                                           args.workers)
+        sequential = (
+            f'{measure_sequential(subscriber, args.latency):12.2f}'
+            if chats <= args.sequential else f'{"-":>12}'
+        )
+        print(f'{chats:5} {render:10.1f} {enqueue:11.0f} {delivered:8.2f} '
+              f'{sequential}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Средняя задержка уведомления против числа запросов к API.
+
+Моделирует жизненный цикл домашних работ в виртуальном времени и сравнивает
+фиксированный RETRY_TIME с AdaptiveInterval. Сеть не используется.
+
+Запуск: python -m benchmarks.bench_intervals --subscribers 1000 --days 14
+"""
+import argparse
+import random
+import statistics
+
+import homework
+from assistant.intervals import AdaptiveInterval
+from assistant.registry import Subscriber
+
+DAY = 24 * 60 * 60
+
+
+def status_changes(days: float, rng: random.Random) -> list:
+    """События (время, статус) одного студента: сдача, ревью, вердикт."""
+    changes = []
+    submitted = rng.expovariate(1 / (3 * DAY))
+    while submitted < days * DAY:
+        taken = submitted + rng.expovariate(1 / (12 * 60 * 60))
+        verdict = taken + rng.expovariate(1 / (2 * 60 * 60))
+        changes.append((taken, 'reviewing'))
+        changes.append((verdict, rng.choice(('approved', 'rejected'))))
+        submitted = verdict + rng.expovariate(1 / (3 * DAY))
+    return changes
+
+
+def simulate(policy, days: float, error_rate: float, rng: random.Random):
+    """Число запросов и задержки уведомлений одного студента.
+    Задержки считаются отдельно для взятия работы на ревью и для вердикта.
+    """
+    changes = status_changes(days, rng)
+    subscriber = Subscriber('token', 1)
+    subscriber.changed_at = 0.0
+    delays = {'reviewing': [], 'verdict': []}
+    now, requests, index = rng.uniform(0, policy.base), 0, 0
+    while now < days * DAY:
+        requests += 1
+        if rng.random() < error_rate:
+            policy.observe_error(subscriber, ConnectionError())
+        else:
+            homeworks = []
+            while index < len(changes) and changes[index][0] <= now:
+                changed_at, status = changes[index]
+                kind = 'reviewing' if status == 'reviewing' else 'verdict'
+                delays[kind].append(now - changed_at)
+                homeworks = [{'status': status}]
+                index += 1
+            policy.observe(subscriber, homeworks, now=now)
+        now += policy.next_delay(subscriber, now=now)
+    return requests, delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--days', type=float, default=14)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    base = homework.RETRY_TIME
+    policies = {
+        'fixed': AdaptiveInterval(base, base, base, jitter=0),
+        'adaptive': AdaptiveInterval(),
+    }
+    print('policy    req/sub/day  change     mean_delay_s  p95_delay_s')
+    for name, policy in policies.items():
+        rng = random.Random(args.seed)
+        requests, delays = 0, {'reviewing': [], 'verdict': []}
+        for _ in range(args.subscribers):
+            count, subscriber_delays = simulate(
+                policy, args.days, args.error_rate, rng
+            )
+            requests += count
+            for kind, values in subscriber_delays.items():
+                delays[kind] += values
+        volume = requests / args.subscribers / args.days
+        for kind, values in delays.items():
+            values.sort()
+            print(f'{name:9} {volume:12.1f}  {kind:9} '
+                  f'{statistics.mean(values):13.1f} '
+                  f'{values[int(len(values) * 0.95)]:12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Затраты на логирование одного опроса: до и после assistant.logs.
+
+Опрос пишет в лог ответ API (DEBUG), каждую изменившуюся работу (DEBUG) и
+каждую отправку (INFO). «до» - logging.basicConfig с синхронной записью
+и f-строками, «после» - очередь с фоновой записью, ленивое форматирование
+и выборка DEBUG-записей с содержимым ответов (--sample). Лог пишется в
+/dev/null или, с --pipe, в канал к отдельному процессу, как stdout в
+контейнере; время «в опросе» - задержка, которую логирование добавляет
+циклу опроса, «всего» - вместе с фоновой записью.
+
+Запуск: python -m benchmarks.bench_logging --homeworks 20 --polls 2000
+"""
+import argparse
+import logging
+import os
+import subprocess
+import time
+
+from assistant import logs
+
+
+def make_response(count: int) -> dict:
+    return {
+        'homeworks': [{
+            'id': number,
+            'homework_name': f'hw_{number}.zip',
+            'status': 'approved',
+            'reviewer_comment': 'Всё нравится ' * 10,
+            'date_updated': '2022-01-01T00:00:00Z',
+        } for number in range(count)],
+        'current_date': 0,
+    }
+
+
+def poll_before(response: dict, changes: int) -> None:
+    logging.debug('Ответ API: %s', response)
+    for item in response['homeworks'][:changes]:
+        logging.debug('Домашняя работа: %s', item)
+        message = f'Изменился статус проверки работы "{item["id"]}".'
+        logging.info(f'Отправлено в Telegram: {message}')
+
+
+def poll_after(response: dict, changes: int) -> None:
+    with logs.bind(subscriber='0123456789ab'):
+        logs.debug_payload('Ответ API: %s', response)
+        for item in response['homeworks'][:changes]:
+            with logs.bind(homework=item['id']):
+                logs.debug_payload('Домашняя работа: %s', item)
+                message = f'Изменился статус проверки работы "{item["id"]}".'
+                logging.info('Отправлено в Telegram: %s', message)
+
+
+def reset_root() -> None:
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def measure(poll, args, stream) -> tuple:
+    """Микросекунд на опрос: в цикле опроса и с учётом фоновой записи."""
+    response = make_response(args.homeworks)
+    started = time.perf_counter()
+    for _ in range(args.polls):
+        poll(response, args.changes)
+    produced = time.perf_counter() - started
+    logs.shutdown()
+    stream.flush()
+    total = time.perf_counter() - started
+    return produced / args.polls * 1e6, total / args.polls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--changes', type=int, default=1,
+                        help='изменившихся работ в ответе')
+    parser.add_argument('--polls', type=int, default=2000)
+    parser.add_argument('--sample', type=float, default=0.01)
+    parser.add_argument('--pipe', action='store_true',
+                        help='писать в канал к процессу cat, а не в /dev/null')
+    args = parser.parse_args()
+    print(f'{"уровень":>8} {"вариант":>14} {"в опросе, мкс":>14} '
+          f'{"всего, мкс":>11}')
+    reader = None
+    if args.pipe:
+        reader = subprocess.Popen(
+            ['cat'], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+            text=True, encoding='utf-8'
+        )
+        stream = reader.stdin
+    else:
+        stream = open(os.devnull, 'w')
+    with stream:
+        for level in (logging.INFO, logging.DEBUG):
+            reset_root()
+            logging.basicConfig(stream=stream, level=level,
+                                format=logs.TEXT_FORMAT)
+            results = [('до', measure(poll_before, args, stream))]
+            for format in ('text', 'json'):
+                reset_root()
+                logs.setup(level, format, args.sample, stream=stream)
+                results.append((f'после, {format}',
+                                measure(poll_after, args, stream)))
+            for name, (produced, total) in results:
+                print(f'{logging.getLevelName(level):>8} {name:>14} '
+                      f'{produced:>14.1f} {total:>11.1f}')
+        reset_root()
+    if reader is not None:
+        reader.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Пропускная способность outbox при всплеске уведомлений.
+
+producers потоков (как потоки опроса) одновременно ставят messages
+уведомлений в очередь отправки и сохраняют курсор; бот-заглушка отвечает
+мгновенно. Замеряется, сколько send() добавляет к циклу опроса (p50/p99),
+за сколько доставлен весь всплеск и сколько записей осталось в outbox
+после остановки. Режимы: без outbox, outbox с пакетной записью (group
+commit вместе с курсорами) и с записью на каждое уведомление.
+
+Запуск: python -m benchmarks.bench_outbox --messages 20000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from assistant.registry import Subscriber
+from assistant.sender import SendQueue
+from assistant.state import SqliteStore
+from benchmarks.harness import percentile
+
+MODES = {
+    'no outbox': ({'flush_interval': 1.0}, False),
+    'batched NORMAL': ({'flush_interval': 1.0}, True),
+    'batched FULL': ({'flush_interval': 1.0, 'synchronous': 'FULL'}, True),
+    'sync NORMAL': ({'flush_interval': 0}, True),
+    'sync FULL': ({'flush_interval': 0, 'synchronous': 'FULL'}, True),
+}
+
+
+class NullBot:
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        pass
+
+
+def burst(options: dict, outbox: bool, messages: int, producers: int,
+          chats: int) -> tuple:
+    """(задержки send + save, секунд на доставку, остаток в outbox)."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.sqlite3')
+        store = SqliteStore(path, **options)
+        queue = SendQueue(NullBot(), workers=4, global_rate=1e9,
+                          chat_rate=1e9, outbox=store if outbox else None)
+        population = [Subscriber(f'token-{n}', n) for n in range(chats)]
+        latencies = [[] for _ in range(producers)]
+        start = threading.Barrier(producers + 1)
+
+        def produce(number):
+            start.wait()
+            for index in range(number, messages, producers):
+                subscriber = population[index % chats]
+                started = time.perf_counter()
+                queue.send(subscriber.chat_id, f'Уведомление {index}',
+                           owner=subscriber.id)
+                subscriber.from_date += 1
+                store.save(subscriber)
+                latencies[number].append(time.perf_counter() - started)
+
+        threads = [
+            threading.Thread(target=produce, args=(number,))
+            for number in range(producers)
+        ]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        queue.close()
+        store.close()
+        elapsed = time.perf_counter() - started
+        with sqlite3.connect(path) as db:
+            left = db.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+    return sorted(sum(latencies, [])), elapsed, left
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--producers', type=int, default=16)
+    parser.add_argument('--chats', type=int, default=1000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+    print('mode              p50_us    p99_us   msg/s  outbox_left')
+    for name in args.modes:
+        options, outbox = MODES[name]
+        latencies, elapsed, left = burst(
+            options, outbox, args.messages, args.producers, args.chats
+        )
+        print(f'{name:15} {percentile(latencies, 0.5) * 1e6:8.1f} '
+              f'{percentile(latencies, 0.99) * 1e6:9.1f} '
+              f'{args.messages / elapsed:7.0f} {left:12}')
+
+
+if __name__ == '__main__':
+    main()
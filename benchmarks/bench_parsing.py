@@ -0,0 +1,96 @@
+"""Разбор ответа API: прежний путь против потокового разбора со схемой.
+
+Прежний путь - json.loads всего тела и f-строки в logging.debug, которые
+форматируют весь ответ даже при выключенном DEBUG. Новый - load_response
+(потоковый разбор массива homeworks, только поля схемы) и ленивое
+форматирование логов; iter_homeworks - работы по одной, без списка.
+Выводит время разбора и пиковую память на ответ.
+
+Запуск: python -m benchmarks.bench_parsing --homeworks 100 1000 5000
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+import homework
+from assistant.schema import iter_homeworks, load_response
+
+
+def make_body(count: int, comment_size: int) -> bytes:
+    return json.dumps({
+        'homeworks': [{
+            'id': number,
+            'status': 'approved',
+            'homework_name': f'user__hw{number}.zip',
+            'reviewer_comment': 'x' * comment_size,
+            'date_updated': '2022-01-01T00:00:00Z',
+            'lesson_name': 'Итоговый проект',
+        } for number in range(count)],
+        'current_date': 1,
+    }).encode()
+
+
+def legacy(body: bytes) -> int:
+    """Разбор в том виде, в каком он был до схемы."""
+    response = json.loads(body)
+    logging.debug(f'Ответ API: {response}')
+    homeworks = response['homeworks']
+    if not isinstance(homeworks, list):
+        raise TypeError
+    for item in homeworks:
+        logging.debug(f'Домашняя работа: {item}')
+        if type(item) != dict:  # noqa: E721
+            raise TypeError
+        homework.HOMEWORK_VERDICTS[item['status']]
+        f'Изменился статус проверки работы "{item["homework_name"]}".'
+    return len(homeworks)
+
+
+def streamed(body: bytes) -> int:
+    homeworks = homework.check_response(load_response(body))
+    for item in homeworks:
+        homework.parse_status(item)
+    return len(homeworks)
+
+
+def lazy(body: bytes) -> int:
+    count = 0
+    for item in iter_homeworks(body):
+        homework.parse_status(item)
+        count += 1
+    return count
+
+
+def measure(function, body: bytes, repeat: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(body)
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    function(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--homeworks', type=int, nargs='+',
+                        default=[100, 1000, 5000])
+    parser.add_argument('--comment-size', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(f'{"работ":>6} {"путь":>9} {"мс":>8} {"пик, КБ":>9}')
+    for count in args.homeworks:
+        body = make_body(count, args.comment_size)
+        for function in (legacy, streamed, lazy):
+            elapsed, peak = measure(function, body, args.repeat)
+            print(f'{count:>6} {function.__name__:>9} '
+                  f'{elapsed * 1000:>8.2f} {peak / 1024:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
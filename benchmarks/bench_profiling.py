@@ -0,0 +1,88 @@
+"""Цена профилирования цикла опроса.
+
+Цикл PollEngine.poll без сети: ответ API готов заранее (homeworks работ, из
+них changed - с новым статусом), отправка - в пустой бот. Сравниваются
+выключенное профилирование, только замеры этапов и замеры с выборочным
+профайлером; отдельно - цена вызова span() без профилирования.
+
+Запуск: python -m benchmarks.bench_profiling --cycles 20000
+"""
+import argparse
+import tempfile
+import time
+import timeit
+
+import homework
+from assistant import profiling
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+
+MODES = {
+    'off': None,
+    'spans': 0,
+    'spans+sampler': 0.005,
+}
+
+
+class NullBot:
+    def send_message(self, chat_id, text=None, **kwargs):
+        pass
+
+
+def make_responses(homeworks: int, changed: int, cycles: int) -> list:
+    """Ответы по циклам: changed работ в каждом - новые (с уведомлением)."""
+    return [
+        {
+            'homeworks': [
+                {'id': cycle * homeworks + number if number < changed
+                 else number,
+                 'homework_name': f'hw{number}.zip', 'status': 'approved',
+                 'date_updated': '2024-01-01T00:00:00Z'}
+                for number in range(homeworks)
+            ],
+            'current_date': cycle,
+        }
+        for cycle in range(cycles)
+    ]
+
+
+def measure(interval, cycles: int, homeworks: int, changed: int) -> float:
+    """Микросекунд на цикл опроса."""
+    responses = iter(make_responses(homeworks, changed, cycles))
+    homework.request_homeworks = lambda *args, **kwargs: next(responses)
+    registry = SubscriptionRegistry()
+    subscriber = registry.add('token', 1)
+    engine = PollEngine(registry, NullBot(), workers=1)
+    if interval is not None:
+        profiling.configure(sample_interval=interval,
+                            output=tempfile.gettempdir())
+        profiling.start()
+    started = time.perf_counter()
+    for _ in range(cycles):
+        engine.poll(subscriber)
+    elapsed = time.perf_counter() - started
+    profiling.stop()
+    return elapsed / cycles * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cycles', type=int, default=20_000)
+    parser.add_argument('--homeworks', type=int, default=3)
+    parser.add_argument('--changed', type=int, default=1)
+    args = parser.parse_args()
+    number = 1_000_000
+    cost = timeit.timeit(
+        "with span('request'): pass",
+        globals={'span': profiling.span}, number=number
+    )
+    bare = timeit.timeit('pass', number=number)
+    print(f'span() без профилирования: {(cost - bare) / number * 1e9:.0f} нс')
+    print('mode            us/cycle')
+    for name, interval in MODES.items():
+        cost = measure(interval, args.cycles, args.homeworks, args.changed)
+        print(f'{name:15} {cost:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
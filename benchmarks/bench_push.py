@@ -0,0 +1,31 @@
+"""Задержка уведомлений: опрос против push-событий.
+
+Запускает бота через benchmarks.harness дважды: с опросом раз в
+--interval секунд и с приёмом push-событий (PUSH_PORT), когда генератор
+присылает боту каждое созданное изменение, а опрос - сверка раз в
+--reconcile секунд. Сравнивает задержку доставки, запросы к API и CPU.
+
+Запуск:
+    python -m benchmarks.bench_push --subscribers 100 --interval 30
+"""
+from benchmarks import harness
+
+
+def main():
+    parser = harness.parser()
+    parser.description = __doc__
+    parser.set_defaults(interval=30, warmup=5.0, duration=20.0, changes=50)
+    args = parser.parse_args()
+    print(f'{"режим":>6} {"доставлено":>10} {"p50, с":>7} {"p99, с":>7} '
+          f'{"запросов/с":>11} {"CPU, с":>7}')
+    for push in (False, True):
+        args.push = push
+        result = harness.run_benchmark(args)
+        print(f'{"push" if push else "poll":>6} {result["delivered"]:>10} '
+              f'{result["latency_p50"]:>7.3f} {result["latency_p99"]:>7.3f} '
+              f'{result["api_requests_per_second"]:>11.2f} '
+              f'{result["cpu_seconds"]:>7.2f}')
+
+
+if __name__ == '__main__':
+    main()
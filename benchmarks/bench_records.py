@@ -0,0 +1,43 @@
+"""Память на отслеживаемую домашнюю работу: словари API против Homework.
+
+Строит ответы с заданным числом работ и сравнивает, сколько байт на
+работу занимает список словарей из json.loads и список записей Homework
+из load_response.
+
+Запуск: python -m benchmarks.bench_records --homeworks 100000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from assistant.schema import load_response
+from benchmarks.bench_parsing import make_body
+
+
+def retained(function, body: bytes) -> int:
+    """Байт, оставшихся занятыми результатом function(body)."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(body)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--homeworks', type=int, default=100_000)
+    parser.add_argument('--comment-size', type=int, default=0,
+                        help='длина reviewer_comment, байт')
+    args = parser.parse_args()
+    body = make_body(args.homeworks, args.comment_size)
+    for name, function in (('dict', json.loads), ('Homework', load_response)):
+        size = retained(function, body)
+        print(f'{name:>8}: {size / args.homeworks:7.0f} байт на работу')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Масштабирование шардированного режима: подписчики против числа воркеров.
+
+Для каждого числа воркеров запускает бота (SHARD_WORKERS) через
+benchmarks.harness и измеряет запросы к API в секунду; из них выводится,
+сколько подписчиков выдержит бот при интервале опроса RETRY_TIME. Интервал
+самого прогона короткий (--interval), чтобы упереться в пропускную
+способность, а не в расписание.
+
+Запуск:
+    python -m benchmarks.bench_sharding --shards-list 1 2 4 --subscribers 2000
+"""
+from benchmarks import harness
+
+RETRY_TIME = 600
+
+
+def main():
+    parser = harness.parser()
+    parser.description = __doc__
+    parser.add_argument('--shards-list', dest='shards_list', type=int,
+                        nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    args.mode = 'sharded'
+    print(f'{"воркеров":>8} {"запросов/с":>11} {"подписчиков":>12} '
+          f'{"доставлено":>10} {"p99, с":>7} {"CPU, с":>7}')
+    for shards in args.shards_list:
+        args.shards = shards
+        result = harness.run_benchmark(args)
+        print(f'{shards:>8} {result["api_requests_per_second"]:>11.1f} '
+              f'{result["api_requests_per_second"] * RETRY_TIME:>12.0f} '
+              f'{result["delivered"]:>10} {result["latency_p99"]:>7.2f} '
+              f'{result["cpu_seconds"]:>7.2f}')
+
+
+if __name__ == '__main__':
+    main()
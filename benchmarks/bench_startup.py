@@ -0,0 +1,118 @@
+"""Время запуска бота: импорт homework и время до первого опроса.
+
+Импорт замеряется в свежем интерпретаторе (python -c "import homework")
+за вычетом запуска пустого интерпретатора; там же выводится, какие тяжёлые
+зависимости загрузил импорт. Время до первого опроса - от запуска процесса
+бота (python homework.py) до первого запроса к заглушке API; заглушка
+Telegram принимает уведомление о запуске.
+
+Запуск: python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import fake_api, fake_telegram
+from benchmarks.harness import ROOT, call
+
+HEAVY = ('telegram', 'requests', 'aiohttp', 'dotenv', 'urllib3')
+MODES = ('single', 'threads', 'async')
+
+
+def run_python(code: str) -> float:
+    """Секунд на python -c code в свежем интерпретаторе."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+    return time.perf_counter() - started
+
+
+def import_time(runs: int) -> float:
+    """Медиана секунд на import homework сверх пустого интерпретатора."""
+    empty = statistics.median(run_python('pass') for _ in range(runs))
+    full = statistics.median(
+        run_python('import homework') for _ in range(runs)
+    )
+    return full - empty
+
+
+def heavy_imports() -> list:
+    """Тяжёлые зависимости, которые загружает import homework."""
+    output = subprocess.run(
+        [sys.executable, '-c',
+         f'import sys, homework; print([m for m in {HEAVY!r} '
+         'if m in sys.modules])'],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.replace("'", '"'))
+
+
+def time_to_first_poll(mode: str, api_url: str, telegram_url: str,
+                       subscribers_file: str, timeout: float = 30) -> float:
+    """Секунд от запуска процесса бота до его первого запроса к API."""
+    env = dict(
+        os.environ,
+        PRACTICUM_ENDPOINT=f'{api_url}{fake_api.PATH}',
+        TELEGRAM_API_URL=telegram_url,
+        TELEGRAM_TOKEN='123456:bench',
+        STATE_DB=':memory:',
+    )
+    if mode == 'single':
+        env.update(PRACTICUM_TOKEN='token-00000000', TELEGRAM_CHAT_ID='1')
+        env.pop('SUBSCRIBERS_FILE', None)
+    else:
+        env.update(SUBSCRIBERS_FILE=subscribers_file,
+                   ASYNC_MODE='1' if mode == 'async' else '0')
+    before = call(f'{api_url}/stats')['requests']
+    started = time.perf_counter()
+    bot = subprocess.Popen(
+        [sys.executable, 'homework.py'], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while call(f'{api_url}/stats')['requests'] == before:
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f'{mode}: нет опроса за {timeout} с')
+            time.sleep(0.002)
+        return time.perf_counter() - started
+    finally:
+        bot.send_signal(signal.SIGTERM)
+        bot.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+    print(f'import homework: {import_time(args.runs) * 1000:.0f} мс, '
+          f'тяжёлые зависимости: {heavy_imports() or "нет"}')
+    api, api_url = fake_api.start_server(fake_api.HomeworkStatusesHandler)
+    telegram, telegram_url = fake_telegram.start_in_process()
+    with tempfile.NamedTemporaryFile('w', suffix='.json',
+                                     delete=False) as file:
+        json.dump([{'token': 'token-00000000', 'chat_id': 1}], file)
+    try:
+        for mode in args.modes:
+            times = [
+                time_to_first_poll(mode, api_url, telegram_url, file.name)
+                for _ in range(args.runs)
+            ]
+            print(f'{mode:>8}: до первого опроса '
+                  f'{statistics.median(times) * 1000:.0f} мс '
+                  f'(мин. {min(times) * 1000:.0f})')
+    finally:
+        api.terminate()
+        telegram.terminate()
+        os.unlink(file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Сколько времени save() добавляет к циклу опроса.
+
+Сравнивает синхронную запись с fsync на каждый опрос и пакетную запись.
+Запуск: python -m benchmarks.bench_state --polls 5000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from assistant.registry import Subscriber
+from assistant.state import SqliteStore
+
+MODES = {
+    'sync FULL': {'flush_interval': 0, 'synchronous': 'FULL'},
+    'sync NORMAL': {'flush_interval': 0, 'synchronous': 'NORMAL'},
+    'batched NORMAL': {'flush_interval': 1.0, 'synchronous': 'NORMAL'},
+    'batched OFF': {'flush_interval': 1.0, 'synchronous': 'OFF'},
+}
+
+
+def measure(options: dict, polls: int, subscribers: int) -> list:
+    with tempfile.TemporaryDirectory() as directory:
+        store = SqliteStore(os.path.join(directory, 'state.sqlite3'),
+                            **options)
+        population = [Subscriber(f'token-{n}', n) for n in range(subscribers)]
+        latencies = []
+        for number in range(polls):
+            subscriber = population[number % subscribers]
+            subscriber.from_date += 1
+            homeworks = [{'id': number, 'status': 'approved'}]
+            started = time.perf_counter()
+            store.save(subscriber, homeworks)
+            latencies.append(time.perf_counter() - started)
+        store.close()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--polls', type=int, default=5000)
+    parser.add_argument('--subscribers', type=int, default=1000)
+    args = parser.parse_args()
+    print('mode            p50_us    p99_us')
+    for name, options in MODES.items():
+        latencies = measure(options, args.polls, args.subscribers)
+        print(f'{name:15} {statistics.median(latencies) * 1e6:7.1f} '
+              f'{latencies[int(len(latencies) * 0.99)] * 1e6:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Экономия на рукопожатиях: requests.get против пула keep-alive соединений.
+
+Запуск: python -m benchmarks.bench_transport --requests 2000
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+import homework
+from assistant.transport import HttpPool
+from benchmarks import fake_api
+
+
+def measure(session, count: int) -> dict:
+    """Выполняет count опросов через homework.request_homeworks."""
+    homework.api_session = session
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        homework.request_homeworks('token', 0)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        'requests_per_second': count / sum(latencies),
+        'latency_p50_ms': statistics.median(latencies) * 1000,
+        'latency_p99_ms': latencies[int(count * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    process, homework.ENDPOINT = fake_api.start_in_process()
+    pool = HttpPool(pool_size=1)
+    for name, session in (('requests.get', requests), ('HttpPool', pool)):
+        result = measure(session, args.requests)
+        print(name, ', '.join(f'{k}={v:.2f}' for k, v in result.items()))
+    print('HttpPool', pool.stats.snapshot())
+    process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Локальная заглушка эндпойнта homework_statuses API Практикума.
+Изменения статусов создаются запросом POST /control/change с телом
+{"tokens": [...]}, в ответе - созданные работы {"homeworks": [[токен,
+работа], ...]} для push-событий; каждое изменение отдаётся подписчику
+один раз, а время
+изменения зашито в название работы (hw@<time.time()>), чтобы заглушка
+Telegram могла посчитать задержку доставки. GET /stats отдаёт счётчики.
+
+Настройки обработчика: latency - задержка ответа, error_rate - доля
+ответов 502, homeworks - число неизменных работ в каждом ответе,
+payload_size - длина reviewer_comment каждой работы, etag - отдавать
+ETag и отвечать 304 на If-None-Match, пока у токена нет изменений.
+"""
+import json
+import multiprocessing
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PATH = '/api/user_api/homework_statuses/'
+
+
+class HomeworkStatusesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    error_rate = 0.0
+    homeworks = 0
+    payload_size = 0
+    etag = False
+    pending = {}
+    versions = {}
+    counters = {'requests': 0, 'errors': 0, 'changes': 0}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.lock:
+                return self.send_json(dict(self.counters))
+        if not self.path.startswith(PATH):
+            return self.send_error(404)
+        token = self.headers.get('Authorization', '')
+        if not token.startswith('OAuth '):
+            return self.send_error(401)
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.counters['requests'] += 1
+            if random.random() < self.error_rate:
+                self.counters['errors'] += 1
+                failed = True
+            else:
+                failed = False
+                changes = self.pending.pop(token[len('OAuth '):], [])
+                if changes:
+                    self.versions[token] = self.versions.get(token, 0) + 1
+                version = f'"{self.versions.get(token, 0)}"'
+        if failed:
+            return self.send_error(502)
+        headers = {}
+        if self.etag and not changes:
+            if self.headers.get('If-None-Match') == version:
+                self.send_response(304)
+                self.send_header('ETag', version)
+                self.send_header('Content-Length', '0')
+                return self.end_headers()
+            headers['ETag'] = version
+        self.send_json({
+            'homeworks': changes + self.static_homeworks(),
+            'current_date': int(time.time()),
+        }, headers)
+
+    def do_POST(self):
+        if self.path != '/control/change':
+            return self.send_error(404)
+        length = int(self.headers.get('Content-Length', 0))
+        tokens = json.loads(self.rfile.read(length))['tokens']
+        changed_at = time.time()
+        created = []
+        with self.lock:
+            for token in tokens:
+                self.counters['changes'] += 1
+                item = self.homework(
+                    self.counters['changes'] + self.homeworks,
+                    f'hw@{changed_at:.6f}', 'reviewing',
+                )
+                self.pending.setdefault(token, []).append(item)
+                created.append([token, item])
+        self.send_json({'changed': len(tokens), 'homeworks': created})
+
+    def homework(self, id: int, name: str, status: str) -> dict:
+        return {
+            'id': id,
+            'homework_name': name,
+            'status': status,
+            'reviewer_comment': 'x' * self.payload_size,
+            'date_updated': '2022-01-01T00:00:00Z',
+            'lesson_name': 'Бенчмарк',
+        }
+
+    def static_homeworks(self) -> list:
+        return [
+            self.homework(id, f'static-{id}', 'approved')
+            for id in range(self.homeworks)
+        ]
+
+    def send_json(self, data, headers: dict = None):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """Обрывы соединений при остановке бота - не ошибка заглушки."""
+
+
+def serve(handler, port_queue, **attrs) -> None:
+    """Запускает сервер и сообщает выбранный порт через очередь."""
+    handler = type('Handler', (handler,), attrs)
+    server = QuietServer(('127.0.0.1', 0), handler)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_server(handler, **attrs):
+    """Запускает заглушку в отдельном процессе.
+    Отдельный процесс не искажает замеры CPU бенчмарка.
+    Возвращает процесс и базовый URL сервера.
+    """
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=serve, args=(handler, ports), kwargs=attrs, daemon=True
+    )
+    process.start()
+    return process, f'http://127.0.0.1:{ports.get()}'
+
+
+def start_in_process(latency: float = 0.0, **options):
+    """Запускает заглушку API; возвращает процесс и URL эндпойнта."""
+    process, url = start_server(
+        HomeworkStatusesHandler, latency=latency, **options
+    )
+    return process, f'{url}{PATH}'
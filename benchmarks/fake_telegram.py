@@ -0,0 +1,86 @@
+"""Локальная заглушка Telegram Bot API (только sendMessage).
+Считает задержку доставки по времени, зашитому заглушкой API в название
+работы; GET /stats отдаёт накопленные задержки и сбрасывает их.
+С вероятностью error_rate отвечает 429 с retry_after.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+from benchmarks.fake_api import start_server
+
+CHANGED_AT = re.compile(r'hw@(\d+\.\d+)')
+
+
+class SendMessageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    error_rate = 0.0
+    retry_after = 1
+    latencies = []
+    messages = [0]
+    throttled = [0]
+    lock = threading.Lock()
+
+    def do_POST(self):
+        if not self.path.endswith('/sendMessage'):
+            return self.send_error(404)
+        received_at = time.time()
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length).decode()
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(raw)
+        else:
+            data = {key: value[0] for key, value in parse_qs(raw).items()}
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            with self.lock:
+                self.throttled[0] += 1
+            return self.send_json({
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests',
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+        with self.lock:
+            self.messages[0] += 1
+            for match in CHANGED_AT.finditer(data.get('text', '')):
+                self.latencies.append(received_at - float(match.group(1)))
+        self.send_json({'ok': True, 'result': {
+            'message_id': 1,
+            'date': int(received_at),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+    def do_GET(self):
+        if self.path != '/stats':
+            return self.send_error(404)
+        with self.lock:
+            stats = {'messages': self.messages[0],
+                     'throttled': self.throttled[0],
+                     'latencies': list(self.latencies)}
+            self.latencies.clear()
+            self.messages[0] = self.throttled[0] = 0
+        self.send_json(stats)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_in_process(latency: float = 0.0, **options):
+    """Запускает заглушку Telegram; возвращает процесс и базовый URL."""
+    return start_server(SendMessageHandler, latency=latency, **options)
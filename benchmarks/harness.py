@@ -0,0 +1,199 @@
+"""Сквозной бенчмарк бота против локальных заглушек API и Telegram.
+
+Запускает настоящий процесс бота (python homework.py) в выбранном режиме,
+генерирует изменения статусов и измеряет пропускную способность, задержку
+уведомлений (p50/p99), затраты CPU и пиковый RSS процесса бота.
+Работает без сети.
+
+Запуск: python -m benchmarks.harness --mode threads --subscribers 1000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.request import Request, urlopen
+
+from assistant.registry import subscriber_id
+from benchmarks import fake_api, fake_telegram
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('single', 'threads', 'async', 'sharded')
+
+
+def call(url: str, data: dict = None) -> dict:
+    body = json.dumps(data).encode() if data is not None else None
+    request = Request(url, body, {'Content-Type': 'application/json'})
+    with urlopen(request) as response:
+        return json.load(response)
+
+
+def percentile(values: list, share: float) -> float:
+    if not values:
+        return float('nan')
+    return sorted(values)[min(len(values) - 1, int(len(values) * share))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bot_environment(args, api_url: str, telegram_url: str,
+                    subscribers_file: str, state_db: str) -> dict:
+    env = dict(
+        os.environ,
+        PRACTICUM_ENDPOINT=f'{api_url}{fake_api.PATH}',
+        TELEGRAM_API_URL=telegram_url,
+        TELEGRAM_TOKEN='123456:bench',
+        RETRY_TIME=str(args.interval),
+        STATE_DB=state_db,
+        POLL_WORKERS=str(args.workers),
+        POLL_CONCURRENCY=str(args.concurrency),
+        PUSH_PORT=str(args.push_port),
+        RECONCILE_TIME=str(args.reconcile),
+    )
+    if args.mode == 'single':
+        env.update(PRACTICUM_TOKEN='token-00000000', TELEGRAM_CHAT_ID='1')
+        env.pop('SUBSCRIBERS_FILE', None)
+    else:
+        env.update(SUBSCRIBERS_FILE=subscribers_file)
+        env['ASYNC_MODE'] = '1' if args.mode == 'async' else '0'
+        env['SHARD_WORKERS'] = str(
+            args.shards if args.mode == 'sharded' else 0
+        )
+    return env
+
+
+def push_events(port: int, chats: dict, created: list) -> None:
+    """Присылает боту созданные заглушкой API изменения (режим push)."""
+    for token, item in created:
+        id = subscriber_id(token, chats[token])
+        call(f'http://127.0.0.1:{port}/push/{id}', item)
+
+
+def run_benchmark(args) -> dict:
+    """Прогоняет один сценарий и возвращает результаты."""
+    subscribers = 1 if args.mode == 'single' else args.subscribers
+    tokens = [f'token-{number:08d}' for number in range(subscribers)]
+    chats = {token: number for number, token in enumerate(tokens)}
+    if args.mode == 'single':
+        chats = {tokens[0]: 1}
+    args.push_port = free_port() if args.push else 0
+    api, api_url = fake_api.start_server(
+        fake_api.HomeworkStatusesHandler, latency=args.api_latency,
+        error_rate=args.api_error_rate, homeworks=args.homeworks,
+        payload_size=args.payload_size,
+    )
+    telegram, telegram_url = fake_telegram.start_in_process(
+        args.telegram_latency, error_rate=args.telegram_error_rate
+    )
+    with tempfile.NamedTemporaryFile('w', suffix='.json',
+                                     delete=False) as file:
+        json.dump([{'token': token, 'chat_id': number}
+                   for number, token in enumerate(tokens)], file)
+    # Воркерам шардированного режима нужны общие курсоры.
+    state_dir = tempfile.mkdtemp()
+    state_db = (os.path.join(state_dir, 'state.sqlite3')
+                if args.mode == 'sharded' else ':memory:')
+    bot = subprocess.Popen(
+        [sys.executable, 'homework.py'], cwd=ROOT,
+        env=bot_environment(args, api_url, telegram_url, file.name,
+                            state_db),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        time.sleep(args.warmup)
+        call(f'{telegram_url}/stats')
+        requests_before = call(f'{api_url}/stats')['requests']
+        started = time.monotonic()
+        for _ in range(args.changes):
+            created = call(f'{api_url}/control/change',
+                           {'tokens': [random.choice(tokens)]})
+            if args.push:
+                push_events(args.push_port, chats, created['homeworks'])
+            time.sleep(args.duration / args.changes)
+        latencies, messages, throttled = [], 0, 0
+        deadline = time.monotonic() + args.interval * 5 + 5
+        while len(latencies) < args.changes and time.monotonic() < deadline:
+            time.sleep(0.2)
+            stats = call(f'{telegram_url}/stats')
+            latencies += stats['latencies']
+            messages += stats['messages']
+            throttled += stats['throttled']
+        elapsed = time.monotonic() - started
+        requests = call(f'{api_url}/stats')['requests'] - requests_before
+    finally:
+        bot.send_signal(signal.SIGTERM)
+        _, _, usage = os.wait4(bot.pid, 0)
+        bot.returncode = 0
+        api.terminate()
+        telegram.terminate()
+        os.unlink(file.name)
+        shutil.rmtree(state_dir)
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        'mode': args.mode,
+        'shards': args.shards if args.mode == 'sharded' else 1,
+        'push': args.push,
+        'subscribers': subscribers,
+        'api_requests_per_second': requests / elapsed,
+        'messages': messages,
+        'throttled': throttled,
+        'delivered': len(latencies),
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_mean': (statistics.mean(latencies)
+                         if latencies else float('nan')),
+        'cpu_seconds': cpu,
+        'max_rss_mb': usage.ru_maxrss / 1024,
+    }
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--mode', choices=MODES, default='threads')
+    parser.add_argument('--subscribers', type=int, default=100)
+    parser.add_argument('--interval', type=int, default=1,
+                        help='RETRY_TIME бота, с')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--changes', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--shards', type=int, default=2,
+                        help='процессов-воркеров в режиме sharded')
+    parser.add_argument('--push', action='store_true',
+                        help='присылать изменения боту (PUSH_PORT)')
+    parser.add_argument('--reconcile', type=int, default=3600,
+                        help='RECONCILE_TIME бота в режиме push, с')
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--homeworks', type=int, default=0,
+                        help='неизменных работ в каждом ответе API')
+    parser.add_argument('--payload-size', type=int, default=0,
+                        help='длина reviewer_comment, байт')
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    return parser
+
+
+def main():
+    result = run_benchmark(parser().parse_args())
+    for key, value in result.items():
+        print(f'{key:24} {value:.3f}' if isinstance(value, float)
+              else f'{key:24} {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -18,10 +18,30 @@ class RequestToEndpointFailed(BotAssistantException):
 
 
 class ApiAnswerTypeError(BotAssistantException):
-    def __init__(self, error):
-        super().__init__('Некорректнй тип ответа API! {error}')
+    def __init__(self, error=''):
+        super().__init__(f'Некорректный тип ответа API! {error}')
 
 
 class HomeworkTypeError(BotAssistantException):
     def __init__(self, error):
         super().__init__(f'Некорректный тип домашки в ответе API! {error}')
+
+
+class HomeworkKeyError(BotAssistantException, KeyError):
+    def __init__(self, key):
+        super().__init__(f'В домашке из ответа API нет ключа "{key}"')
+
+    def __str__(self):
+        return self.args[0]
+
+
+class CircuitOpen(BotAssistantException):
+    """Запрос не отправлен: сервис признан недоступным.
+    Текст совпадает с последней ошибкой сервиса, поэтому подписчик,
+    которому о ней уже сообщили, не получит повторное уведомление.
+    """
+
+    def __init__(self, upstream, error, retry_after=None):
+        super().__init__(error)
+        self.upstream = upstream
+        self.retry_after = retry_after
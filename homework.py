@@ -7,55 +7,235 @@
 """Бот-ассистент: уведомляет о проверке домашней работы."""
 import logging
 import os
+import signal
 import sys
 import time
-
-import requests
-from dotenv import load_dotenv
-from telegram import Bot
+from contextlib import nullcontext
+from http import HTTPStatus
+from typing import TYPE_CHECKING
 
 import exceptions as _
+from assistant import logs, messages, metrics, profiling, schema
+from assistant.records import Homework
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+
+def load_env() -> None:
+    """Загружает ближайший .env в каталоге бота или выше.
+    python-dotenv импортируется, только если файл есть.
+    """
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, '.env')
+        if os.path.isfile(candidate):
+            from dotenv import load_dotenv
+            load_dotenv(candidate)
+            return
+        parent = os.path.dirname(path)
+        if parent == path:
+            return
+        path = parent
 
-load_dotenv()
+
+load_env()
 
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
-RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE')
+# Дополнительные чаты для уведомлений единственного подписчика: JSON файл
+# со списком маршрутов (см. assistant.registry.Route); у подписчиков из
+# SUBSCRIBERS_FILE маршруты задаются ключом "routes".
+ROUTES_FILE = os.getenv('ROUTES_FILE')
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 16))
+ASYNC_MODE = os.getenv('ASYNC_MODE') == '1'
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 100))
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', 0))
+SHARD_NODES = os.getenv('SHARD_NODES', '')
+SHARD_NODE = os.getenv('SHARD_NODE', '')
+
+STATE_DB = os.getenv('STATE_DB', 'homework_bot.sqlite3')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 1))
+STATE_SYNCHRONOUS = os.getenv('STATE_SYNCHRONOUS', 'NORMAL')
+
+DEDUP_SIZE = int(os.getenv('DEDUP_SIZE', 100_000))
+DEDUP_TTL = int(os.getenv('DEDUP_TTL', 7 * 24 * 60 * 60))
+
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 4))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+# Формат лога: text или json; доля DEBUG-записей с содержимым ответов API.
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_PAYLOAD_SAMPLE = float(os.getenv('LOG_PAYLOAD_SAMPLE', 0.01))
+
+# Приём push-событий (см. assistant.push); с ним опрос - редкая сверка раз
+# в RECONCILE_TIME секунд.
+PUSH_PORT = int(os.getenv('PUSH_PORT', 0))
+PUSH_SECRET = os.getenv('PUSH_SECRET')
+RECONCILE_TIME = int(os.getenv('RECONCILE_TIME', 60 * 60))
+
+# Ошибки сводятся в одно сообщение за ERROR_WINDOW секунд (assistant.alerts);
+# с ADMIN_CHAT_ID ошибки подписчиков уходят администратору, а не им.
+ERROR_WINDOW = float(os.getenv('ERROR_WINDOW', 600))
+ADMIN_CHAT_ID = os.getenv('ADMIN_CHAT_ID')
+
+# Язык и разметка Telegram (MarkdownV2, HTML) сообщений по умолчанию;
+# у подписчиков из SUBSCRIBERS_FILE могут быть свои (см. assistant.messages).
+LOCALE = os.getenv('LOCALE', messages.DEFAULT_LOCALE)
+PARSE_MODE = os.getenv('PARSE_MODE') or None
 
+# Сколько секунд после SIGTERM/SIGINT есть на то, чтобы доработать начатые
+# опросы и отправить очередь сообщений (см. assistant.lifecycle).
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 10))
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+# Профилирование цикла опроса (см. assistant.profiling): PROFILE=1 - с
+# запуска, иначе включается и выключается по SIGUSR1. Отчёты - в PROFILE_DIR.
+PROFILE = os.getenv('PROFILE') == '1'
+PROFILE_SLOWEST = int(os.getenv('PROFILE_SLOWEST', 10))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
 
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 30))
+KEEPALIVE_TIMEOUT = float(os.getenv('KEEPALIVE_TIMEOUT', 60))
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', '1') == '1'
 
-def send_message(bot: Bot, message: str) -> None:
-    """Отправляет сообщение в Telegram чат."""
+RETRY_TIME = int(os.getenv('RETRY_TIME', 600))
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 120))
+MAX_RETRY_TIME = int(os.getenv('MAX_RETRY_TIME', 3600))
+IDLE_AFTER = int(os.getenv('IDLE_AFTER', 24 * 60 * 60))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_RESET_TIME = float(os.getenv('BREAKER_RESET_TIME', RETRY_TIME))
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
+
+
+# Через этот объект идут все запросы к API: до запуска бота - модуль
+# requests (см. default_session), после - пул keep-alive соединений
+# (см. init_session).
+api_session = None
+# Очередь отправки в Telegram (assistant.sender.SendQueue), см. init_bot.
+send_queue = None
+# Кэш ответов API (assistant.cache.ResponseCache), см. init_cache.
+response_cache = None
+# Предохранители API и Telegram (assistant.breaker.CircuitBreaker), общие
+# для всех подписчиков процесса, см. init_breakers.
+api_breaker = None
+telegram_breaker = None
+# Маршруты уведомлений единственного подписчика, см. init_routes.
+routes = ()
+
+HOMEWORK_VERDICTS = messages.LOCALES[messages.DEFAULT_LOCALE]['verdicts']
+
+
+def send_message(bot: 'Bot', message: str) -> None:
+    """Отправляет сообщение в Telegram чат.
+    После init_bot сообщения идут через очередь отправки.
+    """
+    with profiling.span('send'):
+        if send_queue is None:
+            deliver(bot, TELEGRAM_CHAT_ID, message, PARSE_MODE)
+        else:
+            send_queue.send(TELEGRAM_CHAT_ID, message, PARSE_MODE)
+
+
+def deliver(bot: 'Bot', chat_id, message: str,
+            parse_mode: str = None) -> bool:
+    """Отправляет сообщение в указанный Telegram чат."""
+    started = time.perf_counter()
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, text=message)
+        with telegram_breaker or nullcontext():
+            bot.send_message(chat_id, text=message, parse_mode=parse_mode)
     except Exception as e:
-        logging.exception(f'Не удалось отправить в телеграм. Ошибка: {e}')
-    else:
-        logging.info(f'Отправлено в Telegram: {message}')
+        metrics.SEND_FAILURES.inc()
+        logging.exception('Не удалось отправить в телеграм. Ошибка: %s', e)
+        return False
+    finally:
+        metrics.SEND_LATENCY.observe(time.perf_counter() - started)
+    logging.info('Отправлено в Telegram: %s', message)
+    return True
 
 
 def get_api_answer(current_timestamp: int) -> dict:
     """Делает запрос к единственному эндпоинту API-сервиса."""
-    timestamp = current_timestamp or int(time.time())
+    return request_homeworks(
+        PRACTICUM_TOKEN, current_timestamp,
+        cache=response_cache, key=TELEGRAM_CHAT_ID
+    )
+
+
+def request_homeworks(token: str, from_date: int, cache=None,
+                      key=None, flights=None) -> dict:
+    """Запрашивает статусы домашних работ от имени владельца токена.
+    С кэшем ответов (cache, key - подписчик) запрос условный, а ответ,
+    не изменившийся с прошлого раза, приходит без домашних работ.
+    С flights (assistant.flight.SingleFlight) одинаковые одновременные
+    запросы уходят в сеть один раз, а тело ответа разбирается один раз.
+    """
+    timestamp = from_date or int(time.time())
+    headers = {'Authorization': f'OAuth {token}'}
+    if cache is not None:
+        headers.update(cache.validators(key))
     params = {'from_date': timestamp}
-    response = requests.get(ENDPOINT, headers=HEADERS, params=params)
-    if response.status_code == requests.codes.not_found:
-        raise _.RequestToEndpointFailed('Недоступен эндпойнт')
-    if response.status_code == requests.codes.ok:
-        return response.json()
-    else:
-        response.raise_for_status()
+    if flights is not None:
+        return flights.do(
+            flights.key(headers, params), fetch_reply, headers, params
+        ).result(cache, key)
+    response = send_request(headers, params)
+    if cache is not None and (
+        response.status_code == HTTPStatus.NOT_MODIFIED
+    ):
+        return cache.not_modified(key)
+    if response.status_code == HTTPStatus.OK:
+        with profiling.span('decode'):
+            if cache is not None:
+                return cache.load(key, response.content, response.headers)
+            return response.json()
+
+
+def send_request(headers: dict, params: dict):
+    """GET к эндпойнту API; ответ 200 или 304, иначе исключение."""
+    with api_breaker or nullcontext():
+        started = time.perf_counter()
+        with profiling.span('request'):
+            response = (api_session or default_session()).get(
+                ENDPOINT, headers=headers, params=params,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
+        metrics.POLL_LATENCY.observe(time.perf_counter() - started)
+        if response.status_code == HTTPStatus.NOT_FOUND:
+            raise _.RequestToEndpointFailed('Недоступен эндпойнт')
+        if response.status_code not in (
+            HTTPStatus.OK, HTTPStatus.NOT_MODIFIED
+        ):
+            response.raise_for_status()
+    return response
+
+
+def fetch_reply(headers: dict, params: dict):
+    """Запрос для объединения (flights): ответ без разбора тела."""
+    from assistant.flight import Reply
+
+    response = send_request(headers, params)
+    return Reply(response.status_code, response.content, response.headers)
+
+
+def default_session():
+    """Модуль requests: загружается при первом запросе, а не при импорте."""
+    import requests
+
+    return requests
 
 
 def check_response(response: dict) -> list:
@@ -63,31 +243,49 @@ def check_response(response: dict) -> list:
     Если ответ API соответствует ожиданиям, то функция вернет список домашних
     работ, доступный в ответе API по ключу 'homeworks'.
     """
-    logging.debug(f'Ответ API: {response}')
-    if not response or not len(response):
-        raise _.ApiAnswerTypeError()
-    if 'homeworks' not in response:
-        logging.exception(
-            'Некорректный тип ответа API! Отсутствуют ключ "homeworks".'
-        )
-        raise TypeError
-    homeworks = response['homeworks']
-    if not isinstance(homeworks, list):
-        raise _.ApiAnswerTypeError('Не найден ключ "homeworks" в ответе API!')
+    logs.debug_payload('Ответ API: %s', response)
+    with profiling.span('check'):
+        homeworks = [
+            schema.project(item)
+            for item in schema.validate_response(response)
+        ]
+    metrics.HOMEWORKS_PER_RESPONSE.observe(len(homeworks))
     return homeworks
 
 
 def parse_status(homework: dict) -> str:
     """Извлекает из информации о конкретной домашней работе её статус."""
-    logging.debug(f'Домашняя работа: {homework}')
-    if type(homework) != dict:
-        raise _.HomeworkTypeError('Ожидается словарь.')
-    homework_name = homework['homework_name']
-    homework_status = homework['status']
-    if homework_status not in HOMEWORK_VERDICTS:
-        raise _.HomeworkTypeError('Недокументированный статус домашней работы')
-    verdict = HOMEWORK_VERDICTS[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return format_status(homework)
+
+
+def format_status(homework, locale: str = None,
+                  parse_mode: str = None) -> str:
+    """Уведомление о статусе на языке locale с разметкой parse_mode.
+    По умолчанию - LOCALE и PARSE_MODE. Готовые уведомления кэшируются.
+    """
+    logs.debug_payload('Домашняя работа: %s', homework)
+    with profiling.span('format'):
+        if not isinstance(homework, Homework):
+            homework = Homework.from_api(schema.validate_homework(homework))
+        return messages.render_status(
+            homework.name, homework.status, locale or LOCALE,
+            PARSE_MODE if parse_mode is None else parse_mode
+        )
+
+
+def message_options(subscriber) -> tuple:
+    """Язык и разметка сообщений подписчика с учётом умолчаний."""
+    return (
+        subscriber.locale or LOCALE,
+        PARSE_MODE if subscriber.parse_mode is None
+        else subscriber.parse_mode
+    )
+
+
+def send_alert(message: str) -> None:
+    """Отправляет сообщение об ошибках, если сводка его выдала."""
+    if message:
+        send_message(bot, message)
 
 
 def check_tokens() -> bool:
@@ -95,55 +293,353 @@ def check_tokens() -> bool:
     return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
 
 
+def init_logging(level: int) -> None:
+    """Настройка логирования: запись в stdout в фоновом потоке."""
+    logs.setup(level, LOG_FORMAT, LOG_PAYLOAD_SAMPLE)
+
+
+def init_session(pool_size: int) -> None:
+    """Направляет запросы к API через пул keep-alive соединений."""
+    global api_session
+    from assistant.transport import HttpPool
+
+    api_session = HttpPool(pool_size, CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def init_routes() -> tuple:
+    """Маршруты уведомлений из ROUTES_FILE (без него - нет)."""
+    if not ROUTES_FILE:
+        return ()
+    import json
+
+    from assistant.registry import load_routes
+
+    with open(ROUTES_FILE, encoding='utf-8') as file:
+        return load_routes(json.load(file))
+
+
+def init_cache():
+    """Кэш ответов API для условных запросов (см. RESPONSE_CACHE)."""
+    from assistant.cache import ResponseCache
+
+    return ResponseCache() if RESPONSE_CACHE else None
+
+
+def init_breakers() -> None:
+    """Включает предохранители API и Telegram."""
+    global api_breaker, telegram_breaker
+    from assistant.breaker import CircuitBreaker
+
+    api_breaker = CircuitBreaker(
+        'practicum', BREAKER_THRESHOLD, BREAKER_RESET_TIME
+    )
+    telegram_breaker = CircuitBreaker(
+        'telegram', BREAKER_THRESHOLD, BREAKER_RESET_TIME
+    )
+
+
+def init_store():
+    """Открывает хранилище курсоров и статусов (см. STATE_DB)."""
+    from assistant.state import open_store
+
+    return open_store(STATE_DB, flush_interval=STATE_FLUSH_INTERVAL,
+                      synchronous=STATE_SYNCHRONOUS)
+
+
+def make_bot(pool_size: int = 1) -> 'Bot':
+    """Клиент Telegram с пулом на pool_size одновременных запросов.
+    python-telegram-bot загружается при первой отправке - в потоке очереди
+    отправки, а не до первого опроса (см. assistant.sender.LazyBot).
+    """
+    from assistant.sender import LazyBot
+
+    def create():
+        from telegram import Bot
+        from telegram.utils.request import Request
+
+        return Bot(token=TELEGRAM_TOKEN, base_url=f'{TELEGRAM_API_URL}/bot',
+                   request=Request(con_pool_size=pool_size))
+
+    return LazyBot(create)
+
+
+def init_send_queue(bot: 'Bot', workers: int, outbox=None):
+    """Запускает очередь отправки в Telegram.
+    outbox - хранилище (см. init_store) для уведомлений подписчиков.
+    """
+    from assistant.sender import SendQueue
+
+    return SendQueue(bot, workers, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE,
+                     breaker=telegram_breaker, outbox=outbox)
+
+
+def init_metrics() -> None:
+    """Запускает эндпойнт /metrics, если задан METRICS_PORT."""
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+        logging.info('Метрики: http://0.0.0.0:%s/metrics', METRICS_PORT)
+
+
+def init_policy():
+    """Политика интервала опроса; с приёмом push-событий - сверка."""
+    from assistant.intervals import AdaptiveInterval
+
+    if PUSH_PORT:
+        return AdaptiveInterval(RECONCILE_TIME, reviewing=RECONCILE_TIME)
+    return AdaptiveInterval()
+
+
+def init_push(sink):
+    """Запускает приём push-событий, если задан PUSH_PORT.
+    sink(id подписчика, работы) уведомляет подписчика (см. assistant.push).
+    Возвращает сервер приёма или None.
+    """
+    if PUSH_PORT:
+        from assistant import push
+        server = push.serve(PUSH_PORT, sink, PUSH_SECRET)
+        if not PUSH_SECRET:
+            logging.warning('PUSH_SECRET не задан: события принимаются '
+                            'только с 127.0.0.1.')
+        logging.info('Приём событий: http://%s:%s/push/<id>',
+                     *server.server_address[:2])
+        return server
+
+
+def init_shutdown():
+    """Перехватывает SIGTERM и SIGINT (см. SHUTDOWN_TIMEOUT)."""
+    from assistant.lifecycle import Shutdown
+
+    return Shutdown(SHUTDOWN_TIMEOUT).install()
+
+
+def init_profiling(shutdown) -> None:
+    """Профилирование с запуска (PROFILE) или по SIGUSR1."""
+    profiling.configure(PROFILE_SLOWEST, PROFILE_INTERVAL, PROFILE_DIR)
+    shutdown.handle(signal.SIGUSR1, profiling.toggle)
+    if PROFILE:
+        profiling.start()
+
+
 def init_bot(level: int) -> None:
     """Настройка бота."""
-    global bot
-    logging.basicConfig(
-        format='%(asctime)s [%(levelname)s] %(message)s',
-        level=level,
-        stream=sys.stdout
-    )
+    global bot, send_queue, response_cache
+    init_logging(level)
     if not check_tokens():
         raise _.MissingEnvironmentVariables(logging.exception)
-    bot = Bot(token=TELEGRAM_TOKEN)
+    init_session(pool_size=1)
+    init_breakers()
+    response_cache = init_cache()
+    bot = make_bot()
+    send_queue = init_send_queue(bot, workers=1)
+    metrics.QUEUE_DEPTH.set_function(lambda: send_queue.depth)
+    init_metrics()
     logging.info('Запуск бота.')
-    send_message(bot, 'Я запустился!')
 
 
-def check_and_send(response):
-    """Отправка сообщения о проверенной работе."""
+def announce_startup() -> None:
+    """Уведомляет о запуске бота."""
+    send_message(bot, messages.render('startup', LOCALE, PARSE_MODE))
+
+
+def send_status(message: str, owner: str = None) -> None:
+    """Отправляет уведомление о статусе подписчику owner.
+    Через очередь отправки с outbox уведомление записывается в него и
+    доставляется, даже если Telegram недоступен или бот перезапустится.
+    """
+    if send_queue is None:
+        send_message(bot, message)
+        return
+    with profiling.span('send'):
+        send_queue.send(TELEGRAM_CHAT_ID, message, PARSE_MODE, owner)
+
+
+def send_routes(homework, message: str, owner: str = None) -> None:
+    """Отправляет уведомление о работе в чаты маршрутов routes.
+    message - уже готовый текст для LOCALE и PARSE_MODE.
+    """
+    from assistant.routing import render_routes
+
+    outgoing = render_routes(routes, homework, LOCALE, PARSE_MODE, message)
+    if send_queue is None:
+        for chat_id, text, parse_mode in outgoing:
+            deliver(bot, chat_id, text, parse_mode)
+        return
+    with profiling.span('send'):
+        send_queue.send_many(outgoing, owner)
+
+
+def check_and_send(response, seen=None, owner=None):
+    """Отправка сообщения о проверенной работе.
+    Если передан индекс seen (assistant.dedup.SeenIndex), уже отправленные
+    изменения статуса пропускаются, а работа, на которой отправка упала,
+    не запоминается (см. SeenIndex.dispatch); owner - id подписчика для
+    outbox. С маршрутами routes уведомление получают и их чаты.
+    """
+    def send(homework):
+        message = parse_status(homework)
+        send_status(message, owner)
+        if routes:
+            send_routes(homework, message, owner)
+
     homeworks = check_response(response)
-    if homeworks and len(homeworks):
-        for homework in homeworks:
-            message = parse_status(homework)
-            send_message(bot, message)
+    if seen is not None:
+        sent = seen.dispatch(TELEGRAM_CHAT_ID, homeworks, send)
     else:
+        for homework in homeworks:
+            send(homework)
+        sent = len(homeworks)
+    if not sent:
         logging.debug('Отсутствуют новые статусы.')
 
 
+def serve_subscribers(path: str) -> None:
+    """Обслуживает всех подписчиков из реестра в одном процессе."""
+    from assistant.registry import SubscriptionRegistry
+
+    init_logging(logging.INFO)
+    if not TELEGRAM_TOKEN:
+        raise _.MissingEnvironmentVariables(logging.exception)
+    registry = SubscriptionRegistry.load(path)
+    if SHARD_NODES:
+        from assistant.sharding import select
+        select(registry, SHARD_NODES.split(','), SHARD_NODE)
+    logging.info('Запуск бота для подписчиков: %s.', len(registry))
+    init_breakers()
+    if SHARD_WORKERS:
+        from assistant.sharding import Supervisor
+        if PUSH_PORT:
+            logging.warning('Приём push-событий в шардированном режиме '
+                            'не поддерживается.')
+        return Supervisor(registry, SHARD_WORKERS).run()
+    init_metrics()
+    shutdown = init_shutdown()
+    init_profiling(shutdown)
+    store = init_store()
+    policy = init_policy()
+    server = None
+    try:
+        if ASYNC_MODE:
+            import asyncio
+
+            from assistant.aio import AsyncEngine
+            engine = AsyncEngine(registry, TELEGRAM_TOKEN,
+                                 interval=policy.base, policy=policy,
+                                 concurrency=POLL_CONCURRENCY, store=store,
+                                 cache=init_cache())
+            shutdown.on_stop(lambda: engine.stop(shutdown.remaining()))
+            server = init_push(engine.push)
+            return asyncio.run(engine.run())
+        from assistant.engine import PollEngine
+        init_session(POLL_WORKERS)
+        bot = make_bot(SEND_WORKERS)
+        queue = init_send_queue(bot, SEND_WORKERS, outbox=store)
+        metrics.QUEUE_DEPTH.set_function(lambda: queue.depth)
+        try:
+            engine = PollEngine(registry, bot, interval=policy.base,
+                                workers=POLL_WORKERS, policy=policy,
+                                store=store, queue=queue, cache=init_cache())
+            shutdown.on_stop(lambda: engine.stop(shutdown.remaining()))
+            server = init_push(engine.push)
+            engine.run()
+        finally:
+            stop_push(server)
+            queue.close(shutdown.remaining())
+    finally:
+        stop_push(server)
+        store.close()
+        profiling.stop()
+        logging.info('Бот остановлен.')
+
+
+def stop_push(server) -> None:
+    """Прекращает приём push-событий, если он был запущен."""
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+def push_sink(state, seen):
+    """Приём push-событий для единственного подписчика main()."""
+    def sink(id: str, homeworks: list) -> bool:
+        if id != state.id:
+            return False
+        check_and_send({'homeworks': homeworks}, seen, state.id)
+        return True
+    return sink
+
+
 def main():
     """Основная логика работы бота."""
-    global bot
+    global bot, routes
+    if SUBSCRIBERS_FILE:
+        return serve_subscribers(SUBSCRIBERS_FILE)
     init_bot(logging.INFO)
-    current_timestamp = int(time.time())
-    last_error = ''
-    while True:
+    routes = init_routes()
+    from assistant.alerts import ErrorDigest
+    from assistant.dedup import SeenIndex
+    from assistant.registry import Subscriber
+
+    alerts = ErrorDigest(ERROR_WINDOW, LOCALE, PARSE_MODE)
+    seen = SeenIndex(DEDUP_SIZE, DEDUP_TTL)
+    shutdown = init_shutdown()
+    init_profiling(shutdown)
+    policy = init_policy()
+    store = init_store()
+    send_queue.outbox = store
+    state = Subscriber(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    store.restore(state)
+    send_queue.redeliver(state.id)
+    logs.CONTEXT.set({'subscriber': state.id})
+    server = init_push(push_sink(state, seen))
+    try:
+        poll_forever(state, policy, store, seen, alerts, shutdown,
+                     started=announce_startup)
+    finally:
+        stop_push(server)
+        send_queue.close(shutdown.remaining())
+        store.close()
+        profiling.stop()
+        logging.info('Бот остановлен.')
+
+
+def poll_forever(state, policy, store, seen, alerts, shutdown,
+                 started=None) -> None:
+    """Цикл опроса main() до запроса остановки shutdown.
+    started() вызывается после первого опроса: загрузка клиента Telegram
+    для уведомления о запуске не задерживает первый запрос к API.
+    """
+    while not shutdown.stopping:
         try:
-            response = get_api_answer(current_timestamp)
-            check_and_send(response)
-            current_timestamp = response['current_date']
-            time.sleep(RETRY_TIME)
+            with profiling.cycle(state.id):
+                response = get_api_answer(state.from_date)
+                check_and_send(response, seen, state.id)
+                state.from_date = response['current_date']
+                policy.observe(state, response['homeworks'])
+                store.save(state, response['homeworks'])
+            send_alert(alerts.success(state.id))
         except Exception as error:
-            if str(error) != last_error:
-                last_error = str(error)
-                logging.debug(f'Последняя ошибка: {last_error}')
-                message = f'Сбой в работе программы: {error}'
-                logging.exception(message)
-                send_message(bot, message)
-            time.sleep(RETRY_TIME)
-        else:
-            pass
+            metrics.EXCEPTIONS.inc(type=type(error).__name__)
+            if response_cache is not None:
+                response_cache.discard(TELEGRAM_CHAT_ID)
+            policy.observe_error(state, error)
+            if str(error) != state.last_error:
+                state.last_error = str(error)
+                logging.debug('Последняя ошибка: %s', state.last_error)
+                logging.exception('Сбой в работе программы: %s', error)
+                store.save(state)
+            send_alert(alerts.error(state.id, error))
+        if started is not None:
+            started()
+            started = None
+        delay = policy.next_delay(state)
+        slept_at = time.monotonic()
+        if shutdown.wait(delay):
+            break
+        metrics.LOOP_LAG.observe(time.monotonic() - slept_at - delay)
 
 
 if __name__ == '__main__':
+    # Модули движка импортируют homework: пусть они получат этот же модуль,
+    # а не его повторно загруженную копию со своими глобальными переменными.
+    sys.modules['homework'] = sys.modules[__name__]
     main()
@@ -0,0 +1,134 @@
+import asyncio
+
+from assistant import aio
+from assistant.registry import SubscriptionRegistry
+from assistant.sender import RateLimiter
+from tests.utils import MockSender
+
+
+class MockPost:
+
+    status = 200
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+
+class MockSession:
+
+    def __init__(self):
+        self.posted = []
+
+    def post(self, url, json=None):
+        self.posted.append(json)
+        return MockPost()
+
+
+class TestAsyncEngine:
+
+    def test_poll_sends_and_advances_cursor(self, monkeypatch,
+                                            random_timestamp):
+        async def mock_fetch(session, token, from_date, **kwargs):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'rejected'}],
+                'current_date': random_timestamp,
+            }
+
+        monkeypatch.setattr(aio, 'fetch_homeworks', mock_fetch)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 7, from_date=1)
+        engine = aio.AsyncEngine(registry, '1:token')
+        engine.sender = MockSender()
+
+        async def poll():
+            engine._limit = asyncio.Semaphore(1)
+            await engine.poll(subscriber)
+
+        asyncio.run(poll())
+        assert engine.sender.sent[0][0] == 7
+        assert 'hw' in engine.sender.sent[0][1]
+        assert subscriber.from_date == random_timestamp
+
+    def test_concurrency_is_bounded(self, monkeypatch, random_timestamp):
+        active = [0, 0]
+
+        async def mock_fetch(session, token, from_date, **kwargs):
+            active[0] += 1
+            active[1] = max(active)
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            return {'homeworks': [], 'current_date': random_timestamp}
+
+        monkeypatch.setattr(aio, 'fetch_homeworks', mock_fetch)
+        registry = SubscriptionRegistry()
+        for number in range(20):
+            registry.add(f'token-{number}', number)
+        engine = aio.AsyncEngine(registry, '1:token', interval=0.001,
+                                 concurrency=3)
+
+        async def run():
+            task = asyncio.ensure_future(engine.run())
+            await asyncio.sleep(0.2)
+            engine.stop()
+            await task
+
+        asyncio.run(run())
+        assert active[1] == 3, (
+            'Число одновременных запросов должно ограничиваться семафором'
+        )
+
+    def test_undelivered_notification_is_retried(self, monkeypatch,
+                                                 random_timestamp):
+        async def mock_fetch(session, token, from_date, **kwargs):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp,
+            }
+
+        monkeypatch.setattr(aio, 'fetch_homeworks', mock_fetch)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 7, from_date=1)
+        engine = aio.AsyncEngine(registry, '1:token')
+        engine.sender = MockSender(available=False)
+
+        async def poll():
+            engine._limit = asyncio.Semaphore(1)
+            await engine.poll(subscriber)
+            assert subscriber.from_date == random_timestamp
+            assert len(engine.store.pending(subscriber.id)) == 1
+            engine.sender.available = True
+            await engine.redeliver(subscriber)
+
+        asyncio.run(poll())
+        assert len(engine.sender.sent) == 1
+        assert engine.store.pending(subscriber.id) == []
+
+    def test_send_waiting_for_rate_limit_frees_slot(self):
+        engine = aio.AsyncEngine(SubscriptionRegistry(), '1:token')
+
+        async def main():
+            engine._limit = asyncio.Semaphore(1)
+            engine.sender = aio.TelegramSender(
+                MockSession(), 'token', base_url='http://telegram',
+                limiter=RateLimiter(chat_rate=0.5), limit=engine._limit
+            )
+            assert await engine.send(1, 'a')
+            waiting = asyncio.ensure_future(engine.send(1, 'b'))
+            await asyncio.sleep(0.05)
+            try:
+                await asyncio.wait_for(engine._limit.acquire(), 0.1)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                waiting.cancel()
+            return True
+
+        assert asyncio.run(main()), (
+            'Ожидание ограничения частоты не должно занимать слот семафора'
+        )
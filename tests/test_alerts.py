@@ -0,0 +1,132 @@
+import requests
+
+import exceptions
+import homework
+from assistant.alerts import Alerts, ErrorDigest, fingerprint
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from tests.utils import MockBot
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} Server Error', response=response)
+
+
+def timeout():
+    try:
+        raise requests.ReadTimeout('read timed out')
+    except requests.ReadTimeout as error:
+        try:
+            raise exceptions.RequestToEndpointFailed(error) from error
+        except exceptions.RequestToEndpointFailed as wrapped:
+            return wrapped
+
+
+class TestFingerprint:
+
+    def test_kinds_differ_texts_do_not(self):
+        assert fingerprint(http_error(502)) == 'HTTPError:502'
+        assert fingerprint(http_error(503)) != fingerprint(http_error(502))
+        assert fingerprint(timeout()) == (
+            'RequestToEndpointFailed:ReadTimeout'
+        )
+        assert fingerprint(ValueError('a')) == fingerprint(ValueError('b'))
+
+    def test_circuit_open_keeps_upstream(self):
+        error = exceptions.CircuitOpen('practicum', 'сбой')
+        assert fingerprint(error) == 'CircuitOpen:practicum'
+
+
+class TestErrorDigest:
+
+    def test_alternating_errors_make_one_digest(self):
+        digest = ErrorDigest(window=60)
+        assert digest.error('a', timeout(), now=0) == (
+            'Сбой в работе программы: Сбой при запросе к эндпойнту: '
+            'read timed out'
+        )
+        for second in range(1, 59):
+            error = http_error(502) if second % 2 else timeout()
+            assert digest.error('a', error, now=second) is None, (
+                'Ошибки внутри окна должны копиться в сводку'
+            )
+        text = digest.error('a', http_error(502), now=60)
+        assert text.splitlines() == [
+            'Сбои за 1 мин.:',
+            '30 × 502 Server Error (подписчиков: 1)',
+            '29 × Сбой при запросе к эндпойнту: read timed out '
+            '(подписчиков: 1)',
+            'Всё ещё с ошибкой подписчиков: 1.',
+        ]
+
+    def test_recovery(self):
+        digest = ErrorDigest(window=60)
+        assert digest.error('a', timeout(), now=0)
+        assert digest.success('a', now=10) is None
+        assert digest.success('a', now=70) == 'Работа восстановлена.'
+        assert digest.success('a', now=200) is None
+        assert digest.error('a', timeout(), now=300), (
+            'Новый сбой после восстановления сообщается сразу'
+        )
+
+    def test_long_outage_is_bounded(self):
+        digest = ErrorDigest(window=60)
+        sent = [
+            digest.error(f'sub-{number % 1000}', http_error(502), now=second)
+            for second in range(600) for number in range(10)
+        ]
+        assert len([text for text in sent if text]) == 10, (
+            'Сбой должен давать не больше сообщения на окно'
+        )
+
+
+class TestAlerts:
+
+    def test_admin_chat_collects_all_subscribers(self):
+        registry = SubscriptionRegistry()
+        subscribers = [registry.add(f'token-{n}', n) for n in range(1000)]
+        alerts = Alerts(window=60, admin_chat_id=-1)
+        sent = [alerts.error(item, timeout(), now=0) for item in subscribers]
+        sent += [alerts.success(item, now=61) for item in subscribers]
+        sent = [alert for alert in sent if alert]
+        assert [chat_id for chat_id, _, _ in sent] == [-1, -1]
+        assert sent[1][1].splitlines() == [
+            'Сбои за 1 мин.:',
+            '999 × Сбой при запросе к эндпойнту: read timed out '
+            '(подписчиков: 999)',
+            'Восстановились подписчики: 1.',
+            'Всё ещё с ошибкой подписчиков: 999.',
+        ]
+
+    def test_subscriber_chats_use_their_options(self):
+        registry = SubscriptionRegistry()
+        first = registry.add('a', 1, locale='en', parse_mode='HTML')
+        second = registry.add('b', 2)
+        alerts = Alerts(window=60)
+        assert alerts.error(first, ValueError('<x>'), now=0) == (
+            1, 'The bot has failed: &lt;x&gt;', 'HTML'
+        )
+        assert alerts.error(second, ValueError('x'), now=0)[0] == 2
+        assert alerts.success(registry.add('c', 3)) is None
+
+
+class TestEngineAlerts:
+
+    def test_alternating_errors_are_not_spammed(self, monkeypatch):
+        errors = [timeout(), http_error(502)] * 5
+
+        def mock_request(*args, **kwargs):
+            raise errors.pop()
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        bot = MockBot()
+        engine = PollEngine(registry, bot, alerts=Alerts(window=600))
+        for _ in range(10):
+            engine.poll(subscriber)
+        engine._executor.shutdown()
+        assert len(bot.sent) == 1
+        assert subscriber.last_error == str(timeout())
@@ -0,0 +1,122 @@
+import time
+
+import homework
+from assistant.backfill import Backfill, timestamp_of
+from assistant.registry import Subscriber
+from assistant.state import MemoryStore
+
+DAY = 24 * 60 * 60
+SINCE = timestamp_of('2024-01-01')
+
+
+HISTORY = [
+    {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+     'date_updated': '2024-01-02T10:00:00Z'},
+    {'id': 2, 'homework_name': 'hw2', 'status': 'rejected',
+     'date_updated': '2024-01-05T10:00:00Z'},
+    {'id': 3, 'homework_name': 'hw3', 'status': 'reviewing',
+     'date_updated': '2024-01-09T10:00:00Z'},
+]
+
+
+class FakeApi:
+
+    def __init__(self, now):
+        self.now = now
+        self.requests = []
+
+    def __call__(self, token, from_date, **kwargs):
+        self.requests.append((token, from_date, time.monotonic()))
+        return {
+            'homeworks': [
+                item for item in HISTORY
+                if timestamp_of(item['date_updated']) >= from_date
+            ],
+            'current_date': self.now,
+        }
+
+
+class TestBackfill:
+
+    def test_timestamp_of(self):
+        assert timestamp_of('2024-01-02T10:00:00Z') == 1704189600
+        assert timestamp_of('2024-01-02T13:00:00+03:00') == 1704189600
+        assert timestamp_of('2024-01-02') == 1704153600
+        assert timestamp_of('1704189600') == 1704189600
+
+    def test_windows_restore_history_without_notifications(self,
+                                                           monkeypatch):
+        now = SINCE + 10 * DAY
+        api = FakeApi(now)
+        monkeypatch.setattr(homework, 'request_homeworks', api)
+        sent = []
+        monkeypatch.setattr(homework, 'deliver',
+                            lambda *args, **kwargs: sent.append(args))
+        store = MemoryStore()
+        known = Subscriber('known', 2, from_date=SINCE + DAY)
+        store.save(known)
+        subscribers = [Subscriber('new', 1), Subscriber('known', 2)]
+        backfill = Backfill(subscribers, store, SINCE, until=now,
+                            window=3 * DAY, workers=4, rate=0)
+        assert len(backfill.windows()) == 4
+        stats = backfill.run()
+        assert len(api.requests) == 8
+        assert stats['homeworks'] == 6, (
+            'Каждая работа должна попасть ровно в одно окно'
+        )
+        assert stats['failed'] == 0 and not sent
+        for subscriber in subscribers:
+            assert store.status(subscriber.id, '2') == 'rejected'
+            assert store.status(subscriber.id, '3') == 'reviewing'
+        restored = Subscriber('new', 1)
+        store.restore(restored)
+        assert restored.from_date == now, (
+            'Новый подписчик опрашивается с конца восстановленной истории'
+        )
+        restored = Subscriber('known', 2)
+        store.restore(restored)
+        assert restored.from_date == SINCE + DAY, (
+            'Курсор уже известного подписчика не меняется'
+        )
+
+    def test_summary_is_single_message(self, monkeypatch):
+        monkeypatch.setattr(homework, 'request_homeworks',
+                            FakeApi(SINCE + 10 * DAY))
+        sent = []
+        backfill = Backfill(
+            [Subscriber('token', 1)], MemoryStore(), SINCE,
+            until=SINCE + 10 * DAY, window=DAY, rate=0,
+            send=lambda *args: sent.append(args) or True
+        )
+        assert backfill.run()['summaries'] == 1
+        assert len(sent) == 1
+        chat_id, text, parse_mode = sent[0]
+        assert chat_id == 1 and '3' in text and 'hw3' in text
+
+    def test_failed_window_is_counted(self, monkeypatch):
+        def mock_request(token, from_date, **kwargs):
+            if from_date > SINCE:
+                raise ConnectionError('нет связи')
+            return {'homeworks': [], 'current_date': SINCE + 2 * DAY}
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        store = MemoryStore()
+        stats = Backfill([Subscriber('token', 1)], store, SINCE,
+                         until=SINCE + 2 * DAY, window=DAY, rate=0).run()
+        assert (stats['done'], stats['failed']) == (1, 1)
+        restored = Subscriber('token', 1)
+        store.restore(restored)
+        assert restored.from_date != SINCE + 2 * DAY, (
+            'Без всей истории курсор не должен перескакивать через неё'
+        )
+
+    def test_rate_limits_requests(self, monkeypatch):
+        api = FakeApi(SINCE + 10 * DAY)
+        monkeypatch.setattr(homework, 'request_homeworks', api)
+        subscribers = [Subscriber(f'token-{n}', n) for n in range(11)]
+        started = time.monotonic()
+        Backfill(subscribers, MemoryStore(), SINCE, workers=8,
+                 rate=50).run()
+        assert time.monotonic() - started >= 0.18, (
+            'Запросы к API не должны превышать rate в секунду'
+        )
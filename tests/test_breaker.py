@@ -0,0 +1,130 @@
+import pytest
+import requests
+from telegram.error import BadRequest, NetworkError
+
+import exceptions
+import homework
+from assistant.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                               upstream_failure)
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from assistant.sender import SendQueue
+from tests.utils import MockBot, RecordingBot, wait_for
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+class TestUpstreamFailure:
+
+    @pytest.mark.parametrize('error', [
+        ConnectionError('нет связи'), requests.Timeout(), http_error(502),
+        exceptions.RequestToEndpointFailed('404'), NetworkError('сеть'),
+    ])
+    def test_outage(self, error):
+        assert upstream_failure(error)
+
+    @pytest.mark.parametrize('error', [
+        http_error(401), http_error(429), BadRequest('Chat not found'),
+        ValueError('битый JSON'),
+    ])
+    def test_request_error(self, error):
+        assert not upstream_failure(error), (
+            'Ошибка конкретного запроса не должна размыкать предохранитель'
+        )
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker('api', failure_threshold=3, reset_timeout=10)
+        for _ in range(3):
+            breaker.allow(now=0)
+            breaker.record(ConnectionError('нет связи'), now=0)
+        assert breaker.state == OPEN
+        with pytest.raises(exceptions.CircuitOpen) as error:
+            breaker.allow(now=5)
+        assert str(error.value) == 'нет связи', (
+            'Отказ должен повторять текст ошибки сервиса'
+        )
+        assert error.value.retry_after == pytest.approx(5)
+
+    def test_single_probe_when_half_open(self):
+        breaker = CircuitBreaker('api', failure_threshold=1, reset_timeout=10)
+        breaker.record(ConnectionError(), now=0)
+        breaker.allow(now=10)
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(exceptions.CircuitOpen):
+            breaker.allow(now=10)
+        breaker.record(None)
+        assert breaker.state == CLOSED
+        breaker.allow(now=11)
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker('api', failure_threshold=5, reset_timeout=10)
+        for _ in range(5):
+            breaker.record(ConnectionError(), now=0)
+        breaker.allow(now=10)
+        breaker.record(ConnectionError(), now=10)
+        assert breaker.state == OPEN
+        with pytest.raises(exceptions.CircuitOpen):
+            breaker.allow(now=15)
+
+    def test_context_manager(self):
+        breaker = CircuitBreaker('api', failure_threshold=1)
+        with pytest.raises(ConnectionError):
+            with breaker:
+                raise ConnectionError
+        with pytest.raises(exceptions.CircuitOpen):
+            with breaker:
+                pass
+
+
+class TestSharedBreaker:
+
+    def test_outage_costs_threshold_requests(self, monkeypatch):
+        requested = []
+
+        class DownSession:
+            def get(self, url, **kwargs):
+                requested.append(url)
+                raise requests.ConnectionError('нет связи')
+
+        monkeypatch.setattr(homework, 'api_session', DownSession())
+        monkeypatch.setattr(
+            homework, 'api_breaker',
+            CircuitBreaker('api', failure_threshold=3, reset_timeout=60)
+        )
+        registry = SubscriptionRegistry()
+        subscribers = [registry.add(f'token-{n}', n) for n in range(20)]
+        bot = MockBot()
+        engine = PollEngine(registry, bot)
+        for subscriber in subscribers:
+            engine.poll(subscriber)
+        assert len(requested) == 3, (
+            'Разомкнутый предохранитель не должен пропускать запросы'
+        )
+        assert len(bot.sent) == 20
+        assert len({text for _, text in bot.sent}) == 1
+        assert all(s.retry_after == pytest.approx(60, abs=1)
+                   for s in subscribers[3:])
+        for subscriber in subscribers:
+            engine.poll(subscriber)
+        assert len(bot.sent) == 20, 'Тот же сбой не сообщается повторно'
+
+    def test_send_queue_waits_while_open(self):
+        breaker = CircuitBreaker('telegram', failure_threshold=1,
+                                 reset_timeout=0.2)
+        bot = RecordingBot(errors=[NetworkError('сеть')])
+        queue = SendQueue(bot, workers=1, chat_rate=100, max_attempts=2,
+                          breaker=breaker)
+        queue.send(1, 'a')
+        assert wait_for(lambda: breaker.state == OPEN)
+        queue.send(1, 'b')
+        assert queue.close(5)
+        assert [text for _, text, _ in bot.calls] == ['a', 'a\n\nb']
+        assert queue.snapshot()['failed'] == 0
+        assert breaker.state == CLOSED
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+import exceptions
+import homework
+from assistant.cache import ResponseCache
+from assistant.engine import PollEngine
+from assistant.records import Homework, Status
+from assistant.registry import SubscriptionRegistry
+from tests.utils import MockBot, MockResponse
+
+BODY = json.dumps({
+    'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 10,
+}).encode()
+
+
+class MockSession:
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.headers = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.headers.append(headers)
+        return self.responses.pop(0)
+
+
+class TestResponseCache:
+
+    def test_first_response_is_parsed(self):
+        cache = ResponseCache()
+        assert cache.load('a', BODY, {}) == {
+            'homeworks': [Homework(None, 'hw', Status.APPROVED)],
+            'current_date': 10,
+        }
+        assert cache.snapshot()['misses'] == 1
+
+    def test_same_body_has_no_homeworks(self):
+        cache = ResponseCache()
+        cache.load('a', BODY, {})
+        assert cache.load('a', BODY, {}) == {
+            'homeworks': [], 'current_date': 10
+        }, 'Неизменившийся ответ не должен отдавать работы повторно'
+        assert cache.unchanged_hits == 1
+        assert cache.hit_rate == pytest.approx(0.5)
+
+    def test_keys_are_independent(self):
+        cache = ResponseCache()
+        cache.load('a', BODY, {})
+        assert cache.load('b', BODY, {})['homeworks'], (
+            'Ответ, обработанный одним подписчиком, нов для другого'
+        )
+
+    def test_validators(self):
+        cache = ResponseCache()
+        assert cache.validators('a') == {}
+        cache.load('a', BODY, {'ETag': '"1"', 'Last-Modified': 'date'})
+        assert cache.validators('a') == {
+            'If-None-Match': '"1"', 'If-Modified-Since': 'date'
+        }
+
+    def test_not_modified_without_entry(self):
+        with pytest.raises(exceptions.RequestToEndpointFailed):
+            ResponseCache().not_modified('a')
+
+
+class TestConditionalRequest:
+
+    def test_not_modified_short_circuits(self, monkeypatch):
+        session = MockSession(
+            MockResponse(200, BODY, {'ETag': '"1"'}), MockResponse(304)
+        )
+        monkeypatch.setattr(homework, 'api_session', session)
+        cache = ResponseCache()
+        first = homework.request_homeworks('token', 1, cache=cache, key='a')
+        second = homework.request_homeworks('token', 1, cache=cache, key='a')
+        assert len(homework.check_response(first)) == 1
+        assert homework.check_response(second) == []
+        assert second['current_date'] == 10
+        assert 'If-None-Match' not in session.headers[0]
+        assert session.headers[1]['If-None-Match'] == '"1"', (
+            'Повторный запрос должен быть условным'
+        )
+        assert cache.snapshot()['not_modified'] == 1
+
+    def test_without_cache_headers_unchanged(self, monkeypatch):
+        session = MockSession(MockResponse(200, BODY))
+        session.responses[0].json = lambda: json.loads(BODY)
+        monkeypatch.setattr(homework, 'api_session', session)
+        homework.request_homeworks('token', 1)
+        assert session.headers[0] == {'Authorization': 'OAuth token'}
+
+    def test_failed_cycle_is_retried_from_body(self, monkeypatch):
+        session = MockSession(*(
+            MockResponse(200, BODY, {'ETag': '"1"'}) for _ in range(2)
+        ))
+        monkeypatch.setattr(homework, 'api_session', session)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1, from_date=1)
+        bot = MockBot()
+        engine = PollEngine(registry, bot, cache=ResponseCache())
+        notify = engine.notify
+        failures = [RuntimeError('сбой после чтения ответа')]
+
+        def failing_once(subscriber, homeworks):
+            if failures:
+                raise failures.pop()
+            notify(subscriber, homeworks)
+
+        engine.notify = failing_once
+        engine.poll(subscriber)
+        assert subscriber.from_date == 1
+        engine.poll(subscriber)
+        assert 'If-None-Match' not in session.headers[1], (
+            'После сбоя цикла запрос должен быть безусловным'
+        )
+        assert len([text for _, text in bot.sent if '"hw"' in text]) == 1, (
+            'Работа из ответа упавшего цикла должна быть отправлена'
+        )
+        assert subscriber.from_date == 10
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+import exceptions
+import homework
+from assistant import aio
+from assistant.dedup import SeenIndex
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from tests.utils import MockBot, MockSender
+
+APPROVED = {'id': 1, 'status': 'approved', 'homework_name': 'hw',
+            'date_updated': '2022-01-01T00:00:00Z'}
+# Недокументированный статус: parse_status на нём падает.
+WEIRD = dict(APPROVED, id=2, status='weird')
+
+
+class TestSeenIndex:
+
+    def test_duplicates_are_suppressed(self):
+        seen = SeenIndex()
+        assert seen.filter('a', [APPROVED]) == [APPROVED]
+        assert seen.filter('a', [APPROVED]) == []
+        assert seen.filter('b', [APPROVED]) == [APPROVED], (
+            'Разные подписчики не должны мешать друг другу'
+        )
+        changed = dict(APPROVED, date_updated='2022-01-02T00:00:00Z')
+        assert seen.filter('a', [changed]) == [changed]
+        assert seen.snapshot() == {
+            'size': 3, 'admitted': 3, 'suppressed': 1
+        }
+
+    def test_size_is_bounded_lru(self):
+        seen = SeenIndex(max_size=2)
+        first, second, third = (dict(APPROVED, id=n) for n in range(3))
+        seen.admit('a', first)
+        seen.admit('a', second)
+        seen.admit('a', first)
+        seen.admit('a', third)
+        assert len(seen) == 2
+        assert not seen.admit('a', first), 'Недавний ключ не вытесняется'
+        assert seen.admit('a', second), 'Давний ключ должен быть вытеснен'
+
+    def test_ttl(self):
+        seen = SeenIndex(ttl=10)
+        assert seen.admit('a', APPROVED, now=0)
+        assert not seen.admit('a', APPROVED, now=5)
+        assert seen.admit('a', APPROVED, now=16)
+
+    def test_unrecognized_homework_passes(self):
+        seen = SeenIndex()
+        assert seen.filter('a', [{'homework_name': 'hw'}] * 2) == [
+            {'homework_name': 'hw'}
+        ] * 2
+
+
+class TestDedupDelivery:
+
+    def test_engine_does_not_resend(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'request_homeworks',
+            lambda token, from_date, **kwargs: {'homeworks': [APPROVED],
+                                                'current_date': 1}
+        )
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        bot = MockBot()
+        engine = PollEngine(registry, bot)
+        engine.poll(subscriber)
+        engine.poll(subscriber)
+        assert len(bot.sent) == 1
+        assert engine.seen.suppressed == 1
+
+    def test_check_and_send(self, monkeypatch):
+        bot = MockBot()
+        monkeypatch.setattr(homework, 'bot', bot, raising=False)
+        seen = SeenIndex()
+        response = {'homeworks': [APPROVED], 'current_date': 1}
+        homework.check_and_send(response, seen)
+        homework.check_and_send(response, seen)
+        assert len(bot.sent) == 1
+
+    def test_failed_item_does_not_hide_others(self, monkeypatch):
+        bot = MockBot()
+        monkeypatch.setattr(homework, 'bot', bot, raising=False)
+        monkeypatch.setattr(homework, 'send_queue', None)
+        seen = SeenIndex()
+        response = {'homeworks': [WEIRD, APPROVED], 'current_date': 1}
+        for _ in range(2):
+            with pytest.raises(exceptions.HomeworkTypeError):
+                homework.check_and_send(response, seen)
+        assert len(bot.sent) == 1, (
+            'Работа после упавшей должна быть отправлена ровно один раз'
+        )
+
+    def test_engine_keeps_error_and_cursor(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'request_homeworks',
+            lambda token, from_date, **kwargs: {
+                'homeworks': [WEIRD, APPROVED], 'current_date': 100
+            }
+        )
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1, from_date=1)
+        bot = MockBot()
+        engine = PollEngine(registry, bot)
+        engine.poll(subscriber)
+        engine.poll(subscriber)
+        notifications = [text for _, text in bot.sent if 'hw' in text]
+        assert len(notifications) == 1
+        assert any('Сбой' in text for _, text in bot.sent), (
+            'Ошибка должна дойти до пользователя'
+        )
+        assert subscriber.from_date == 1, (
+            'Курсор не должен сдвигаться, пока работа не отправлена'
+        )
+        assert subscriber.last_error
+
+    def test_async_engine_keeps_error_and_cursor(self, monkeypatch):
+        async def mock_fetch(session, token, from_date, **kwargs):
+            return {'homeworks': [WEIRD, APPROVED], 'current_date': 100}
+
+        monkeypatch.setattr(aio, 'fetch_homeworks', mock_fetch)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1, from_date=1)
+        engine = aio.AsyncEngine(registry, '1:token')
+        engine.sender = MockSender()
+
+        async def poll():
+            engine._limit = asyncio.Semaphore(1)
+            await engine.poll(subscriber)
+            await engine.poll(subscriber)
+
+        asyncio.run(poll())
+        texts = [text for _, text in engine.sender.sent]
+        assert len([text for text in texts if 'hw' in text]) == 1
+        assert any('Сбой' in text for text in texts)
+        assert subscriber.from_date == 1
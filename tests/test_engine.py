@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+
+import homework
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from tests.utils import MockBot, make_response
+
+
+class TestRegistry:
+
+    def test_load(self, tmp_path):
+        path = tmp_path / 'subscribers.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1},
+            {'token': 'b', 'chat_id': 2, 'from_date': 100},
+            {'token': 'a', 'chat_id': 1},
+        ]))
+        registry = SubscriptionRegistry.load(str(path))
+        assert len(registry) == 2, (
+            'Повторная регистрация пары токен-чат не должна дублироваться'
+        )
+        from_dates = sorted(s.from_date for s in registry)
+        assert from_dates[0] == 100
+
+    def test_id_is_stable_and_hides_token(self):
+        first = SubscriptionRegistry().add('secret-token', 1)
+        second = SubscriptionRegistry().add('secret-token', 1)
+        assert first.id == second.id
+        assert 'secret' not in first.id
+
+
+class TestPollEngine:
+
+    def test_poll_sends_and_advances_cursor(self, monkeypatch,
+                                            random_timestamp):
+        calls = []
+
+        def mock_request(token, from_date, **kwargs):
+            calls.append((token, from_date))
+            return make_response(
+                random_timestamp,
+                {'homework_name': 'hw', 'status': 'approved'}
+            )
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 42, from_date=1)
+        bot = MockBot()
+        PollEngine(registry, bot).poll(subscriber)
+        assert calls == [('token', 1)]
+        assert len(bot.sent) == 1 and bot.sent[0][0] == 42
+        assert subscriber.from_date == random_timestamp
+
+    def test_repeated_error_reported_once(self, monkeypatch):
+        def mock_request(token, from_date, **kwargs):
+            raise ConnectionError('нет связи')
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 42, from_date=1)
+        bot = MockBot()
+        engine = PollEngine(registry, bot)
+        engine.poll(subscriber)
+        engine.poll(subscriber)
+        assert len(bot.sent) == 1
+        assert subscriber.from_date == 1
+
+    def test_run_polls_every_subscriber(self, monkeypatch, random_timestamp):
+        polled = set()
+        lock = threading.Lock()
+
+        def mock_request(token, from_date, **kwargs):
+            with lock:
+                polled.add(token)
+            return make_response(random_timestamp)
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        registry = SubscriptionRegistry()
+        for number in range(50):
+            registry.add(f'token-{number}', number)
+        engine = PollEngine(registry, MockBot(), interval=0.05, workers=4)
+        thread = threading.Thread(target=engine.run)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while len(polled) < 50 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.stop()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert len(polled) == 50
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import homework
+from assistant import metrics
+from assistant.cache import ResponseCache
+from assistant.engine import PollEngine
+from assistant.flight import AsyncSingleFlight, Rendezvous, SingleFlight
+from assistant.registry import SubscriptionRegistry
+from tests.utils import MockBot, MockResponse
+
+BODY = json.dumps({
+    'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 10,
+}).encode()
+
+
+class SlowSession:
+    """Отвечает одним и тем же ответом с задержкой latency."""
+
+    def __init__(self, response, latency=0.05):
+        self.response = response
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self.response
+
+
+def run_together(count, target):
+    """Запускает target в count потоках одновременно; их результаты."""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(number):
+        barrier.wait()
+        results[number] = target(number)
+
+    threads = [
+        threading.Thread(target=run, args=(number,))
+        for number in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one(self):
+        flights = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        results = run_together(8, lambda _: flights.do('key', slow))
+        assert len(calls) == 1, 'Одинаковые запросы должны уйти один раз'
+        assert all(result is results[0] for result in results)
+        assert flights.snapshot()['shared'] == 7
+
+    def test_error_is_shared_and_not_remembered(self):
+        flights = SingleFlight()
+
+        def failing():
+            time.sleep(0.05)
+            raise ConnectionError('нет связи')
+
+        def call(_):
+            try:
+                flights.do('key', failing)
+            except ConnectionError as error:
+                return error
+
+        errors = run_together(4, call)
+        assert all(isinstance(error, ConnectionError) for error in errors), (
+            'Ошибка запроса должна дойти до всех ожидающих'
+        )
+        assert flights.do('key', lambda: 1) == 1, (
+            'Завершённый запрос не должен отвечать следующим'
+        )
+
+    def test_async_calls_share_one(self):
+        flights = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'ответ'
+
+        async def main():
+            return await asyncio.gather(*(
+                flights.do('key', slow) for _ in range(5)
+            ))
+
+        assert asyncio.run(main()) == ['ответ'] * 5
+        assert len(calls) == 1
+
+
+class TestCoalescedRequest:
+
+    def test_one_request_for_subscribers_of_token(self, monkeypatch):
+        session = SlowSession(MockResponse(200, BODY, {'ETag': '"1"'}))
+        monkeypatch.setattr(homework, 'api_session', session)
+        cache = ResponseCache()
+        flights = SingleFlight()
+        before = metrics.REQUESTS_COALESCED.value()
+        responses = run_together(3, lambda number: homework.request_homeworks(
+            'token', 1, cache=cache, key=number, flights=flights
+        ))
+        assert session.calls == 1
+        assert metrics.REQUESTS_COALESCED.value() - before == 2
+        assert all(
+            len(homework.check_response(response)) == 1
+            for response in responses
+        ), 'Новые работы должен получить каждый подписчик'
+        assert cache.snapshot()['misses'] == 3
+        assert all(cache.validators(key) == {'If-None-Match': '"1"'}
+                   for key in range(3)), (
+            'Кэш каждого подписчика обновляется по общему ответу'
+        )
+
+    def test_different_cursors_are_not_coalesced(self, monkeypatch):
+        session = SlowSession(MockResponse(200, BODY))
+        monkeypatch.setattr(homework, 'api_session', session)
+        flights = SingleFlight()
+        run_together(2, lambda number: homework.request_homeworks(
+            'token', number + 1, flights=flights
+        ))
+        assert session.calls == 2
+
+
+class TestRendezvous:
+
+    def test_same_token_and_cursor_share_time(self):
+        registry = SubscriptionRegistry()
+        student = registry.add('token', 1, from_date=5)
+        mentors = registry.add('token', 2, from_date=5)
+        other = registry.add('token', 3, from_date=6)
+        rendezvous = Rendezvous()
+        first = rendezvous.delay(student, 10.0)
+        assert rendezvous.delay(mentors, 30.0) == pytest.approx(first,
+                                                                abs=0.01)
+        assert rendezvous.delay(other, 30.0) == 30.0
+
+    def test_engine_polls_chats_of_token_with_one_request(self, monkeypatch):
+        session = SlowSession(MockResponse(200, BODY), latency=0.02)
+        monkeypatch.setattr(homework, 'api_session', session)
+        registry = SubscriptionRegistry()
+        for chat_id in range(3):
+            registry.add('token', chat_id, from_date=1)
+        bot = MockBot()
+        engine = PollEngine(registry, bot, interval=10, workers=4)
+        thread = threading.Thread(target=engine.run)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while len(bot.sent) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.stop()
+        thread.join(5)
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [0, 1, 2]
+        assert session.calls == 1, (
+            'Чаты одного токена должны опрашиваться одним запросом'
+        )
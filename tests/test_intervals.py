@@ -0,0 +1,74 @@
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from assistant.intervals import AdaptiveInterval, retry_after
+from assistant.registry import Subscriber
+
+
+def http_error(headers):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers.update(headers)
+    return requests.HTTPError(response=response)
+
+
+class TestAdaptiveInterval:
+
+    def make(self):
+        return AdaptiveInterval(
+            base=600, reviewing=120, max_interval=3600, idle_after=100,
+            jitter=0
+        )
+
+    def test_reviewing_polls_more_often(self):
+        policy, subscriber = self.make(), Subscriber('token', 1)
+        policy.observe(subscriber, [{'status': 'reviewing'}], now=0)
+        assert policy.next_delay(subscriber, now=0) == 120
+        policy.observe(subscriber, [{'status': 'approved'}], now=0)
+        assert policy.next_delay(subscriber, now=0) == 600
+
+    def test_error_backoff_is_capped(self):
+        policy, subscriber = self.make(), Subscriber('token', 1)
+        subscriber.changed_at = 0
+        delays = []
+        for _ in range(5):
+            policy.observe_error(subscriber, ConnectionError())
+            delays.append(policy.next_delay(subscriber, now=0))
+        assert delays == [600, 1200, 2400, 3600, 3600]
+        policy.observe(subscriber, [], now=0)
+        assert policy.next_delay(subscriber, now=0) == 600
+
+    def test_idle_grows_interval(self):
+        policy, subscriber = self.make(), Subscriber('token', 1)
+        subscriber.changed_at = 0
+        assert policy.next_delay(subscriber, now=50) == 600
+        assert policy.next_delay(subscriber, now=250) == 1800
+        assert policy.next_delay(subscriber, now=10 ** 6) == 3600
+
+    def test_retry_after_is_honored(self):
+        policy, subscriber = self.make(), Subscriber('token', 1)
+        policy.observe_error(subscriber, http_error({'Retry-After': '5000'}))
+        assert policy.next_delay(subscriber) == 5000
+
+    def test_jitter(self):
+        policy = AdaptiveInterval(base=600, jitter=0.1)
+        subscriber = Subscriber('token', 1)
+        delays = {policy.next_delay(subscriber) for _ in range(20)}
+        assert len(delays) > 1
+        assert all(540 <= delay <= 660 for delay in delays)
+
+
+class TestRetryAfter:
+
+    def test_seconds_and_date(self):
+        assert retry_after(http_error({'Retry-After': '30'})) == 30
+        date = formatdate(timeval=None, usegmt=True)
+        assert retry_after(
+            http_error({'Retry-After': date})
+        ) == pytest.approx(0, abs=2)
+
+    def test_missing_or_invalid(self):
+        assert retry_after(ConnectionError()) is None
+        assert retry_after(http_error({'Retry-After': 'soon'})) is None
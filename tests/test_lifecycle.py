@@ -0,0 +1,208 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import homework
+from assistant import aio, lifecycle
+from assistant.alerts import ErrorDigest
+from assistant.engine import PollEngine
+from assistant.intervals import AdaptiveInterval
+from assistant.lifecycle import Shutdown
+from assistant.registry import SubscriptionRegistry, Subscriber
+from assistant.sender import SendQueue
+from assistant.state import open_store
+from tests.utils import make_response
+
+
+class SlowBot:
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def signals():
+    saved = {signum: signal.getsignal(signum) for signum in
+             (signal.SIGTERM, signal.SIGINT)}
+    yield
+    signal.set_wakeup_fd(-1)
+    for signum, handler in saved.items():
+        signal.signal(signum, handler)
+
+
+class TestShutdown:
+
+    def test_request_interrupts_wait(self):
+        shutdown = Shutdown(timeout=5)
+        threading.Timer(0.05, shutdown.request).start()
+        started = time.monotonic()
+        assert shutdown.wait(60)
+        assert time.monotonic() - started < 1, (
+            'Остановка должна прерывать паузу между опросами'
+        )
+        assert 4 < shutdown.remaining() <= 5
+
+    def test_callbacks_run_once(self):
+        shutdown = Shutdown()
+        calls = []
+        shutdown.on_stop(lambda: calls.append('before'))
+        shutdown.request()
+        shutdown.request()
+        shutdown.on_stop(lambda: calls.append('after'))
+        assert calls == ['before', 'after']
+
+    def test_sigterm_wakes_waiter(self, signals, monkeypatch):
+        exits = []
+        monkeypatch.setattr(lifecycle.os, '_exit', exits.append)
+        shutdown = Shutdown().install()
+        blocked = threading.Event()
+        threading.Thread(target=blocked.wait, args=(5,)).start()
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert shutdown.wait(5), (
+            'Сигнал должен будить ожидание, даже если его получил '
+            'не главный поток'
+        )
+        blocked.set()
+        assert not exits
+        os.kill(os.getpid(), signal.SIGTERM)
+        deadline = time.monotonic() + 5
+        while not exits and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert exits == [1], 'Повторный сигнал должен завершать процесс'
+
+
+class TestPollForever:
+
+    def test_stops_during_sleep(self, monkeypatch, random_timestamp):
+        monkeypatch.setattr(homework, 'get_api_answer',
+                            lambda from_date: make_response(random_timestamp))
+        monkeypatch.setattr(homework, 'bot', None, raising=False)
+        shutdown = Shutdown()
+        state = Subscriber('token', 1)
+        store = open_store(':memory:')
+        threading.Timer(0.1, shutdown.request).start()
+        started = time.monotonic()
+        homework.poll_forever(state, AdaptiveInterval(600), store, None,
+                              ErrorDigest(), shutdown)
+        assert time.monotonic() - started < 1
+        assert store.cursors[state.id][0] == random_timestamp
+
+    def test_started_called_once(self, monkeypatch, random_timestamp):
+        monkeypatch.setattr(homework, 'get_api_answer',
+                            lambda from_date: make_response(random_timestamp))
+        monkeypatch.setattr(homework, 'bot', None, raising=False)
+        shutdown = Shutdown()
+        policy = AdaptiveInterval(0.01, reviewing=0.01, max_interval=0.01)
+        calls = []
+        threading.Timer(0.2, shutdown.request).start()
+        homework.poll_forever(Subscriber('token', 1), policy,
+                              open_store(':memory:'), None, ErrorDigest(),
+                              shutdown, started=lambda: calls.append(1))
+        assert calls == [1], 'started() вызывается только после первого опроса'
+
+
+class TestShutdownUnderLoad:
+
+    def test_drains_queue_and_flushes_cursors(self, monkeypatch, tmp_path,
+                                              random_timestamp):
+        def mock_request(token, from_date, **kwargs):
+            time.sleep(0.05)
+            item = {'id': int(token.split('-')[1]),
+                    'homework_name': f'{token}.zip',
+                    'status': 'approved'}
+            return make_response(random_timestamp, item)
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        path = str(tmp_path / 'state.sqlite3')
+        store = open_store(path, flush_interval=60)
+        registry = SubscriptionRegistry()
+        for number in range(500):
+            registry.add(f'token-{number}', number)
+        bot = SlowBot(0.002)
+        queue = SendQueue(bot, workers=4, global_rate=10_000,
+                          chat_rate=10_000)
+        engine = PollEngine(registry, bot, interval=1, workers=16,
+                            store=store, queue=queue)
+        shutdown = Shutdown(timeout=3)
+        shutdown.on_stop(lambda: engine.stop(shutdown.remaining()))
+        thread = threading.Thread(target=engine.run)
+        thread.start()
+        time.sleep(0.5)
+        started = time.monotonic()
+        shutdown.request()
+        thread.join(5)
+        assert queue.close(shutdown.remaining())
+        store.close()
+        elapsed = time.monotonic() - started
+        assert elapsed < 1, f'Остановка под нагрузкой заняла {elapsed:.2f} с'
+        assert queue.depth == 0
+        saved = open_store(path)
+        polled = [
+            state for state in (
+                Subscriber(item.token, item.chat_id) for item in registry
+            ) if saved.restore(state)
+        ]
+        saved.close()
+        assert polled, 'Курсоры должны быть записаны при остановке'
+        assert {state.from_date for state in polled} == {random_timestamp}
+        assert {chat_id for chat_id, _ in bot.sent} == {
+            state.chat_id for state in polled
+        }, 'Каждому подписчику с записанным курсором должно уйти уведомление'
+
+    def test_hung_poll_does_not_block_stop(self, monkeypatch):
+        release = threading.Event()
+        monkeypatch.setattr(homework, 'request_homeworks',
+                            lambda *args, **kwargs: release.wait(10))
+        registry = SubscriptionRegistry()
+        registry.add('token', 1)
+        engine = PollEngine(registry, SlowBot(0), interval=1, workers=1)
+        thread = threading.Thread(target=engine.run)
+        thread.start()
+        time.sleep(0.1)
+        started = time.monotonic()
+        engine.stop(grace=0.2)
+        thread.join(5)
+        elapsed = time.monotonic() - started
+        release.set()
+        assert elapsed < 1, 'Зависший опрос не должен держать остановку'
+
+    def test_async_hung_poll_is_cancelled(self, monkeypatch):
+        async def mock_fetch(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        monkeypatch.setattr(aio, 'fetch_homeworks', mock_fetch)
+        registry = SubscriptionRegistry()
+        registry.add('token', 1)
+        engine = aio.AsyncEngine(registry, '1:token', interval=0)
+
+        async def run():
+            task = asyncio.ensure_future(engine.run())
+            await asyncio.sleep(0.1)
+            engine.stop(grace=0.2)
+            await task
+
+        started = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - started < 1
+
+    def test_async_stop_before_run(self):
+        registry = SubscriptionRegistry()
+        registry.add('token', 1)
+        engine = aio.AsyncEngine(registry, '1:token', interval=60)
+        engine.stop(grace=0.1)
+        started = time.monotonic()
+        asyncio.run(asyncio.wait_for(engine.run(), 5))
+        assert time.monotonic() - started < 1, (
+            'Остановка, запрошенная до запуска, не должна теряться'
+        )
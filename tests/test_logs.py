@@ -0,0 +1,114 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from assistant import logs, metrics
+
+
+@pytest.fixture
+def output():
+    root = logging.getLogger()
+    level, handlers = root.level, root.handlers[:]
+    stream = io.StringIO()
+    yield stream
+    logs.shutdown()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    logs.payload_sample = 1.0
+
+
+class TestSetup:
+
+    def test_json_carries_bound_fields(self, output):
+        logs.setup(logging.INFO, 'json', stream=output)
+        with logs.bind(subscriber='abc'):
+            with logs.bind(homework=7):
+                logging.info('Отправлено: %s', 'текст')
+            logging.warning('Без работы')
+        logs.shutdown()
+        first, second = map(json.loads, output.getvalue().splitlines())
+        assert first['message'] == 'Отправлено: текст'
+        assert (first['subscriber'], first['homework']) == ('abc', 7)
+        assert first['level'] == 'INFO'
+        assert second['subscriber'] == 'abc' and 'homework' not in second, (
+            'Поля bind не должны переживать свой блок'
+        )
+
+    def test_text_is_written_on_shutdown(self, output):
+        logs.setup(logging.INFO, stream=output)
+        for number in range(100):
+            logging.info('Запись %s', number)
+        logs.shutdown()
+        lines = output.getvalue().splitlines()
+        assert len(lines) == 100
+        assert lines[-1].endswith('[INFO] Запись 99')
+
+    def test_setup_replaces_previous_queue(self, output):
+        logs.setup(logging.INFO, stream=output)
+        logs.setup(logging.INFO, stream=output)
+        logging.info('Один раз')
+        logs.shutdown()
+        assert output.getvalue().count('Один раз') == 1
+
+
+class TestLazyQueueHandler:
+
+    def test_message_is_not_formatted_in_caller(self):
+        records = queue.SimpleQueue()
+        handler = logs.LazyQueueHandler(records)
+        record = logging.LogRecord(
+            'root', logging.INFO, __file__, 1, 'Ответ: %s', ('тело',), None
+        )
+        handler.handle(record)
+        queued = records.get_nowait()
+        assert queued.args == ('тело',) and queued.msg == 'Ответ: %s', (
+            'Сообщение должно собираться в фоновом потоке'
+        )
+
+    def test_full_queue_drops_records(self):
+        records = queue.SimpleQueue()
+        handler = logs.LazyQueueHandler(records, max_size=2)
+        before = metrics.LOG_RECORDS_DROPPED.value()
+        for number in range(5):
+            handler.handle(logging.LogRecord(
+                'root', logging.INFO, __file__, 1, str(number), None, None
+            ))
+        assert records.qsize() == 2
+        assert handler.dropped == 3
+        assert metrics.LOG_RECORDS_DROPPED.value() - before == 3
+
+    def test_full_queue_keeps_warnings(self):
+        records = queue.SimpleQueue()
+        stream = io.StringIO()
+        handler = logs.LazyQueueHandler(
+            records, max_size=1, output=logging.StreamHandler(stream)
+        )
+        for level in (logging.INFO, logging.INFO, logging.ERROR):
+            handler.handle(logging.LogRecord(
+                'root', level, __file__, 1, 'Сбой', None, None
+            ))
+        assert records.qsize() == 1
+        assert handler.dropped == 1
+        assert stream.getvalue() == 'Сбой\n', (
+            'Записи WARNING и выше не должны теряться при переполнении'
+        )
+
+
+class TestDebugPayload:
+
+    @pytest.mark.parametrize('sample, expected', [(0.0, 0), (1.0, 10)])
+    def test_sampling(self, output, sample, expected):
+        logs.setup(logging.DEBUG, sample=sample, stream=output)
+        for _ in range(10):
+            logs.debug_payload('Ответ API: %s', {'homeworks': []})
+        logs.shutdown()
+        assert output.getvalue().count('Ответ API') == expected
+
+    def test_skipped_above_debug(self, output):
+        logs.setup(logging.INFO, stream=output)
+        logs.debug_payload('Ответ API: %s', {})
+        logs.shutdown()
+        assert output.getvalue() == ''
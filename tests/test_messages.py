@@ -0,0 +1,101 @@
+import json
+
+import homework
+from assistant import messages
+from assistant.engine import PollEngine
+from assistant.records import Homework, Status
+from assistant.registry import SubscriptionRegistry
+from assistant.sender import SendQueue
+from tests.utils import RecordingBot
+
+ITEM = {'id': 1, 'homework_name': 'hw_1.zip', 'status': 'approved'}
+
+
+class TestTemplates:
+
+    def test_default_matches_verdicts(self):
+        assert homework.parse_status(ITEM) == (
+            'Изменился статус проверки работы "hw_1.zip". '
+            f'{homework.HOMEWORK_VERDICTS["approved"]}'
+        )
+
+    def test_fixed_values_are_compiled_in(self):
+        template = messages.Template('{a} и {b}', verdict='x', b='{b}')
+        assert template.fields == ('a',), (
+            'Фиксированные значения не должны остаться полями шаблона'
+        )
+        assert template.render(a='{a}') == '{a} и {b}'
+
+    def test_markdown_escapes_text_and_values(self):
+        text = messages.render_status('hw_1.zip', 'approved', 'ru',
+                                      'MarkdownV2')
+        assert text == (
+            'Изменился статус проверки работы "hw\\_1\\.zip"\\. '
+            'Работа проверена: ревьюеру всё понравилось\\. Ура\\!'
+        )
+
+    def test_html_escapes_values(self):
+        text = messages.render('error', 'en', 'HTML', error='<b> & </b>')
+        assert text == 'The bot has failed: &lt;b&gt; &amp; &lt;/b&gt;'
+
+    def test_unknown_locale_falls_back_to_default(self):
+        assert messages.render('startup', 'xx') == 'Я запустился!'
+        assert messages.render('startup', 'en') == 'I am up and running!'
+
+    def test_rendered_status_is_cached(self):
+        record = Homework.from_api(ITEM)
+        homework.format_status(record, 'en')
+        hits = messages.render_status.cache_info().hits
+        assert homework.format_status(dict(ITEM), 'en') == (
+            'Review status of "hw_1.zip" has changed. '
+            'The reviewer has approved the work. Hooray!'
+        )
+        assert messages.render_status.cache_info().hits == hits + 1, (
+            'Строка и Status должны попадать в одну запись кэша'
+        )
+        assert messages.render_status('hw_1.zip', Status.APPROVED, 'en') is (
+            messages.render_status('hw_1.zip', 'approved', 'en')
+        )
+
+
+class TestSubscriberOptions:
+
+    def test_registry_loads_options(self, tmp_path):
+        path = tmp_path / 'subscribers.json'
+        path.write_text(json.dumps([
+            {'token': 'a', 'chat_id': 1, 'locale': 'en',
+             'parse_mode': 'HTML'},
+            {'token': 'b', 'chat_id': 2},
+        ]))
+        first, second = SubscriptionRegistry.load(str(path))
+        assert (first.locale, first.parse_mode) == ('en', 'HTML')
+        assert homework.message_options(second) == (
+            homework.LOCALE, homework.PARSE_MODE
+        )
+
+    def test_engine_uses_subscriber_options(self, monkeypatch):
+        def mock_request(token, from_date, **kwargs):
+            return {'homeworks': [ITEM], 'current_date': 1}
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        bot = RecordingBot()
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1, locale='en',
+                                  parse_mode='MarkdownV2')
+        PollEngine(registry, bot).poll(subscriber)
+        assert bot.calls == [(
+            1,
+            'Review status of "hw\\_1\\.zip" has changed\\. '
+            'The reviewer has approved the work\\. Hooray\\!',
+            'MarkdownV2'
+        )]
+
+    def test_queue_does_not_mix_parse_modes(self):
+        bot = RecordingBot()
+        queue = SendQueue(bot, workers=1, chat_rate=100)
+        with queue._cond:
+            queue.send(1, 'a', 'HTML')
+            queue.send(1, 'b', 'HTML')
+            queue.send(1, 'c')
+        assert queue.close(5)
+        assert bot.calls == [(1, 'a\n\nb', 'HTML'), (1, 'c', None)]
@@ -0,0 +1,82 @@
+import time
+from urllib.request import urlopen
+
+import exceptions
+import homework
+from assistant import metrics
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+
+
+class TestMetrics:
+
+    def test_counter_with_labels(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter('errors_total', 'Ошибки.', ('type',),
+                                  registry=registry)
+        counter.inc(type='A')
+        counter.inc(2, type='A')
+        counter.inc(type='B')
+        text = registry.render()
+        assert '# TYPE errors_total counter' in text
+        assert 'errors_total{type="A"} 3' in text
+        assert 'errors_total{type="B"} 1' in text
+
+    def test_histogram_is_cumulative(self):
+        registry = metrics.Registry()
+        histogram = metrics.Histogram('latency', 'Задержка.', (0.1, 1),
+                                      registry=registry)
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+        text = registry.render()
+        assert 'latency_bucket{le="0.1"} 1' in text
+        assert 'latency_bucket{le="1"} 3' in text
+        assert 'latency_bucket{le="+Inf"} 4' in text
+        assert 'latency_count 4' in text
+        assert 'latency_sum 6.05' in text
+
+    def test_gauge_function(self):
+        registry = metrics.Registry()
+        gauge = metrics.Gauge('depth', 'Глубина.', registry=registry)
+        gauge.set_function(lambda: 42)
+        assert 'depth 42' in registry.render()
+
+    def test_endpoint(self):
+        registry = metrics.Registry()
+        metrics.Counter('up', 'Работает.', registry=registry).inc()
+        server = metrics.serve(0, '127.0.0.1', registry)
+        port = server.server_address[1]
+        with urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert b'up 1' in response.read()
+        server.shutdown()
+
+    def test_observe_is_cheap(self):
+        histogram = metrics.Histogram('cheap', 'Дёшево.',
+                                      registry=metrics.Registry())
+        started = time.perf_counter()
+        for _ in range(10000):
+            histogram.observe(0.01)
+        assert (time.perf_counter() - started) / 10000 < 50e-6
+
+
+class TestInstrumentation:
+
+    def test_engine_counts_exceptions_by_type(self, monkeypatch):
+        def mock_request(token, from_date, **kwargs):
+            raise exceptions.RequestToEndpointFailed('404')
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        engine = PollEngine(registry, None, queue=None)
+        monkeypatch.setattr(engine, 'send', lambda *args: None)
+        before = metrics.EXCEPTIONS.value(type='RequestToEndpointFailed')
+        engine.poll(subscriber)
+        assert metrics.EXCEPTIONS.value(
+            type='RequestToEndpointFailed'
+        ) == before + 1
+
+    def test_check_response_counts_homeworks(self):
+        before = metrics.HOMEWORKS_PER_RESPONSE.count()
+        homework.check_response({'homeworks': [{}, {}], 'current_date': 1})
+        assert metrics.HOMEWORKS_PER_RESPONSE.count() == before + 1
@@ -0,0 +1,101 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import homework
+from assistant import lifecycle, profiling
+from assistant.engine import PollEngine
+from assistant.lifecycle import Shutdown
+from assistant.registry import SubscriptionRegistry
+from tests.utils import MockBot, make_response, wait_for
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiling.configure(slowest_count=3, sample_interval=0.001,
+                        output=str(tmp_path))
+    yield tmp_path
+    profiling.stop()
+    profiling.configure()
+
+
+class TestProfiling:
+
+    def test_disabled_costs_nothing(self):
+        assert not profiling.enabled
+        assert profiling.span('request') is profiling.NOOP
+        assert profiling.cycle('key') is profiling.NOOP
+
+    def test_slowest_cycles_with_stages(self, profiler):
+        profiling.start()
+        for number in range(5):
+            with profiling.cycle(f'subscriber-{number}'):
+                with profiling.span('request'):
+                    time.sleep(0.01 * number)
+                with profiling.span('send'):
+                    pass
+        report = profiling.report()
+        assert len(report) == 3, 'Хранятся только самые медленные циклы'
+        assert report[0].split()[2] == 'subscriber-4'
+        assert 'request' in report[0] and 'send' in report[0]
+
+    def test_stop_writes_reports(self, profiler):
+        profiling.start()
+        busy = threading.Event()
+        thread = threading.Thread(target=busy.wait, args=(5,))
+        thread.start()
+        with profiling.cycle('subscriber'):
+            time.sleep(0.05)
+        busy.set()
+        thread.join()
+        paths = profiling.stop()
+        assert not profiling.enabled
+        slowest, stacks = paths
+        assert os.path.basename(slowest).startswith('slowest')
+        assert stacks.endswith('.folded')
+        with open(slowest) as file:
+            assert 'subscriber' in file.read()
+        with open(stacks) as file:
+            stack, count = file.readline().rsplit(' ', 1)
+        assert ';' in stack and int(count) > 0
+
+    def test_engine_poll_stages(self, monkeypatch, profiler,
+                                random_timestamp):
+        monkeypatch.setattr(
+            homework, 'request_homeworks',
+            lambda token, from_date, **kwargs: make_response(
+                random_timestamp,
+                {'homework_name': 'hw', 'status': 'approved'}
+            )
+        )
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        profiling.configure(sample_interval=0, output=str(profiler))
+        profiling.start()
+        PollEngine(registry, MockBot()).poll(subscriber)
+        [line] = profiling.report()
+        assert subscriber.id in line
+        for stage in ('check', 'format', 'send'):
+            assert stage in line, f'Нет этапа {stage} в отчёте: {line}'
+
+    def test_sigusr1_toggles(self, profiler, monkeypatch):
+        monkeypatch.setattr(lifecycle.os, '_exit', lambda code: None)
+        saved = signal.getsignal(signal.SIGUSR1), {
+            signum: signal.getsignal(signum) for signum in lifecycle.SIGNALS
+        }
+        shutdown = Shutdown().install()
+        shutdown.handle(signal.SIGUSR1, profiling.toggle)
+        try:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert wait_for(lambda: profiling.enabled)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert wait_for(lambda: not profiling.enabled)
+        finally:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGUSR1, saved[0])
+            for signum, handler in saved[1].items():
+                signal.signal(signum, handler)
+        assert any(name.startswith('slowest') for name in os.listdir(profiler))
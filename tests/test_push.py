@@ -0,0 +1,138 @@
+import json
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import exceptions
+import homework
+from assistant import push
+from assistant.dedup import SeenIndex
+from assistant.engine import PollEngine
+from assistant.records import Homework
+from assistant.registry import SubscriptionRegistry, Subscriber
+from tests.utils import MockBot
+
+ITEM = {'id': 1, 'homework_name': 'hw_1', 'status': 'approved'}
+
+
+def post(server, path, data, headers=None) -> int:
+    url = f'http://127.0.0.1:{server.server_address[1]}{path}'
+    body = data if isinstance(data, bytes) else json.dumps(data).encode()
+    try:
+        with urlopen(Request(url, body, headers or {})) as response:
+            return response.status
+    except HTTPError as error:
+        return error.code
+
+
+@pytest.fixture
+def engine():
+    registry = SubscriptionRegistry()
+    registry.add('token', 1)
+    engine = PollEngine(registry, MockBot())
+    yield engine
+    engine._executor.shutdown()
+
+
+@pytest.fixture
+def server(engine):
+    server = push.serve(0, engine.push, host='127.0.0.1')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestParseEvent:
+
+    def test_item_and_list(self):
+        assert push.parse_event(json.dumps(ITEM).encode()) == [
+            Homework.from_api(ITEM)
+        ]
+        assert len(push.parse_event(json.dumps([ITEM, ITEM]).encode())) == 2
+
+    def test_invalid_item_is_rejected(self):
+        with pytest.raises(exceptions.HomeworkTypeError):
+            push.parse_event(json.dumps({**ITEM, 'status': 'x'}).encode())
+        with pytest.raises(KeyError):
+            push.parse_event(json.dumps({'status': 'approved'}).encode())
+
+
+class TestPushServer:
+
+    def test_event_is_delivered_once(self, engine, server):
+        subscriber = next(iter(engine.registry))
+        assert post(server, f'/push/{subscriber.id}', ITEM) == 202
+        assert post(server, f'/push/{subscriber.id}', [ITEM]) == 202
+        assert engine.bot.sent == [(1, homework.parse_status(ITEM))], (
+            'Повтор события должен отсеиваться индексом отправленного'
+        )
+        assert engine.store.status(subscriber.id, '1') == 'approved'
+
+    def test_poll_after_push_does_not_repeat(self, engine, server,
+                                             monkeypatch):
+        subscriber = next(iter(engine.registry))
+        monkeypatch.setattr(
+            homework, 'request_homeworks',
+            lambda *args, **kwargs: {'homeworks': [ITEM], 'current_date': 5}
+        )
+        assert post(server, f'/push/{subscriber.id}', ITEM) == 202
+        engine.poll(subscriber)
+        assert len(engine.bot.sent) == 1
+        assert subscriber.from_date == 5
+
+    def test_errors(self, engine, server):
+        subscriber = next(iter(engine.registry))
+        assert post(server, '/push/unknown', ITEM) == 404
+        assert post(server, f'/push/{subscriber.id}', b'{') == 400
+        assert post(server, f'/push/{subscriber.id}', {'id': 1}) == 400
+        assert post(server, '/other', ITEM) == 404
+        assert engine.bot.sent == []
+
+    def test_secret(self, engine):
+        subscriber = next(iter(engine.registry))
+        server = push.serve(0, engine.push, 'secret', host='127.0.0.1')
+        try:
+            path = f'/push/{subscriber.id}'
+            assert post(server, path, ITEM) == 401
+            assert post(server, path, ITEM,
+                        {'Authorization': 'Bearer wrong'}) == 401
+            assert post(server, path, ITEM,
+                        {'Authorization': 'Bearer secret'}) == 202
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @pytest.mark.parametrize('secret, host', [
+        (None, '127.0.0.1'), ('secret', '0.0.0.0'),
+    ])
+    def test_without_secret_listens_locally(self, engine, secret, host):
+        server = push.serve(0, engine.push, secret)
+        try:
+            assert server.server_address[0] == host, (
+                'Без PUSH_SECRET приём не должен быть доступен извне'
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestPushMode:
+
+    def test_policy_becomes_reconciliation(self, monkeypatch):
+        assert homework.init_policy().base == homework.RETRY_TIME
+        monkeypatch.setattr(homework, 'PUSH_PORT', 8443)
+        policy = homework.init_policy()
+        assert policy.base == policy.reviewing == homework.RECONCILE_TIME
+
+    def test_single_subscriber_sink(self, monkeypatch):
+        sent = []
+        monkeypatch.setattr(homework, 'bot', None, raising=False)
+        monkeypatch.setattr(homework, 'send_message',
+                            lambda bot, message: sent.append(message))
+        state = Subscriber('token', 1)
+        sink = homework.push_sink(state, SeenIndex())
+        assert not sink('other', [Homework.from_api(ITEM)])
+        assert sink(state.id, [Homework.from_api(ITEM)])
+        assert sink(state.id, [Homework.from_api(ITEM)])
+        assert sent == [homework.parse_status(ITEM)]
@@ -0,0 +1,76 @@
+import pytest
+
+import exceptions
+import homework
+from assistant.dedup import SeenIndex
+from assistant.records import Homework, Status, key_of, status_of
+from assistant.registry import Subscriber
+from assistant.state import SqliteStore
+
+ITEM = {
+    'id': 7,
+    'homework_name': 'hw',
+    'status': 'rejected',
+    'date_updated': '2022-01-01T00:00:00Z',
+    'reviewer_comment': 'Исправьте',
+    'lesson_name': 'Итоговый проект',
+}
+
+
+class TestHomework:
+
+    def test_from_api(self):
+        record = Homework.from_api(ITEM)
+        assert record == Homework(7, 'hw', Status.REJECTED,
+                                  '2022-01-01T00:00:00Z', 'Исправьте')
+        assert record.status is Status.REJECTED, (
+            'Статус должен быть общим объектом Status'
+        )
+
+    def test_is_immutable_and_slotted(self):
+        record = Homework.from_api(ITEM)
+        with pytest.raises(AttributeError):
+            record.status = Status.APPROVED
+        assert not hasattr(record, '__dict__')
+
+    def test_unknown_status(self):
+        with pytest.raises(exceptions.HomeworkTypeError):
+            Homework.from_api(dict(ITEM, status='unknown'))
+
+    def test_status_compares_as_string(self):
+        assert Status.APPROVED == 'approved'
+        assert {'approved': 1}[Status.APPROVED] == 1
+        assert f'{Status.APPROVED}' == 'approved'
+
+    def test_helpers_accept_dicts(self):
+        record = Homework.from_api(ITEM)
+        assert status_of(record) == status_of(ITEM) == 'rejected'
+        assert key_of(record) == key_of(ITEM) == 7
+        assert key_of(Homework(None, 'hw', Status.APPROVED)) == 'hw'
+
+
+class TestRecordsDownstream:
+
+    def test_parse_status(self):
+        assert homework.parse_status(Homework.from_api(ITEM)) == (
+            homework.parse_status(ITEM)
+        )
+
+    def test_check_response_builds_records(self):
+        homeworks = homework.check_response({'homeworks': [ITEM]})
+        assert homeworks == [Homework.from_api(ITEM)]
+
+    def test_dedup_key_matches_dict(self):
+        seen = SeenIndex()
+        assert seen.admit('chat', ITEM)
+        assert not seen.admit('chat', Homework.from_api(ITEM)), (
+            'Запись и словарь одной работы - одно изменение статуса'
+        )
+
+    def test_store_saves_plain_status(self, tmp_path):
+        store = SqliteStore(str(tmp_path / 'state.sqlite3'),
+                            flush_interval=0)
+        subscriber = Subscriber('token', 1, id='sub')
+        store.save(subscriber, [Homework.from_api(ITEM)])
+        assert store.status('sub', '7') == 'rejected'
+        store.close()
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+
+import homework
+from assistant import aio, routing
+from assistant.engine import PollEngine
+from assistant.records import Homework, Status
+from assistant.registry import Route, SubscriptionRegistry
+from assistant.sender import SendQueue
+from assistant.state import MemoryStore
+from tests.utils import MockSender, RecordingBot
+
+APPROVED = Homework(1, 'hw_1.zip', Status.APPROVED)
+REVIEWING = Homework(2, 'hw_2.zip', Status.REVIEWING)
+
+
+class SlowBot(RecordingBot):
+
+    def send_message(self, chat_id=None, text=None, parse_mode=None):
+        time.sleep(0.05)
+        super().send_message(chat_id, text, parse_mode)
+
+
+class TestRoutes:
+
+    def test_load_from_registry(self, tmp_path):
+        path = tmp_path / 'subscribers.json'
+        path.write_text(json.dumps([{
+            'token': 'a', 'chat_id': 1,
+            'routes': [
+                {'chat_id': 2},
+                {'chat_id': 3, 'statuses': ['approved'], 'locale': 'en'},
+            ],
+        }]))
+        subscriber, = SubscriptionRegistry.load(str(path))
+        assert [route.chat_id for route in subscriber.routes] == [2, 3]
+        assert subscriber.routes[1].statuses == {Status.APPROVED}
+
+    def test_filter_by_status(self):
+        subscriber = SubscriptionRegistry().add('token', 1, routes=[
+            Route(2), Route(3, statuses=['approved']),
+        ])
+        chats = [chat_id for chat_id, *_ in routing.render(subscriber,
+                                                           REVIEWING)]
+        assert chats == [1, 2], (
+            'Чат с фильтром не должен получать другие статусы'
+        )
+        chats = [chat_id for chat_id, *_ in routing.render(subscriber,
+                                                           APPROVED)]
+        assert chats == [1, 2, 3]
+
+    def test_text_is_rendered_once_per_locale(self, monkeypatch):
+        calls = []
+        format_status = homework.format_status
+
+        def counting(item, locale=None, parse_mode=None):
+            calls.append((locale, parse_mode))
+            return format_status(item, locale, parse_mode)
+
+        monkeypatch.setattr(homework, 'format_status', counting)
+        subscriber = SubscriptionRegistry().add('token', 1, routes=[
+            Route(chat_id) for chat_id in range(2, 50)
+        ] + [Route(chat_id, locale='en') for chat_id in range(50, 100)])
+        outgoing = routing.render(subscriber, APPROVED)
+        assert len(outgoing) == 99
+        assert len(calls) == 2, (
+            'Текст должен формироваться один раз на пару язык/разметка'
+        )
+        assert outgoing[-1][1].startswith('Review status')
+
+
+class TestFanOut:
+
+    def test_engine_sends_to_every_route(self, monkeypatch):
+        def mock_request(token, from_date, **kwargs):
+            return {'homeworks': [APPROVED], 'current_date': 1}
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        bot = SlowBot()
+        store = MemoryStore()
+        queue = SendQueue(bot, workers=8, global_rate=1000, outbox=store)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 0, routes=[
+            Route(chat_id) for chat_id in range(1, 8)
+        ])
+        started = time.monotonic()
+        PollEngine(registry, bot, store=store, queue=queue).poll(subscriber)
+        assert queue.close(5)
+        assert sorted(chat_id for chat_id, *_ in bot.calls) == list(range(8))
+        assert time.monotonic() - started < 0.3, (
+            'Чаты маршрутов должны получать уведомление параллельно'
+        )
+        assert store.pending(subscriber.id) == [], (
+            'Доставленные уведомления должны уйти из outbox'
+        )
+
+    def test_async_engine_sends_to_every_route(self, monkeypatch):
+        async def mock_fetch(session, token, from_date, **kwargs):
+            return {'homeworks': [APPROVED], 'current_date': 1}
+
+        monkeypatch.setattr(aio, 'fetch_homeworks', mock_fetch)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 0, routes=[
+            Route(1), Route(2, statuses=['rejected']), Route(3),
+        ])
+        engine = aio.AsyncEngine(registry, '1:token')
+        engine.sender = MockSender()
+
+        async def poll():
+            engine._limit = asyncio.Semaphore(4)
+            await engine.poll(subscriber)
+
+        asyncio.run(poll())
+        assert sorted(chat_id for chat_id, _ in engine.sender.sent) == [
+            0, 1, 3
+        ]
+        assert engine.store.pending(subscriber.id) == []
+
+    def test_single_subscriber_routes(self, monkeypatch):
+        bot = RecordingBot()
+        monkeypatch.setattr(homework, 'bot', bot, raising=False)
+        monkeypatch.setattr(homework, 'send_queue', None)
+        monkeypatch.setattr(homework, 'routes', (
+            Route(100), Route(200, statuses=['rejected']),
+        ))
+        homework.check_and_send({'homeworks': [APPROVED], 'current_date': 1})
+        assert [chat_id for chat_id, *_ in bot.calls] == [
+            homework.TELEGRAM_CHAT_ID, 100
+        ]
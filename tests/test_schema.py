@@ -0,0 +1,115 @@
+import json
+import logging
+
+import pytest
+
+import exceptions
+import homework
+from assistant.records import Homework, Status
+from assistant.schema import (iter_homeworks, load_response,
+                              validate_homework, validate_response)
+
+HOMEWORK = {
+    'id': 1,
+    'status': 'approved',
+    'homework_name': 'hw',
+    'reviewer_comment': 'ok',
+    'date_updated': '2022-01-01T00:00:00Z',
+    'lesson_name': 'Итоговый проект',
+}
+
+
+class TestValidators:
+
+    def test_valid_homework(self):
+        assert validate_homework(HOMEWORK) is HOMEWORK
+
+    def test_missing_key_is_key_error(self):
+        with pytest.raises(KeyError):
+            validate_homework({'status': 'approved'})
+
+    @pytest.mark.parametrize('item', [
+        [HOMEWORK], {'homework_name': 1, 'status': 'approved'},
+        {'homework_name': 'hw', 'status': 'approved', 'id': '1'},
+    ])
+    def test_wrong_type(self, item):
+        with pytest.raises(exceptions.HomeworkTypeError):
+            validate_homework(item)
+
+    def test_response(self):
+        assert validate_response({'homeworks': []}) == []
+        with pytest.raises(TypeError):
+            validate_response([{'homeworks': []}])
+        with pytest.raises(exceptions.ApiAnswerTypeError):
+            validate_response({})
+        with pytest.raises(exceptions.ApiAnswerTypeError):
+            validate_response({'homeworks': HOMEWORK})
+
+
+class TestLoadResponse:
+
+    def test_builds_records(self):
+        body = json.dumps({'homeworks': [HOMEWORK], 'current_date': 5})
+        response = load_response(body.encode())
+        assert response['current_date'] == 5
+        assert response['homeworks'] == [Homework(
+            1, 'hw', Status.APPROVED, '2022-01-01T00:00:00Z', 'ok'
+        )]
+
+    def test_invalid_homework_is_kept_as_is(self):
+        body = json.dumps({'homeworks': [{'status': 'x', 'extra': 1}]})
+        assert load_response(body)['homeworks'] == [
+            {'status': 'x', 'extra': 1}
+        ], 'Некорректную работу должен отклонить parse_status'
+
+    @pytest.mark.parametrize('data', [
+        {'homeworks': [], 'current_date': 1},
+        {'current_date': 1, 'homeworks': [HOMEWORK, {'status': 'x'}]},
+        {'homeworks': {'a': 1}},
+        {},
+        [1, 2],
+    ])
+    def test_matches_json(self, data):
+        expected = json.loads(json.dumps(data))
+        if isinstance(expected, dict) and isinstance(
+            expected.get('homeworks'), list
+        ):
+            expected['homeworks'] = [
+                Homework.from_api(item) if 'homework_name' in item else item
+                for item in expected['homeworks']
+            ]
+        assert load_response(json.dumps(data, indent=2)) == expected
+
+    @pytest.mark.parametrize('body', [
+        '{"homeworks": [1,', '{"a": 1} x', '{"a" 1}', '',
+        '{"homeworks": [1 2]}',
+    ])
+    def test_malformed(self, body):
+        with pytest.raises(json.JSONDecodeError):
+            load_response(body)
+
+    def test_iter_homeworks_is_lazy(self):
+        body = '{"homeworks": [' + json.dumps(HOMEWORK) + ', ???'
+        homeworks = iter_homeworks(body)
+        assert next(homeworks).name == 'hw', (
+            'Работы должны выдаваться до разбора остатка ответа'
+        )
+        with pytest.raises(json.JSONDecodeError):
+            next(homeworks)
+
+
+class TestLazyLogging:
+
+    def test_payload_is_not_formatted_without_debug(self, caplog):
+        class Payload(dict):
+            formatted = False
+
+            def __repr__(self):
+                Payload.formatted = True
+                return 'payload'
+
+        caplog.set_level(logging.INFO)
+        homework.check_response(Payload(homeworks=[]))
+        assert not Payload.formatted, (
+            'Ответ API не должен форматироваться при выключенном DEBUG'
+        )
@@ -0,0 +1,148 @@
+import time
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from assistant.sender import RateLimiter, SendQueue, TokenBucket
+from assistant.state import MemoryStore
+from tests.utils import RecordingBot, wait_for
+
+
+class TestLimiters:
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        now = time.monotonic()
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == 0
+        assert bucket.reserve(now) == pytest.approx(0.5)
+        assert bucket.reserve(now + 1) == 0
+        assert bucket.reserve(now + 1) == pytest.approx(0.5)
+
+    def test_rate_limiter_per_chat(self):
+        limiter = RateLimiter(global_rate=1000, chat_rate=1)
+        assert limiter.reserve(1) == 0
+        assert limiter.reserve(2) == 0
+        assert limiter.reserve(1) == pytest.approx(1, abs=0.01)
+
+
+class TestSendQueue:
+
+    def test_messages_for_one_chat_are_coalesced(self):
+        bot = RecordingBot()
+        bot.release.clear()
+        queue = SendQueue(bot, workers=1, chat_rate=100)
+        queue.send(1, 'a')
+        assert wait_for(lambda: queue.depth == 0)
+        queue.send(1, 'b')
+        queue.send(1, 'c')
+        bot.release.set()
+        assert queue.close(5)
+        assert [text for _, text, _ in bot.calls] == ['a', 'b\n\nc']
+        assert queue.snapshot()['sent'] == 3
+        assert queue.snapshot()['batches'] == 2
+
+    def test_chat_rate_is_respected(self):
+        bot = RecordingBot()
+        queue = SendQueue(bot, workers=2, chat_rate=10)
+        queue.send(1, 'a')
+        assert wait_for(lambda: len(bot.calls) == 1)
+        queue.send(1, 'b')
+        queue.send(2, 'c')
+        assert queue.close(5)
+        times = {
+            text: sent_at
+            for (_, text, _), sent_at in zip(bot.calls, bot.times)
+        }
+        assert times['b'] - times['a'] >= 0.09, (
+            'В один чат нельзя отправлять чаще chat_rate'
+        )
+        assert times['c'] - times['a'] < 0.09
+
+    def test_retry_after_429(self):
+        bot = RecordingBot(errors=[RetryAfter(0.05)])
+        queue = SendQueue(bot, workers=1, chat_rate=100)
+        queue.send(1, 'a')
+        assert queue.close(5)
+        assert len(bot.calls) == 2
+        assert bot.times[1] - bot.times[0] >= 0.05
+        assert queue.snapshot()['throttled'] == 1
+        assert queue.snapshot()['sent'] == 1
+
+    def test_bad_request_is_not_retried(self):
+        bot = RecordingBot(errors=[BadRequest('chat not found')])
+        queue = SendQueue(bot, workers=1)
+        queue.send(1, 'a')
+        assert queue.close(5)
+        assert len(bot.calls) == 1
+        assert queue.snapshot()['failed'] == 1
+
+    def test_send_does_not_block(self):
+        bot = RecordingBot()
+        bot.release.clear()
+        queue = SendQueue(bot, workers=1)
+        started = time.monotonic()
+        for number in range(100):
+            queue.send(number, 'a')
+        assert time.monotonic() - started < 0.5
+        bot.release.set()
+        assert queue.close(10)
+        assert len(bot.calls) == 100
+
+    def test_outbox_message_is_retried_until_delivered(self):
+        bot = RecordingBot(errors=[RetryAfter(0.01)] * 3)
+        bot.release.clear()
+        outbox = MemoryStore()
+        queue = SendQueue(bot, workers=1, chat_rate=100, max_attempts=2,
+                          outbox=outbox)
+        queue.send(1, 'a', owner='subscriber')
+        assert [item[1:] for item in outbox.pending('subscriber')] == [
+            (1, 'a', None)
+        ], 'Сообщение записывается в outbox до отправки'
+        bot.release.set()
+        assert queue.close(5)
+        assert len(bot.calls) == 4, (
+            'Сообщение из outbox повторяется и после max_attempts попыток'
+        )
+        assert outbox.pending('subscriber') == [], (
+            'Доставленное сообщение удаляется из outbox'
+        )
+
+    def test_outbox_drops_rejected_message(self):
+        bot = RecordingBot(errors=[BadRequest('chat not found')])
+        outbox = MemoryStore()
+        queue = SendQueue(bot, workers=1, outbox=outbox)
+        queue.send(1, 'a', owner='subscriber')
+        assert queue.close(5)
+        assert outbox.pending('subscriber') == []
+
+    def test_redeliver(self):
+        bot = RecordingBot()
+        outbox = MemoryStore()
+        outbox.enqueue('subscriber', 1, 'a')
+        outbox.enqueue('other', 2, 'b')
+        queue = SendQueue(bot, workers=1, outbox=outbox)
+        assert queue.redeliver('subscriber') == 1
+        assert queue.close(5)
+        assert [call[:2] for call in bot.calls] == [(1, 'a')]
+        assert list(outbox.outbox.values())[0][0] == 'other'
+
+    def test_withdraw_waits_for_batch_being_sent(self):
+        bot = RecordingBot()
+        bot.release.clear()
+        outbox = MemoryStore()
+        queue = SendQueue(bot, workers=1, outbox=outbox)
+        queue.send(1, 'a', owner='subscriber')
+        queue.send(2, 'b', owner='subscriber')
+        queue.send(3, 'c', owner='other')
+        assert wait_for(lambda: queue.depth == 2)
+        assert not queue.withdraw(['subscriber'], timeout=0.05), (
+            'withdraw не должен завершаться, пока пачка подписчика в отправке'
+        )
+        bot.release.set()
+        assert queue.withdraw(['subscriber'], timeout=5)
+        assert queue.close(5)
+        assert [call[:2] for call in bot.calls] == [(1, 'a'), (3, 'c')]
+        assert [item[1:3] for item in outbox.pending('subscriber')] == [
+            (2, 'b')
+        ], 'Забранное из очереди сообщение остаётся в outbox'
@@ -0,0 +1,185 @@
+import sqlite3
+import threading
+import time
+
+import homework
+from assistant.engine import PollEngine
+from assistant.registry import SubscriptionRegistry
+from assistant.sender import SendQueue
+from assistant.sharding import HashRing, Supervisor, select
+from assistant.state import SqliteStore
+from tests.utils import MockBot, make_response
+
+KEYS = [f'subscriber-{number}' for number in range(1000)]
+
+
+class MockConn:
+
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+
+    def send(self, message):
+        self.log.append((self.name, *message))
+
+    def poll(self, timeout):
+        return True
+
+    def recv(self):
+        return ('revoked', [])
+
+
+class TestHashRing:
+
+    def test_keys_are_spread(self):
+        ring = HashRing(['a', 'b', 'c', 'd'])
+        counts = {}
+        for key in KEYS:
+            node = ring.node_for(key)
+            counts[node] = counts.get(node, 0) + 1
+        assert set(counts) == {'a', 'b', 'c', 'd'}
+        assert min(counts.values()) > len(KEYS) / 4 / 2
+
+    def test_remove_moves_only_its_keys(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.remove('b')
+        for key in KEYS:
+            if before[key] != 'b':
+                assert ring.node_for(key) == before[key], (
+                    'Гибель узла не должна двигать чужих подписчиков'
+                )
+        assert ring.nodes == ['a', 'c']
+
+    def test_add_moves_about_its_share(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.add('d')
+        moved = [key for key in KEYS if ring.node_for(key) != before[key]]
+        assert all(ring.node_for(key) == 'd' for key in moved)
+        assert len(moved) < len(KEYS) / 2
+
+    def test_empty_ring(self):
+        assert HashRing().node_for('key') is None
+
+    def test_select_partitions_registry(self):
+        nodes = ['a', 'b']
+        total = 0
+        for node in nodes:
+            registry = SubscriptionRegistry()
+            for number in range(100):
+                registry.add(f'token-{number}', number)
+            total += len(select(registry, nodes, node))
+        assert total == 100, 'Каждый подписчик должен достаться одному узлу'
+
+
+class TestEngineHandoff:
+
+    def test_revoke_waits_for_running_poll(self, monkeypatch):
+        started, release = threading.Event(), threading.Event()
+
+        def mock_request(token, from_date, **kwargs):
+            started.set()
+            release.wait(5)
+            return make_response(100)
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        engine = PollEngine(registry, MockBot(), interval=0.01, workers=1)
+        thread = threading.Thread(target=engine.run)
+        thread.start()
+        assert started.wait(5)
+        assert not engine.revoke([subscriber.id], timeout=0.05), (
+            'revoke не должен завершаться, пока идёт опрос подписчика'
+        )
+        release.set()
+        assert engine.revoke([subscriber.id], timeout=5)
+        assert engine.store.cursors[subscriber.id][0] == 100
+        started.clear()
+        time.sleep(0.1)
+        engine.stop()
+        thread.join(5)
+        assert not started.is_set(), 'Снятый подписчик не должен опрашиваться'
+
+    def test_assign_restores_cursor(self, monkeypatch):
+        polled = []
+        monkeypatch.setattr(
+            homework, 'request_homeworks',
+            lambda token, from_date, **kwargs: polled.append(from_date)
+            or make_response(200)
+        )
+        source = SubscriptionRegistry()
+        subscriber = source.add('token', 1)
+        engine = PollEngine(SubscriptionRegistry(), MockBot(), interval=1)
+        engine.store.cursors[subscriber.id] = (150, '')
+        thread = threading.Thread(target=engine.run)
+        thread.start()
+        engine.assign([subscriber])
+        deadline = time.monotonic() + 5
+        while not polled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.stop()
+        thread.join(5)
+        assert polled[0] == 150, 'Опрос должен продолжиться с курсора'
+
+    def test_queued_notifications_move_once(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        subscriber = SubscriptionRegistry().add('token', 1)
+        engines, bots, queues, stores = [], [], [], []
+        for _ in range(2):
+            stores.append(SqliteStore(path, flush_interval=60))
+            bots.append(MockBot())
+            queues.append(SendQueue(bots[-1], workers=1, chat_rate=0.5,
+                                    outbox=stores[-1]))
+            engines.append(PollEngine(SubscriptionRegistry(), bots[-1],
+                                      store=stores[-1], queue=queues[-1]))
+        engines[0].assign([subscriber])
+        # Пока чат 1 ждёт ограничения частоты, уведомления стоят в очереди.
+        queues[0].send(1, 'warm-up')
+        queues[0].send_many([(1, 'first', None), (1, 'second', None)],
+                            subscriber.id)
+        assert engines[0].revoke([subscriber.id], timeout=5)
+        engines[1].assign([subscriber])
+        for queue, store in zip(queues, stores):
+            assert queue.close(5)
+            store.close()
+        assert bots[0].sent == [(1, 'warm-up')], (
+            'Прежний владелец не должен отправлять уведомления переехавшего'
+        )
+        assert bots[1].sent == [(1, 'first\n\nsecond')]
+        with sqlite3.connect(path) as db:
+            assert db.execute('SELECT * FROM outbox').fetchall() == []
+
+
+class TestSupervisor:
+
+    def make_supervisor(self, nodes, log):
+        registry = SubscriptionRegistry()
+        for number in range(200):
+            registry.add(f'token-{number}', number)
+        supervisor = Supervisor(registry, workers=len(nodes))
+        for node in nodes:
+            supervisor._processes[node] = (None, MockConn(log, node))
+            supervisor.ring.add(node)
+        return supervisor
+
+    def test_rebalance_revokes_before_assign(self):
+        log = []
+        supervisor = self.make_supervisor(['a', 'b'], log)
+        supervisor.rebalance()
+        assert {entry[1] for entry in log} == {'assign'}
+        assert len(supervisor.owners) == 200
+        log.clear()
+        supervisor._processes['c'] = (None, MockConn(log, 'c'))
+        supervisor.ring.add('c')
+        supervisor.rebalance()
+        commands = [entry[1] for entry in log]
+        assert commands.index('assign') > max(
+            index for index, command in enumerate(commands)
+            if command == 'revoke'
+        ), 'Новый владелец получает подписчиков только после снятия'
+        moved = [id for entry in log if entry[1] == 'assign'
+                 for id in entry[2]]
+        assert all(supervisor.owners[id] == 'c' for id in moved)
+        assert len(moved) < 200 / 2
@@ -0,0 +1,76 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('telegram', 'requests', 'aiohttp', 'dotenv', 'urllib3')
+# С запасом: на одном ядре запуск до первого опроса занимает ~0.4 с.
+FIRST_POLL_LIMIT = 3.0
+
+
+class FirstRequestHandler(BaseHTTPRequestHandler):
+    polled = None
+
+    def do_GET(self):
+        self.polled.set()
+        body = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestStartup:
+
+    def test_import_skips_heavy_dependencies(self):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, homework; '
+             f'print(",".join(m for m in {HEAVY!r} if m in sys.modules))'],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+        assert output == '', (
+            f'import homework не должен загружать {output}: они нужны '
+            'только при первом запросе или отправке'
+        )
+
+    def test_time_to_first_poll(self, tmp_path):
+        polled = threading.Event()
+        handler = type('Handler', (FirstRequestHandler,), {'polled': polled})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        env = dict(
+            os.environ, PRACTICUM_TOKEN='token', TELEGRAM_CHAT_ID='1',
+            TELEGRAM_TOKEN='123456:test', TELEGRAM_API_URL=url,
+            PRACTICUM_ENDPOINT=f'{url}/', STATE_DB=':memory:',
+            SHUTDOWN_TIMEOUT='1',
+        )
+        env.pop('SUBSCRIBERS_FILE', None)
+        started = time.monotonic()
+        bot = subprocess.Popen(
+            [sys.executable, 'homework.py'], cwd=ROOT, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            assert polled.wait(10), 'Бот не опросил API за 10 с'
+            elapsed = time.monotonic() - started
+        finally:
+            bot.send_signal(signal.SIGTERM)
+            bot.wait(10)
+            server.shutdown()
+        assert elapsed < FIRST_POLL_LIMIT, (
+            f'От запуска до первого опроса прошло {elapsed:.2f} с'
+        )
+        assert bot.returncode == 0
@@ -0,0 +1,163 @@
+import sqlite3
+
+from telegram.error import NetworkError
+
+import homework
+from assistant.engine import PollEngine
+from assistant.registry import Subscriber, SubscriptionRegistry
+from assistant.sender import SendQueue
+from assistant.state import MemoryStore, SqliteStore, open_store
+from tests.utils import MockBot, make_response
+
+
+def stored_cursors(path):
+    with sqlite3.connect(path) as db:
+        return db.execute('SELECT * FROM cursors').fetchall()
+
+
+def stored_outbox(path):
+    with sqlite3.connect(path) as db:
+        return db.execute(
+            'SELECT subscriber_id, chat_id, message FROM outbox'
+        ).fetchall()
+
+
+class UnreachableBot:
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        raise NetworkError('Telegram недоступен')
+
+
+class TestStores:
+
+    def test_memory_roundtrip(self):
+        store = open_store(':memory:')
+        assert isinstance(store, MemoryStore)
+        subscriber = Subscriber('token', 1, from_date=100)
+        subscriber.last_error = 'сбой'
+        store.save(subscriber, [{'id': 7, 'status': 'approved'}])
+        restored = Subscriber('token', 1)
+        assert store.restore(restored)
+        assert (restored.from_date, restored.last_error) == (100, 'сбой')
+        assert store.status(subscriber.id, '7') == 'approved'
+
+    def test_sqlite_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = SqliteStore(path, flush_interval=60)
+        subscriber = Subscriber('token', 1, from_date=100)
+        store.save(subscriber, [{'id': 7, 'status': 'reviewing'}])
+        store.close()
+        store = SqliteStore(path, flush_interval=60)
+        restored = Subscriber('token', 1)
+        assert store.restore(restored), (
+            'Курсор должен восстанавливаться после перезапуска'
+        )
+        assert restored.from_date == 100
+        assert store.status(subscriber.id, '7') == 'reviewing'
+        store.close()
+
+    def test_sqlite_writes_are_batched(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = SqliteStore(path, flush_interval=60, batch_size=1000)
+        subscriber = Subscriber('token', 1, from_date=100)
+        store.save(subscriber)
+        assert stored_cursors(path) == [], (
+            'save() не должен писать в базу на каждом опросе'
+        )
+        assert store.restore(Subscriber('token', 1))
+        store.flush()
+        assert stored_cursors(path) == [(subscriber.id, 100, '')]
+        store.close()
+
+    def test_sqlite_synchronous_mode(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = SqliteStore(path, flush_interval=0, synchronous='FULL')
+        store.save(Subscriber('token', 1, from_date=100))
+        assert len(stored_cursors(path)) == 1
+        store.close()
+
+
+class TestOutbox:
+
+    def test_sqlite_outbox_survives_restart(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = SqliteStore(path, flush_interval=60)
+        id = store.enqueue('subscriber', 1, 'сообщение', 'HTML')
+        store.close()
+        store = SqliteStore(path, flush_interval=60)
+        assert store.pending('subscriber') == [
+            (id, 1, 'сообщение', 'HTML')
+        ]
+        assert store.pending('other') == []
+        store.ack([id])
+        assert store.pending('subscriber') == []
+        store.close()
+        assert stored_outbox(path) == []
+
+    def test_ack_before_flush_skips_database(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = SqliteStore(path, flush_interval=60)
+        subscriber = Subscriber('token', 1, from_date=100)
+        delivered = store.enqueue(subscriber.id, 1, 'доставлено')
+        store.enqueue(subscriber.id, 1, 'в очереди')
+        store.save(subscriber)
+        store.ack([delivered])
+        store.flush()
+        assert stored_outbox(path) == [(subscriber.id, 1, 'в очереди')], (
+            'Outbox записывается вместе с курсором, без доставленного'
+        )
+        assert len(stored_cursors(path)) == 1
+        store.close()
+
+
+class TestEngineState:
+
+    def test_engine_restores_and_saves_cursor(self, monkeypatch):
+        def mock_request(token, from_date, **kwargs):
+            assert from_date == 100, 'Опрос должен начаться с курсора'
+            return {'homeworks': [], 'current_date': 200}
+
+        monkeypatch.setattr(homework, 'request_homeworks', mock_request)
+        store = MemoryStore()
+        store.save(Subscriber('token', 1, from_date=100))
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        engine = PollEngine(registry, None, store=store)
+        engine.start()
+        engine.poll(subscriber)
+        restored = Subscriber('token', 1)
+        store.restore(restored)
+        assert restored.from_date == 200
+
+    def test_notification_survives_telegram_outage(self, monkeypatch,
+                                                   tmp_path,
+                                                   random_timestamp):
+        monkeypatch.setattr(
+            homework, 'request_homeworks',
+            lambda token, from_date, **kwargs: make_response(
+                random_timestamp,
+                {'homework_name': 'hw', 'status': 'approved'}
+            )
+        )
+        path = str(tmp_path / 'state.sqlite3')
+        store = SqliteStore(path, flush_interval=60)
+        queue = SendQueue(UnreachableBot(), workers=1, outbox=store)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        PollEngine(registry, None, store=store, queue=queue).poll(subscriber)
+        assert not queue.close(0.1)
+        store.close()
+
+        store = SqliteStore(path, flush_interval=60)
+        bot = MockBot()
+        queue = SendQueue(bot, workers=1, outbox=store)
+        registry = SubscriptionRegistry()
+        subscriber = registry.add('token', 1)
+        PollEngine(registry, bot, store=store, queue=queue).start()
+        assert subscriber.from_date == random_timestamp
+        assert queue.close(5)
+        assert len(bot.sent) == 1 and 'hw' in bot.sent[0][1], (
+            'Уведомление, не доставленное до перезапуска, должно уйти после'
+        )
+        store.close()
+        assert stored_outbox(path) == []
@@ -0,0 +1,77 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import homework
+from assistant.transport import HttpPool
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"homeworks": [], "current_date": 1}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpPool:
+
+    def test_connection_is_reused(self, local_url):
+        pool = HttpPool(pool_size=1)
+        for _ in range(5):
+            assert pool.get(local_url).status_code == 200
+        stats = pool.stats.snapshot()
+        assert stats['requests'] == 5
+        assert stats['handshakes'] == 1, (
+            'Повторные запросы должны идти через открытое соединение'
+        )
+        assert stats['reuse_ratio'] == pytest.approx(0.8)
+        assert stats['latency_max'] > 0
+        pool.close()
+
+    def test_keepalive_disabled(self, local_url):
+        pool = HttpPool(pool_size=1, keepalive=False)
+        for _ in range(3):
+            pool.get(local_url)
+        assert pool.stats.handshakes == 3
+        pool.close()
+
+    def test_request_homeworks_goes_through_session(self, monkeypatch,
+                                                    local_url):
+        pool = HttpPool(pool_size=1)
+        monkeypatch.setattr(homework, 'api_session', pool)
+        monkeypatch.setattr(homework, 'ENDPOINT', local_url)
+        assert homework.request_homeworks('token', 1)['current_date'] == 1
+        assert pool.stats.requests == 1
+
+    def test_request_has_timeout(self, monkeypatch):
+        passed = {}
+
+        class MockSession:
+            def get(self, url, **kwargs):
+                passed.update(kwargs)
+                raise ConnectionError
+
+        monkeypatch.setattr(homework, 'api_session', MockSession())
+        with pytest.raises(ConnectionError):
+            homework.request_homeworks('token', 1)
+        assert passed['timeout'] == (
+            homework.CONNECT_TIMEOUT, homework.READ_TIMEOUT
+        )
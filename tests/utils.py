@@ -1,7 +1,77 @@
+import threading
+import time
 from inspect import signature
 from types import ModuleType
 
 
+class MockBot:
+    """Запоминает отправленные сообщения: [(chat_id, текст), ...]."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class RecordingBot:
+    """Запоминает отправки [(chat_id, текст, разметка), ...] и их время.
+    Пока release сброшен, отправка ждёт; ошибки errors выбрасываются по
+    одной после записи отправки.
+    """
+
+    def __init__(self, errors=()):
+        self.calls = []
+        self.times = []
+        self.errors = list(errors)
+        self.release = threading.Event()
+        self.release.set()
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id=None, text=None, parse_mode=None):
+        self.release.wait(5)
+        with self.lock:
+            self.calls.append((chat_id, text, parse_mode))
+            self.times.append(time.monotonic())
+            if self.errors:
+                raise self.errors.pop(0)
+
+
+class MockSender:
+    """Отправитель AsyncEngine; available=False - Telegram недоступен."""
+
+    def __init__(self, available=True):
+        self.sent = []
+        self.available = available
+
+    async def send(self, chat_id, message, parse_mode=None):
+        if self.available:
+            self.sent.append((chat_id, message))
+        return self.available
+
+
+class MockResponse:
+    """Ответ requests: код, тело и заголовки."""
+
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+def make_response(random_timestamp, *homeworks):
+    """Ответ API с работами homeworks и курсором random_timestamp."""
+    return {'homeworks': list(homeworks), 'current_date': random_timestamp}
+
+
+def wait_for(condition, timeout=5):
+    """Ждёт, пока condition() станет истинным; его итоговое значение."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
 def check_function(scope: ModuleType, func_name: str, params_qty: int = 0):
     """Checks if scope has a function with specific name and params with qty"""
     assert hasattr(scope, func_name), (